@@ -2,9 +2,13 @@ import os
 import tkinter as tk
 from tkinter import scrolledtext
 
+# === Буферизованный вывод ===
+FLUSH_INTERVAL_MS = 15      # строки копятся и выводятся пачкой раз в интервал
+SCROLLBACK_LINES = 5000     # сколько последних строк хранит окно вывода
+
 
 class ShellEmulator:
-    def __init__(self, master, vfs_name="default_vfs"):
+    def __init__(self, master, vfs_name="default_vfs", scrollback=SCROLLBACK_LINES):
         self.master = master
         self.vfs_name = vfs_name
         self.master.title(f"Эмулятор - [{self.vfs_name}]")
@@ -44,12 +48,34 @@ class ShellEmulator:
         self.entry.bind("<Return>", self.handle_command)
         self.entry.focus()
 
+        # Очередь вывода: log() только копит строки, flush() выводит их пачкой
+        self.scrollback = scrollback
+        self._pending = []
+        self._flush_id = None
+
         self.log("Эмулятор запущен. Введите команду (ls, cd, exit):")
 
     def log(self, msg: str):
-        """Вывод текста в терминал"""
+        """Вывод текста в терминал (через очередь, см. flush)"""
+        self._pending.append(msg)
+        if self._flush_id is None:
+            self._flush_id = self.master.after(FLUSH_INTERVAL_MS, self.flush)
+
+    def flush(self):
+        """
+        Выводит накопленные строки одной вставкой и одной прокруткой,
+        затем удаляет из начала окна строки сверх scrollback.
+        """
+        self._flush_id = None
+        if not self._pending:
+            return
+        lines = self._pending[-self.scrollback:]
+        self._pending = []
         self.text.configure(state="normal")
-        self.text.insert(tk.END, msg + "\n")
+        self.text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.scrollback
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
         self.text.configure(state="disabled")
         self.text.see(tk.END)
 
@@ -75,6 +101,7 @@ class ShellEmulator:
             self.log(f"Выполнена команда cd, аргументы: {args}")
         elif cmd == "exit":
             self.log("Выход из эмулятора.")
+            self.flush()    # строки из _pending выводятся до выхода
             self.master.quit()
         else:
             self.log(f"Ошибка: неизвестная команда '{cmd}'")
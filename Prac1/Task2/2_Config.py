@@ -1,12 +1,29 @@
+import argparse
+import cProfile
 import os
+import queue
 import sys
+import threading
+import time
 import tkinter as tk
 from tkinter import scrolledtext
-import xml.etree.ElementTree as ET
+
+from completion import Completer, History
+from engine import ShellEngine
+
+# === Буферизованный вывод ===
+FLUSH_INTERVAL_MS = 15      # строки копятся и выводятся пачкой раз в интервал
+SCROLLBACK_LINES = 5000     # сколько последних строк хранит окно вывода
+POLL_INTERVAL_MS = 30       # как часто окно забирает вывод фонового скрипта
+POLL_BATCH_LINES = 2000     # сколько строк забирается за один раз (окно не замирает)
+
+# === История команд ===
+HISTORY_FILE = os.path.expanduser("~/.emulator_history")   # сохраняется между сеансами
 
 
 class ShellEmulator:
-    def __init__(self, master, vfs_path=None, script_path=None):
+    def __init__(self, master, vfs_path=None, script_path=None, scrollback=SCROLLBACK_LINES,
+                 history_path=HISTORY_FILE):
         self.master = master
         self.vfs_path = vfs_path
         self.script_path = script_path
@@ -20,6 +37,7 @@ class ShellEmulator:
         # Размещение через grid
         self.master.grid_rowconfigure(0, weight=1)
         self.master.grid_rowconfigure(1, weight=0)
+        self.master.grid_rowconfigure(2, weight=0)
         self.master.grid_columnconfigure(0, weight=1)
 
         # Окно вывода
@@ -36,89 +54,244 @@ class ShellEmulator:
         )
         self.entry.grid(row=1, column=0, sticky="ew", padx=5, pady=(0, 5))
         self.entry.bind("<Return>", self.handle_command)
+        self.entry.bind("<Tab>", self.complete)
+        self.entry.bind("<Up>", lambda _: self.history_move(-1))
+        self.entry.bind("<Down>", lambda _: self.history_move(1))
+        self.entry.bind("<Control-r>", self.search_history)
+        self.entry.bind("<KeyRelease>", self.update_search)
+        self.entry.bind("<Escape>", self.cancel_search)
         self.entry.focus()
 
-        # Инициализация
+        # Строка состояния: ход выполнения скрипта
+        self.status = tk.Label(
+            master, bg="#000000", fg="#888888", font=("Menlo", 10), anchor="w", text=""
+        )
+        self.status.grid(row=2, column=0, sticky="ew", padx=5, pady=(0, 5))
+
+        # Отмена скрипта: Esc или Ctrl+C
+        self.master.bind("<Escape>", self.cancel_script)
+        self.master.bind("<Control-c>", self.cancel_script)
+
+        # Очередь вывода: log() только копит строки, flush() выводит их пачкой
+        self.scrollback = scrollback
+        self._pending = []
+        self._flush_id = None
+
+        # Фоновый скрипт: вывод из рабочего потока идёт через очередь
+        self._outbox = queue.SimpleQueue()
+        self._worker = None
+        self._cancel = threading.Event()
+        self._progress = None       # (n, total) — пишет рабочий поток, читает окно
+
+        # Инициализация: команды выполняет ShellEngine, окно только показывает вывод
+        self.engine = ShellEngine(output=self.emit)
+        self.completer = Completer(self.engine)
+        self.history = History(history_path)
+        self._history_pos = None    # позиция при листании стрелками; None — новая строка
+        self._search = None         # запрос Ctrl-R; None — поиск не идёт
+        self._search_index = None   # индекс найденной строки истории
         self.log(f"Эмулятор запущен. Имя VFS: {self.vfs_name}")
-        self.vfs = self.load_vfs(vfs_path)
+        self.engine.load_vfs(vfs_path)
         if script_path:
-            self.run_script(script_path)
+            # Скрипт стартует уже из mainloop — окно появляется сразу
+            self.master.after_idle(self.run_script, script_path)
 
     # === Вывод текста в терминал ===
     def log(self, msg):
+        # Строка только ставится в очередь; вывод — пачкой в flush()
+        self._pending.append(msg)
+        if self._flush_id is None:
+            self._flush_id = self.master.after(FLUSH_INTERVAL_MS, self.flush)
+
+    def flush(self):
+        """Одна вставка и одна прокрутка на пачку строк; старые строки сверх scrollback удаляются."""
+        self._flush_id = None
+        if not self._pending:
+            return
+        start = time.perf_counter()
+        lines = self._pending[-self.scrollback:]
+        self._pending = []
         self.text.configure(state="normal")
-        self.text.insert(tk.END, msg + "\n")
+        self.text.insert(tk.END, "\n".join(lines) + "\n")
+        excess = int(self.text.index("end-1c").split(".")[0]) - 1 - self.scrollback
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
         self.text.configure(state="disabled")
         self.text.see(tk.END)
+        # Длительность отрисовки пачки попадает в stats как ui.flush — видно, где окно подвисает
+        self.engine.record("ui.flush", time.perf_counter() - start)
+
+    def emit(self, msg):
+        """Вывод ShellEngine: из потока окна — сразу в log(), из рабочего — через очередь."""
+        if threading.current_thread() is threading.main_thread():
+            self.log(msg)
+        else:
+            self._outbox.put(msg)
 
     # === Обработка ввода пользователя ===
     def handle_command(self, _):
+        if self._search is not None:
+            self.finish_search(accept=True)
         line = self.entry.get().strip()
         self.entry.delete(0, tk.END)
+        self._history_pos = None
         if not line:
             return
+        if self._worker is not None:
+            self.log("Идёт фоновое выполнение — дождитесь завершения или нажмите Esc для отмены.")
+            return
+        self.history.add(line)
         self.execute_line(line)
 
+    def set_entry(self, text):
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, text)
+        self.entry.icursor(tk.END)
+
+    # === Дополнение по Tab ===
+    def complete(self, _):
+        """Дополняет последнее слово; если вариантов несколько и дописать нечего — выводит их."""
+        if self._search is not None:
+            self.finish_search(accept=True)
+        if self._worker is not None:
+            return "break"
+        start = time.perf_counter()
+        line = self.entry.get()
+        new_line, words, total = self.completer.complete(line)
+        self.engine.record("ui.complete", time.perf_counter() - start)
+        if new_line != line:
+            self.set_entry(new_line)
+        elif total > 1:
+            more = f"  ... (всего {total})" if total > len(words) else ""
+            self.log("  ".join(words) + more)
+        return "break"     # Tab не переводит фокус
+
+    # === История: стрелки и Ctrl-R ===
+    def history_move(self, step):
+        if self._search is not None:
+            self.finish_search(accept=True)
+        if not len(self.history):
+            return "break"
+        pos = len(self.history) if self._history_pos is None else self._history_pos
+        pos = max(0, min(len(self.history), pos + step))
+        self._history_pos = pos
+        self.set_entry(self.history[pos] if pos < len(self.history) else "")
+        return "break"
+
+    def search_history(self, _):
+        """Первое Ctrl-R начинает поиск (вводимый текст — подстрока), повторное — ищет старше."""
+        if self._worker is not None:
+            return "break"
+        if self._search is None:
+            self._search = self.entry.get()
+            self._search_index = self.history.search(self._search)
+        elif self._search_index is not None:
+            older = self.history.search(self._search, self._search_index)
+            if older is not None:
+                self._search_index = older
+        self.show_search()
+        return "break"
+
+    def update_search(self, _):
+        if self._search is None or self.entry.get() == self._search:
+            return
+        self._search = self.entry.get()
+        self._search_index = self.history.search(self._search)
+        self.show_search()
+
+    def show_search(self):
+        if self._search_index is None:
+            found = "не найдено"
+        else:
+            found = self.history[self._search_index]
+        self.status.configure(text=f"(поиск в истории) '{self._search}': {found}  (Enter — выполнить, Esc — отмена)")
+
+    def finish_search(self, accept):
+        """Выход из поиска: accept — найденная строка попадает в поле ввода, иначе поле очищается."""
+        found = self.history[self._search_index] if self._search_index is not None else ""
+        self._search = self._search_index = None
+        self.status.configure(text="")
+        self.set_entry(found if accept else "")
+
+    def cancel_search(self, _):
+        if self._search is None:
+            return None     # Esc без поиска — отмена скрипта (привязка окна)
+        self.finish_search(accept=False)
+        return "break"
+
     # === Выполнение одной строки ===
     def execute_line(self, line):
-        line = os.path.expandvars(line)
-        parts = line.split()
-        cmd = parts[0]
-        args = parts[1:]
-        self.log(f"> {line}")
-
-        if cmd == "ls":
-            self.log("file1.txt  dirA  dirB")
-        elif cmd == "cd":
-            self.log(f"Переход в каталог: {args if args else '/'}")
-        elif cmd == "exit":
-            self.log("Выход из эмулятора.")
+        if self.engine.is_long(line):
+            # find / grep по большой VFS идут в рабочем потоке — окно не замирает, Esc прерывает
+            self.start_worker(self.engine.run_lines, ([line], self._cancel), line)
+            return
+        self.engine.execute_line(line)
+        if not self.engine.running:
+            self.flush()
             self.master.quit()
-        elif cmd == "echo":
-            if args and args[0] == "$HOME":
-                self.log(os.path.expandvars("$HOME"))
-            else:
-                self.log(" ".join(args))
-        else:
-            self.log(f"Ошибка: неизвестная команда '{cmd}'")
 
-    # === Загрузка VFS ===
-    def load_vfs(self, path):
-        if not path:
-            self.log("Создана виртуальная файловая система по умолчанию.")
-            return {"root": []}
-        try:
-            tree = ET.parse(path)
-            self.log(f"VFS '{path}' успешно загружена.")
-            return tree.getroot()
-        except Exception as e:
-            self.log(f"Ошибка загрузки VFS: {e}")
-            return {"root": []}
-
-    # === Выполнение стартового скрипта ===
+    # === Выполнение в рабочем потоке: стартовый скрипт и долгие команды ===
     def run_script(self, script_path):
-        self.log(f"Выполнение стартового скрипта: {script_path}")
+        self.start_worker(self.engine.run_script, (script_path, self._cancel, self.set_progress),
+                          f"Скрипт {os.path.basename(script_path)}")
+
+    def start_worker(self, target, args, title):
+        if self._worker is not None:
+            return
+        self._cancel.clear()
+        self._progress = None
+        self._worker = threading.Thread(target=target, args=args, daemon=True)
+        self._worker.start()
+        self.status.configure(text=f"{title}  (Esc — отмена)")
+        self.master.after(POLL_INTERVAL_MS, self.poll_script, title)
+
+    def set_progress(self, n, total):
+        self._progress = (n, total)
+
+    def poll_script(self, title):
+        """Забирает пачку вывода из очереди, обновляет строку состояния, следит за завершением."""
+        done = not self._worker.is_alive()
         try:
-            with open(script_path, "r", encoding="utf-8") as file:
-                for line in file:
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-                    # Показать команду и результат
-                    self.execute_line(line)
-        except Exception as e:
-            self.log(f"Ошибка выполнения скрипта: {e}")
+            for _ in range(POLL_BATCH_LINES):
+                self.log(self._outbox.get_nowait())
+            done = False    # в очереди могут остаться строки — заберём на следующем тике
+        except queue.Empty:
+            pass
+        if self._progress:
+            n, total = self._progress
+            self.status.configure(text=f"{title}: строка {n} из {total}  (Esc — отмена)")
+        if not done:
+            self.master.after(POLL_INTERVAL_MS, self.poll_script, title)
+            return
+        self._worker = None
+        self.status.configure(text="")
+        if not self.engine.running:
+            self.flush()
+            self.master.quit()
+
+    def cancel_script(self, _=None):
+        if self._worker is not None:
+            self._cancel.set()
 
 
 # === Точка входа ===
 if __name__ == "__main__":
-    vfs_path = sys.argv[1] if len(sys.argv) > 1 else None
-    script_path = sys.argv[2] if len(sys.argv) > 2 else None
+    parser = argparse.ArgumentParser(description="Эмулятор командной оболочки")
+    parser.add_argument("vfs_path", nargs="?", help="vfs.xml или снимок VFS")
+    parser.add_argument("script_path", nargs="?", help="Стартовый скрипт")
+    parser.add_argument("--profile", metavar="FILE", help="Профиль cProfile (pstats) по выполненным командам")
+    parser.add_argument("--trace", metavar="FILE", help="Трассировка команд в JSON")
+    args = parser.parse_args()
 
     print("Отладочная информация:")
-    print(f"  Путь к VFS: {vfs_path}")
-    print(f"  Путь к стартовому скрипту: {script_path}")
+    print(f"  Путь к VFS: {args.vfs_path}")
+    print(f"  Путь к стартовому скрипту: {args.script_path}")
 
     root = tk.Tk()
-    app = ShellEmulator(root, vfs_path, script_path)
+    app = ShellEmulator(root, args.vfs_path, args.script_path)
+    if args.profile:
+        app.engine.profiler = cProfile.Profile()
+    if args.trace:
+        app.engine.trace = []
     root.mainloop()
+    app.engine.write_reports(args.profile, args.trace, sys.stdout)
@@ -0,0 +1,236 @@
+"""
+Дополнение по Tab и история команд эмулятора.
+
+PrefixTrie — сжатое префиксное дерево (у ребра строка, а не один символ):
+поиск по префиксу стоит O(длина префикса) независимо от числа слов, а в
+каждом узле хранится число слов поддерева — "сколько вариантов" известно
+сразу, без перебора. Completer держит одно дерево команд и по дереву имён
+на каталог; дерево каталога строится при первом Tab в нём и дальше
+обновляется подпиской на изменения VFS (VFS.listeners).
+
+History — кольцевой буфер (deque с maxlen) с сохранением в файл между
+сеансами и поиском по подстроке от новых строк к старым (Ctrl-R).
+"""
+import os
+import tempfile
+from collections import deque
+
+from vfs import VDir
+
+COMPLETION_LIMIT = 50       # сколько вариантов показывать при неоднозначном Tab
+HISTORY_SIZE = 1000         # сколько последних команд хранит история
+
+
+# === Префиксное дерево ===
+class _TrieNode:
+    __slots__ = ("label", "children", "terminal", "count")
+
+    def __init__(self, label="", terminal=False):
+        self.label = label          # строка на ребре от родителя
+        self.children = {}          # первый символ метки -> _TrieNode
+        self.terminal = terminal    # здесь заканчивается слово
+        self.count = 0              # число слов в поддереве
+
+
+class PrefixTrie:
+    def __init__(self, words=()):
+        self.root = _TrieNode()
+        for word in words:
+            self.insert(word)
+
+    def __len__(self):
+        return self.root.count
+
+    def insert(self, word: str) -> bool:
+        """Добавляет слово; False, если оно уже было."""
+        node = self.root
+        path = [node]
+        i = 0
+        while i < len(word):
+            child = node.children.get(word[i])
+            if child is None:
+                child = node.children[word[i]] = _TrieNode(word[i:])
+                node = child
+                break
+            label = child.label
+            common = 1
+            limit = min(len(label), len(word) - i)
+            while common < limit and label[common] == word[i + common]:
+                common += 1
+            if common < len(label):
+                # Слово расходится с меткой посередине — ребро делится надвое
+                middle = _TrieNode(label[:common])
+                middle.count = child.count
+                child.label = label[common:]
+                middle.children[child.label[0]] = child
+                node.children[word[i]] = middle
+                child = middle
+            node = child
+            path.append(node)
+            i += common
+        else:
+            if node.terminal:
+                return False
+        node.terminal = True
+        node.count += 1
+        for parent in path:
+            if parent is not node:
+                parent.count += 1
+        return True
+
+    def _find(self, prefix: str):
+        """Узел, все слова которого начинаются с prefix, и строка до конца его метки."""
+        node = self.root
+        text = ""
+        i = 0
+        while i < len(prefix):
+            child = node.children.get(prefix[i])
+            if child is None:
+                return None, None
+            label = child.label
+            rest = prefix[i:]
+            if not (rest.startswith(label) or label.startswith(rest)):
+                return None, None
+            text += label
+            node = child
+            i += len(label)
+        return node, text
+
+    def complete(self, prefix: str, limit: int = COMPLETION_LIMIT):
+        """
+        (общее продолжение, до limit слов по алфавиту, всего слов) для префикса.
+        Общее продолжение — самая длинная строка, с которой начинаются все подходящие слова.
+        """
+        node, common = self._find(prefix)
+        if node is None or node.count == 0:
+            return prefix, [], 0
+        while not node.terminal and len(node.children) == 1:
+            node = next(iter(node.children.values()))
+            common += node.label
+        words = []
+        stack = [(node, common)]
+        while stack and len(words) < limit:
+            current, text = stack.pop()
+            if current.terminal:
+                words.append(text)
+            for key in sorted(current.children, reverse=True):
+                child = current.children[key]
+                stack.append((child, text + child.label))
+        return common, words, node.count
+
+
+# === Дополнение команд и путей ===
+class Completer:
+    """Дополнение последнего слова строки: первое слово — команда, остальные — пути VFS."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.commands = PrefixTrie(engine.COMMANDS)
+        self._vfs = None
+        self._dirs = {}             # путь каталога -> PrefixTrie имён его детей
+
+    def _on_change(self, event, path, node):
+        if event != "add":
+            return
+        trie = self._dirs.get(path.rpartition("/")[0] or "/")
+        if trie is not None:
+            trie.insert(node.name)
+
+    def dir_trie(self, path: str, node: VDir) -> PrefixTrie:
+        vfs = self.engine.vfs
+        if vfs is not self._vfs:
+            # Загружена другая VFS (load) — прежние деревья недействительны
+            self._vfs = vfs
+            self._dirs = {}
+            vfs.listeners.append(self._on_change)
+        trie = self._dirs.get(path)
+        if trie is None:
+            trie = self._dirs[path] = PrefixTrie(node.children)
+        return trie
+
+    def complete(self, line: str):
+        """
+        Возвращает (новая строка, варианты, всего вариантов). Если вариант
+        один, слово дописывается целиком (каталог — с "/", остальное — с пробелом).
+        """
+        head, _, word = line.rpartition(" ")
+        start = line[:len(line) - len(word)]
+        if not head.strip():
+            common, words, total = self.commands.complete(word)
+            if total == 1:
+                common += " "
+            return start + common, words, total
+
+        vfs = self.engine.vfs
+        directory, slash, base = word.rpartition("/")
+        dir_path = vfs.abspath(directory or slash or None)
+        node = vfs.nodes.get(dir_path)
+        if not isinstance(node, VDir):
+            return line, [], 0
+        common, words, total = self.dir_trie(dir_path, node).complete(base)
+        if total == 1:
+            common += "/" if isinstance(node.children.get(common), VDir) else " "
+        return f"{start}{directory}{slash}{common}", words, total
+
+
+# === История команд ===
+class History:
+    def __init__(self, path=None, maxlen=HISTORY_SIZE):
+        self.path = path
+        self.lines = deque(maxlen=maxlen)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    count = 0
+                    for line in f:
+                        self.lines.append(line.rstrip("\n"))
+                        count += 1
+            except (OSError, UnicodeDecodeError):
+                return
+            if count > 2 * maxlen:
+                self.save()     # файл дописывается построчно — время от времени он сжимается
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        return self.lines[index]
+
+    def add(self, line: str):
+        """Добавляет команду (повтор предыдущей не записывается) и сразу дописывает её в файл."""
+        if not line or (self.lines and self.lines[-1] == line):
+            return
+        self.lines.append(line)
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                pass
+
+    def save(self):
+        """Перезаписывает файл через свой временный файл: два окна эмулятора не портят запись друг друга."""
+        if not self.path:
+            return
+        directory, name = os.path.split(os.path.abspath(self.path))
+        try:
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=name + ".",
+                                             suffix=".tmp", delete=False) as f:
+                try:
+                    f.writelines(line + "\n" for line in self.lines)
+                except BaseException:
+                    f.close()
+                    os.unlink(f.name)
+                    raise
+            os.replace(f.name, self.path)
+        except OSError:
+            pass
+
+    def search(self, query: str, before: int = None):
+        """Индекс самой новой строки, содержащей query, среди строк раньше before; None — нет."""
+        index = len(self.lines) if before is None else before
+        while index > 0:
+            index -= 1
+            if query in self.lines[index]:
+                return index
+        return None
@@ -0,0 +1,343 @@
+"""
+Интерпретатор команд эмулятора без графического интерфейса.
+
+ShellEngine выполняет строки команд над VFS и отдаёт результат через
+функцию вывода output(строка). Окно Tk (2_Config.py) передаёт сюда
+свой log(), пакетный запуск (headless.py) — запись в stdout.
+
+Каждая команда замеряется: stats хранит длительности по именам команд
+(команда stats выводит число вызовов и p50/p95/max), а при включённой
+трассировке (trace — список) туда пишется запись на каждую строку.
+Если задан profiler (cProfile.Profile), строки выполняются под ним.
+"""
+import json
+import os
+import pstats
+import re
+import shlex
+import time
+import xml.etree.ElementTree as ET
+
+import search
+from vfs import VFS, VFSError
+from vfs_snapshot import open_vfs, save_vfs
+
+
+class ShellEngine:
+    COMMANDS = ("ls", "cd", "pwd", "cat", "mkdir", "touch", "echo", "find", "grep",
+                "time", "stats", "save", "load", "exit")
+    LONG_COMMANDS = ("find", "grep")     # окно выполняет их в фоновом потоке
+
+    def __init__(self, output=print):
+        self.output = output
+        self.vfs = VFS()
+        self.running = True     # False после команды exit
+        self.stats = {}         # команда -> [длительность, с]
+        self.trace = None       # список записей трассировки, если включена
+        self.profiler = None    # cProfile.Profile, если включено профилирование
+        self.cancel = None      # threading.Event текущего run_lines — его проверяют find / grep
+        self._names = None      # search.NameIndex, строится при первом find
+        self._tokens = None     # search.TokenIndex, строится при первом grep -w
+        self._started = time.perf_counter()
+
+    # === Загрузка и сохранение VFS ===
+    def load_vfs(self, path):
+        """
+        vfs.xml или двоичный снимок (vfs_snapshot) — формат определяется по содержимому.
+        При ошибке остаётся прежняя VFS (при запуске — пустая).
+        """
+        if not path:
+            self.output("Создана виртуальная файловая система по умолчанию.")
+            vfs = VFS()
+        else:
+            try:
+                vfs = open_vfs(path)
+            except (OSError, ET.ParseError, VFSError) as e:
+                self.output(f"Ошибка загрузки VFS: {e}")
+                return self.vfs
+            self.output(f"VFS '{path}' успешно загружена "
+                        f"(каталогов: {vfs.dir_count}, файлов: {vfs.file_count}).")
+        self.vfs.close()
+        self.vfs = vfs
+        return vfs
+
+    def save_vfs(self, path):
+        """Сохранение в XML (путь *.xml) или в двоичный снимок (любой другой путь)."""
+        try:
+            count = save_vfs(self.vfs, path)
+        except (OSError, ET.ParseError, VFSError) as e:
+            self.output(f"Ошибка сохранения VFS: {e}")
+            return
+        self.output(f"VFS сохранена: {path} (узлов: {count}).")
+
+    # === Выполнение одной строки ===
+    def execute_line(self, line):
+        if self.profiler is not None:
+            self.profiler.runcall(self._execute_line, line)
+        else:
+            self._execute_line(line)
+
+    def is_long(self, line):
+        """Строка — find / grep (в том числе под time): окно выполняет её в рабочем потоке."""
+        try:
+            parts = shlex.split(os.path.expandvars(line))
+        except ValueError:
+            return False    # ошибку разбора выведет execute_line
+        while parts and parts[0] == "time":
+            parts = parts[1:]
+        return bool(parts) and parts[0] in self.LONG_COMMANDS
+
+    def _execute_line(self, line):
+        start = time.perf_counter()
+        line = os.path.expandvars(line)
+        try:
+            parts = shlex.split(line)     # кавычки как в shell: find / -name "*.txt"
+        except ValueError as e:
+            self.output(f"> {line}")
+            self.output(f"Ошибка разбора строки: {e}")
+            return
+        if not parts:
+            return
+        parsed = time.perf_counter()
+        self.output(f"> {line}")
+        self.dispatch(parts[0], parts[1:])
+        if self.trace is not None:
+            end = time.perf_counter()
+            self.trace.append({
+                "line": line,
+                "cmd": parts[0],
+                "start_ms": round((start - self._started) * 1000, 3),
+                "parse_ms": round((parsed - start) * 1000, 3),
+                "run_ms": round((end - parsed) * 1000, 3),
+            })
+
+    def dispatch(self, cmd, args):
+        """Выполняет команду и записывает её длительность в stats."""
+        start = time.perf_counter()
+        try:
+            self.run_command(cmd, args)
+        finally:
+            self.record(cmd, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        """Добавляет замер (команда или событие окна, например ui.flush)."""
+        samples = self.stats.get(name)
+        if samples is None:
+            samples = self.stats[name] = []
+        samples.append(seconds)
+
+    def run_command(self, cmd, args):
+        try:
+            if cmd == "ls":
+                self.output("  ".join(self.vfs.ls(args[0] if args else None)))
+            elif cmd == "cd":
+                self.output(f"Переход в каталог: {self.vfs.cd(args[0] if args else '/')}")
+            elif cmd == "pwd":
+                self.output(self.vfs.cwd)
+            elif cmd == "cat":
+                if not args:
+                    self.output("Ошибка: cat требует имя файла")
+                for name in args:
+                    # output() сам добавляет перевод строки — завершающий "\n" файла не дублируется
+                    self.output(self.vfs.cat(name).removesuffix("\n"))
+            elif cmd in ("mkdir", "touch"):
+                if not args:
+                    self.output(f"Ошибка: {cmd} требует путь")
+                for name in args:
+                    getattr(self.vfs, cmd)(name)
+            elif cmd == "find":
+                self.find(args)
+            elif cmd == "grep":
+                self.grep(args)
+            elif cmd == "echo" and (">" in args or ">>" in args):
+                # echo текст > файл (>> — дописать в конец)
+                i = next(i for i, arg in enumerate(args) if arg in (">", ">>"))
+                if len(args) != i + 2:
+                    self.output(f"Ошибка: после {args[i]} нужен ровно один файл")
+                else:
+                    self.vfs.write(args[i + 1], " ".join(args[:i]) + "\n", append=args[i] == ">>")
+            else:
+                self.execute_builtin(cmd, args)
+        except VFSError as e:
+            self.output(f"Ошибка: {cmd}: {e}")
+
+    # === Поиск ===
+    def name_index(self):
+        if self._names is None or self._names.vfs is not self.vfs:
+            self._names = search.NameIndex(self.vfs)
+        return self._names
+
+    def token_index(self):
+        if self._tokens is None or self._tokens.vfs is not self.vfs:
+            self._tokens = None     # недостроенный (прерванный) индекс не сохраняется
+            self._tokens = search.TokenIndex(self.vfs, self.cancel)
+        return self._tokens
+
+    def find(self, args):
+        """find [путь] [-name маска] [-type f|d]"""
+        start, pattern, kind = None, None, None
+        i = 0
+        while i < len(args):
+            if args[i] in ("-name", "-type") and i + 1 < len(args):
+                if args[i] == "-name":
+                    pattern = args[i + 1]
+                elif args[i + 1] in ("f", "d"):
+                    kind = args[i + 1]
+                else:
+                    self.output(f"Ошибка: find: неверный тип '{args[i + 1]}' (нужен f или d)")
+                    return
+                i += 2
+            elif start is None and not args[i].startswith("-"):
+                start = args[i]
+                i += 1
+            else:
+                self.output(f"Ошибка: find: неверный аргумент '{args[i]}'")
+                return
+        root = self.vfs.abspath(start)
+        self.vfs.lookup(start)
+        try:
+            paths = search.find(self.vfs, self.name_index(), root, pattern, kind, self.cancel)
+        except search.Cancelled:
+            self.output("Прервано: find")
+            return
+        for path in paths:
+            self.output(path)
+
+    def grep(self, args):
+        """grep [-i] [-w] [-l] шаблон [путь] — регулярное выражение по содержимому файлов."""
+        flags = set()
+        while args and args[0] in ("-i", "-w", "-l"):
+            flags.add(args[0])
+            args = args[1:]
+        if len(args) not in (1, 2):
+            self.output("Ошибка: grep требует шаблон и, по желанию, путь")
+            return
+        pattern = args[0]
+        source = rf"\b(?:{pattern})\b" if "-w" in flags else pattern
+        try:
+            regex = re.compile(source, re.IGNORECASE if "-i" in flags else 0)
+        except re.error as e:
+            self.output(f"Ошибка: grep: неверное выражение: {e}")
+            return
+        start = args[1] if len(args) == 2 else None
+        root = self.vfs.abspath(start)
+        self.vfs.lookup(start)      # путь может быть и файлом — тогда ищем только в нём
+        try:
+            word = search.word_pattern(pattern) if "-w" in flags else None
+            tokens = self.token_index() if word is not None else None
+            last = None
+            for path, line in search.grep(self.vfs, root, regex, tokens, word, self.cancel):
+                if "-l" in flags:
+                    if path != last:
+                        self.output(path)
+                    last = path
+                else:
+                    self.output(f"{path}:{line}")
+        except search.Cancelled:
+            self.output("Прервано: grep")
+
+    # === Команды, не работающие с VFS ===
+    def execute_builtin(self, cmd, args):
+        if cmd == "exit":
+            self.output("Выход из эмулятора.")
+            self.running = False
+        elif cmd == "echo":
+            self.output(" ".join(args))
+        elif cmd == "time":
+            if not args:
+                self.output("Ошибка: time требует команду")
+                return
+            start = time.perf_counter()
+            self.dispatch(args[0], args[1:])
+            self.output(f"real {(time.perf_counter() - start) * 1000:.3f} мс")
+        elif cmd == "stats":
+            if args == ["reset"]:
+                self.stats.clear()
+                self.output("Статистика команд сброшена.")
+            else:
+                for row in self.stats_report():
+                    self.output(row)
+        elif cmd in ("save", "load"):
+            if len(args) != 1:
+                self.output(f"Ошибка: {cmd} требует путь к файлу VFS")
+            elif cmd == "save":
+                self.save_vfs(args[0])
+            else:
+                self.load_vfs(args[0])
+        else:
+            self.output(f"Ошибка: неизвестная команда '{cmd}'")
+
+    # === Статистика и отчёты ===
+    def stats_report(self):
+        """Строки таблицы: команда, число вызовов, p50 / p95 / max в миллисекундах."""
+        if not self.stats:
+            return ["Статистика пуста: команды ещё не выполнялись."]
+        rows = [f"{'команда':<12}{'вызовов':>9}{'p50, мс':>11}{'p95, мс':>11}{'max, мс':>11}"]
+        for name, samples in sorted(list(self.stats.items()), key=lambda item: -sum(item[1])):
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            p50 = ordered[round(0.50 * last)] * 1000
+            p95 = ordered[round(0.95 * last)] * 1000
+            rows.append(f"{name:<12}{len(ordered):>9}{p50:>11.3f}{p95:>11.3f}{ordered[-1] * 1000:>11.3f}")
+        return rows
+
+    def write_reports(self, profile_path=None, trace_path=None, out=None):
+        """Сохраняет профиль (pstats) и трассировку (JSON); сводку профиля пишет в out."""
+        if profile_path and self.profiler is not None:
+            self.profiler.dump_stats(profile_path)
+            if out is not None:
+                out.write(f"Профиль сохранён: {profile_path}\n")
+                pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(15)
+        if trace_path and self.trace is not None:
+            with open(trace_path, "w", encoding="utf-8") as f:
+                json.dump({"commands": self.trace, "stats": {
+                    name: {"count": len(samples), "total_ms": round(sum(samples) * 1000, 3)}
+                    for name, samples in self.stats.items()}}, f, ensure_ascii=False, indent=1)
+            if out is not None:
+                out.write(f"Трассировка сохранена: {trace_path} (записей: {len(self.trace)})\n")
+
+    # === Выполнение скрипта ===
+    def run_lines(self, lines, cancel=None, progress=None):
+        """
+        Выполняет строки по очереди (пустые и комментарии пропускаются) до exit.
+        cancel — threading.Event: проверяется перед каждой командой.
+        progress(n, total) вызывается перед n-й командой; для подсчёта total
+        строки читаются заранее, без progress — потоково (удобно для stdin).
+        Возвращает False, если выполнение прервано через cancel.
+        """
+        total = None
+        if progress is not None:
+            lines = [line.strip() for line in lines]
+            total = sum(1 for line in lines if line and not line.startswith("#"))
+        self.cancel = cancel
+        try:
+            return self._run_lines(lines, cancel, progress, total)
+        finally:
+            self.cancel = None
+
+    def _run_lines(self, lines, cancel, progress, total):
+        n = 0
+        for line in lines:
+            if not self.running:
+                break
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if cancel is not None and cancel.is_set():
+                self.output(f"Скрипт прерван: выполнено команд {n}" + (f" из {total}." if total else "."))
+                return False
+            n += 1
+            if progress is not None:
+                progress(n, total)
+            self.execute_line(line)
+        return True
+
+    def run_script(self, script_path, cancel=None, progress=None):
+        """Стартовый скрипт; ошибка чтения выводится, а не выбрасывается. Возвращает успех."""
+        self.output(f"Выполнение стартового скрипта: {script_path}")
+        try:
+            with open(script_path, "r", encoding="utf-8") as file:
+                return self.run_lines(file, cancel, progress)
+        except (OSError, UnicodeDecodeError) as e:
+            self.output(f"Ошибка выполнения скрипта: {e}")
+            return False
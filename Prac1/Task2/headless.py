@@ -0,0 +1,47 @@
+"""
+Пакетный запуск эмулятора без окна: вывод идёт в stdout.
+
+    python3 headless.py [vfs.xml] [скрипт | -]
+
+Без скрипта (или с "-") команды читаются из stdin, например
+    printf 'ls\ncd home\ncat readme.txt\n' | python3 headless.py vfs.xml
+Подходит для CI и серверов без дисплея: tkinter не импортируется.
+
+    --profile FILE   выполнить под cProfile, сохранить профиль (pstats), сводку — в stderr
+    --trace FILE     записать трассировку команд в JSON (время разбора и выполнения)
+"""
+import argparse
+import cProfile
+import sys
+
+from engine import ShellEngine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Эмулятор командной оболочки без окна")
+    parser.add_argument("vfs_path", nargs="?", help="vfs.xml или снимок VFS")
+    parser.add_argument("script_path", nargs="?", default="-", help="Скрипт команд ('-' — stdin)")
+    parser.add_argument("--profile", metavar="FILE", help="Профиль cProfile (pstats)")
+    parser.add_argument("--trace", metavar="FILE", help="Трассировка команд в JSON")
+    args = parser.parse_args(argv)
+
+    write = sys.stdout.write
+    engine = ShellEngine(output=lambda msg: write(msg + "\n"))
+    if args.profile:
+        engine.profiler = cProfile.Profile()
+    if args.trace:
+        engine.trace = []
+    engine.output(f"Эмулятор запущен. Имя VFS: {args.vfs_path or 'default_vfs'}")
+    engine.load_vfs(args.vfs_path)
+    if args.script_path == "-":
+        ok = engine.run_lines(sys.stdin)
+    else:
+        ok = engine.run_script(args.script_path)
+    sys.stdout.flush()
+    engine.write_reports(args.profile, args.trace, sys.stderr)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Поиск по VFS: find (по имени и типу) и grep (по содержимому файлов).
+
+Индексы строятся при первом запросе и дальше обновляются по событиям
+VFS.listeners, без повторного обхода дерева:
+    NameIndex  — имя -> пути узлов с этим именем. Точное имя находится
+                 одним обращением к словарю, маска (*.txt) проверяется по
+                 уникальным именам, а не по всем путям.
+    TokenIndex — слово -> файлы, где оно встречается (обратный индекс).
+                 Нужен только grep -w по одному слову: вместо чтения всех
+                 файлов проверяются лишь файлы из индекса.
+Длинные проходы проверяют cancel (threading.Event) каждые CHECK_EVERY файлов.
+Результаты идут в порядке дерева (каталог раньше содержимого, соседи по
+имени) — одинаково с индексом и без него.
+"""
+import fnmatch
+import re
+
+from vfs import VDir, VFile
+
+CHECK_EVERY = 1024          # как часто проход проверяет отмену
+_TOKEN_RE = re.compile(r"\w+")
+_WORD_RE = re.compile(r"\w+$")
+
+
+class Cancelled(Exception):
+    """Проход остановлен через cancel."""
+
+
+def _check(cancel, n):
+    if cancel is not None and n % CHECK_EVERY == 0 and cancel.is_set():
+        raise Cancelled()
+
+
+def _under(path: str, start: str) -> bool:
+    return start == "/" or path == start or path.startswith(start + "/")
+
+
+def _tree_key(path: str) -> list:
+    """Ключ порядка дерева: каталог раньше своего содержимого, соседи — по имени."""
+    return path.split("/")
+
+
+# === Индекс имён ===
+class NameIndex:
+    def __init__(self, vfs):
+        self.vfs = vfs
+        self.names = {}         # имя -> [путь, ...]
+        for path, node in vfs.nodes.items():
+            if path != "/":
+                self.names.setdefault(node.name, []).append(path)
+        vfs.listeners.append(self._on_change)
+
+    def _on_change(self, event, path, node):
+        if event == "add":
+            self.names.setdefault(node.name, []).append(path)
+
+    def match(self, pattern: str) -> list:
+        """Пути узлов, имя которых подходит под маску (fnmatch, с учётом регистра)."""
+        if not any(c in pattern for c in "*?["):
+            return list(self.names.get(pattern, ()))
+        test = re.compile(fnmatch.translate(pattern)).match
+        return [path for name, paths in self.names.items() if test(name) for path in paths]
+
+
+def find(vfs, names: NameIndex, start: str, pattern=None, kind=None, cancel=None) -> list:
+    """
+    Пути под start (включая сам start) по маске имени и типу: "f" — файлы, "d" — каталоги.
+    С маской кандидаты берутся из индекса имён, без маски — обход поддерева.
+    """
+    if pattern is not None:
+        pairs = ((path, vfs.nodes[path]) for path in names.match(pattern) if _under(path, start))
+    else:
+        pairs = _walk(vfs, start)
+    result = []
+    for n, (path, node) in enumerate(pairs):
+        _check(cancel, n)
+        if kind == "f" and not isinstance(node, VFile) or kind == "d" and not isinstance(node, VDir):
+            continue
+        result.append(path)
+    result.sort(key=_tree_key)
+    return result
+
+
+def _walk(vfs, start: str):
+    node = vfs.nodes[start]
+    stack = [(start, node)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node
+        if isinstance(node, VDir):
+            prefix = path if path == "/" else path + "/"
+            stack.extend((prefix + name, child) for name, child in reversed(node.children.items()))
+
+
+# === Обратный индекс слов ===
+class TokenIndex:
+    def __init__(self, vfs, cancel=None):
+        self.vfs = vfs
+        self.files = {}         # слово (в нижнем регистре) -> {путь файла}
+        self.tokens = {}        # путь файла -> слова файла (для обновления при записи)
+        files = ((path, node) for path, node in vfs.nodes.items() if isinstance(node, VFile))
+        for n, (path, text) in enumerate(vfs.texts(files)):
+            _check(cancel, n)
+            self._add(path, text)
+        vfs.listeners.append(self._on_change)
+
+    def _add(self, path: str, text: str):
+        tokens = frozenset(_TOKEN_RE.findall(text.lower()))
+        self.tokens[path] = tokens
+        for token in tokens:
+            self.files.setdefault(token, set()).add(path)
+
+    def _on_change(self, event, path, node):
+        if not isinstance(node, VFile):
+            return
+        for token in self.tokens.pop(path, ()):
+            self.files[token].discard(path)
+        self._add(path, node.text or "")
+
+    def lookup(self, word: str) -> set:
+        return self.files.get(word.lower(), set())
+
+
+def grep(vfs, start: str, regex, tokens: TokenIndex = None, word=None, cancel=None):
+    """
+    Совпадающие строки файлов под start: выдаёт (путь, строка) в порядке дерева.
+    Если задан word и индекс tokens, читаются только файлы, где это слово есть.
+    """
+    if tokens is not None and word is not None:
+        paths = [path for path in tokens.lookup(word) if _under(path, start)]
+    else:
+        paths = [path for path, node in _walk(vfs, start) if isinstance(node, VFile)]
+    paths.sort(key=_tree_key)
+    files = ((path, vfs.nodes[path]) for path in paths)
+    for n, (path, text) in enumerate(vfs.texts(files)):
+        _check(cancel, n)
+        if regex.search(text) is None:
+            continue
+        for line in text.splitlines():
+            if regex.search(line):
+                yield path, line
+
+
+def word_pattern(pattern: str):
+    """Слово для обратного индекса, если шаблон grep -w — одно слово без метасимволов; иначе None."""
+    return pattern if _WORD_RE.match(pattern) else None
@@ -0,0 +1,320 @@
+"""
+Виртуальная файловая система эмулятора.
+
+Дерево хранится в компактных узлах (__slots__): каталог — словарь
+детей по имени, файл — смещение своего тега в vfs.xml. Дополнительно
+ведётся словарь "абсолютный путь -> узел", поэтому cd / ls / cat находят
+узел одним обращением к словарю, без обхода XML.
+
+Загрузка идёт через ET.iterparse: каждый обработанный элемент сразу
+очищается, так что даже vfs.xml на сотни тысяч файлов читается
+с ограниченной памятью. Текст файлов при загрузке не сохраняется —
+запоминается байтовое смещение тега <file> (поиск по mmap того же файла),
+а содержимое разбирается из этого фрагмента при первом cat.
+
+Дерево можно менять (mkdir / touch / write); подписчики из listeners
+получают каждое изменение — так индексы (дополнение путей и т.п.)
+обновляются точечно, без повторного обхода VFS.
+"""
+import mmap
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+
+# Комментарии и CDATA тоже находятся, чтобы "<file" внутри них не сбивал счёт тегов
+_FILE_TAG = re.compile(rb"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<file(?=[\s/>])", re.S)
+_FILE_END = b"</file>"
+
+
+class VFSError(Exception):
+    """Ошибка операции с VFS (сообщение выводится пользователю как есть)."""
+
+
+class VDir:
+    __slots__ = ("name", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.children = {}      # имя -> VDir / VFile, в порядке описания в XML
+
+
+class VFile:
+    __slots__ = ("name", "offset", "length", "text")
+
+    def __init__(self, name, offset=None, text=None, length=None):
+        self.name = name
+        self.offset = offset    # смещение "<file" в vfs.xml или тела в снимке; None — нет
+        self.length = length    # длина тела в снимке (для XML — None)
+        self.text = text        # None — ещё не прочитан
+
+
+class VFS:
+    def __init__(self, source=None):
+        self.source = source
+        self.blob = None        # memoryview содержимого файлов снимка (vfs_snapshot)
+        self.root = VDir("/")
+        self.nodes = {"/": self.root}
+        self.cwd = "/"
+        self.dir_count = 1
+        self.file_count = 0
+        self.listeners = []     # listener(событие, путь, узел): "add" — новый узел, "write" — новый текст файла
+
+    # === Загрузка ===
+    @classmethod
+    def load(cls, path: str) -> "VFS":
+        """
+        Строит VFS из XML вида <root><dir name=".."><file name="..">текст</file></dir></root>.
+        Ошибки разбора (ET.ParseError, OSError) передаются вызывающему коду.
+        """
+        vfs = cls(path)
+        with open(path, "rb") as raw:
+            try:
+                data = mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                data = b""      # пустой файл — iterparse сообщит об ошибке
+            offsets = (m.start() for m in _FILE_TAG.finditer(data) if m.group().startswith(b"<file"))
+            try:
+                in_sync = vfs._build(path, offsets)
+                if in_sync and next(offsets, None) is not None:
+                    in_sync = False
+            finally:
+                offsets.close()     # освобождает буфер mmap до его закрытия
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        if not in_sync:
+            # Число тегов не совпало с разбором (например, "<file" в инструкции
+            # обработки) — смещения ненадёжны, текст найдёт повторный разбор (_scan_text)
+            for node in vfs.nodes.values():
+                if isinstance(node, VFile):
+                    node.offset = None
+        return vfs
+
+    def _build(self, path: str, offsets) -> bool:
+        """Один проход iterparse; возвращает False, если смещения разошлись с тегами."""
+        stack = []              # (элемент, каталог, префикс пути "/a/b/"); каталог None — вне дерева
+        in_sync = True
+        nodes = self.nodes
+        offset = None
+        for event, elem in ET.iterparse(path, events=("start", "end")):
+            if event == "end":
+                stack.pop()
+                elem.clear()
+                if stack:
+                    stack[-1][0].clear()    # обработанные дети больше не нужны
+                continue
+
+            tag = elem.tag
+            if tag == "file":
+                offset = next(offsets, None)
+                if offset is None:
+                    in_sync = False
+            if not stack:
+                stack.append((elem, self.root, "/"))
+                continue
+            _, parent, prefix = stack[-1]
+            if parent is None or (tag != "dir" and tag != "file"):
+                stack.append((elem, None, None))
+                continue
+
+            name = elem.get("name")
+            if not name or "/" in name or name == "." or name == "..":
+                raise VFSError(f"неверное имя элемента <{tag}>: '{name}'")
+            if name in parent.children:
+                raise VFSError(f"повторяющийся путь: {prefix + name}")
+            node_path = prefix + name
+            if tag == "dir":
+                node = VDir(name)
+                self.dir_count += 1
+                stack.append((elem, node, node_path + "/"))
+            else:
+                node = VFile(name, offset)
+                self.file_count += 1
+                stack.append((elem, None, None))
+            parent.children[name] = node
+            nodes[node_path] = node
+        return in_sync
+
+    # === Пути ===
+    def abspath(self, path: str = None) -> str:
+        if not path:
+            return self.cwd
+        path = posixpath.normpath(posixpath.join(self.cwd, path))
+        return "/" + path.lstrip("/")
+
+    def lookup(self, path: str = None):
+        node = self.nodes.get(self.abspath(path))
+        if node is None:
+            raise VFSError(f"нет такого файла или каталога: {path}")
+        return node
+
+    # === Команды ===
+    def cd(self, path: str = None) -> str:
+        target = self.abspath(path or "/")
+        node = self.nodes.get(target)
+        if node is None:
+            raise VFSError(f"нет такого каталога: {path}")
+        if not isinstance(node, VDir):
+            raise VFSError(f"не является каталогом: {path}")
+        self.cwd = target
+        return target
+
+    def ls(self, path: str = None) -> list:
+        """Имена детей каталога; каталоги — с "/" на конце."""
+        node = self.lookup(path)
+        if isinstance(node, VFile):
+            return [node.name]
+        return [name + "/" if isinstance(child, VDir) else name
+                for name, child in node.children.items()]
+
+    def cat(self, path: str) -> str:
+        node = self.lookup(path)
+        if isinstance(node, VDir):
+            raise VFSError(f"это каталог: {path}")
+        text = self.file_text(node, self.abspath(path))
+        if node.length is None:
+            node.text = text    # из снимка текст читается заново без копии в узле
+        return text
+
+    # === Изменение дерева ===
+    def _notify(self, event: str, path: str, node):
+        for listener in self.listeners:
+            listener(event, path, node)
+
+    def _add(self, path: str, node):
+        """Вставляет новый узел по абсолютному пути path (родитель должен существовать)."""
+        parent_path, _, name = path.rpartition("/")
+        parent = self.nodes.get(parent_path or "/")
+        if not isinstance(parent, VDir):
+            raise VFSError(f"нет такого каталога: {parent_path or '/'}")
+        node.name = name
+        parent.children[name] = node
+        self.nodes[path] = node
+        if isinstance(node, VDir):
+            self.dir_count += 1
+        else:
+            self.file_count += 1
+        self._notify("add", path, node)
+        return node
+
+    def mkdir(self, path: str) -> str:
+        target = self.abspath(path)
+        if target in self.nodes:
+            raise VFSError(f"уже существует: {path}")
+        self._add(target, VDir(""))
+        return target
+
+    def touch(self, path: str) -> str:
+        """Создаёт пустой файл; существующий узел не меняется."""
+        target = self.abspath(path)
+        if target not in self.nodes:
+            self._add(target, VFile("", text=""))
+        return target
+
+    def write(self, path: str, text: str, append: bool = False) -> str:
+        """Записывает текст в файл (append — дописывает), при необходимости создаёт его."""
+        target = self.abspath(path)
+        node = self.nodes.get(target)
+        if node is None:
+            self._add(target, VFile("", text=text))
+            return target
+        if isinstance(node, VDir):
+            raise VFSError(f"это каталог: {path}")
+        if append:
+            text = self.file_text(node, target) + text
+        node.text = text
+        node.offset = node.length = None    # тело больше не берётся из vfs.xml или снимка
+        self._notify("write", target, node)
+        return target
+
+    def walk(self):
+        """Все узлы в прямом порядке (порядок описания в XML): (путь, узел)."""
+        stack = [("/", self.root)]
+        while stack:
+            path, node = stack.pop()
+            yield path, node
+            if isinstance(node, VDir):
+                prefix = path if path == "/" else path + "/"
+                stack.extend((prefix + name, child) for name, child in reversed(node.children.items()))
+
+    def close(self):
+        """Освобождает отображение снимка (тексты, уже прочитанные cat, остаются)."""
+        if self.blob is not None:
+            self.blob.release()
+            self.blob = None
+
+    # === Ленивое чтение текста ===
+    def texts(self, files):
+        """(путь, текст) для пар (путь, VFile); vfs.xml отображается в память один раз на весь проход."""
+        data = None
+        if self.source is not None and self.blob is None:
+            with open(self.source, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for path, node in files:
+                yield path, self.file_text(node, path, data)
+        finally:
+            if data is not None:
+                data.close()
+
+    def read_bytes(self, node: VFile):
+        """Тело файла снимка без копирования (memoryview) или None, если файл не из снимка."""
+        if self.blob is None or node.length is None or node.text is not None:
+            return None
+        return self.blob[node.offset:node.offset + node.length]
+
+    def file_text(self, node: VFile, path: str, data=None) -> str:
+        """Текст файла без кэширования в узле; data — уже открытый mmap vfs.xml."""
+        if node.text is not None:
+            return node.text
+        body = self.read_bytes(node)
+        if body is not None:
+            return str(body, "utf-8")
+        if node.length is not None:
+            raise VFSError(f"снимок VFS закрыт: {path}")
+        if self.source is None:
+            return ""
+        if node.offset is not None:
+            text = self._fragment_text(node, data)
+            if text is not None:
+                return text
+        return self._scan_text(path)
+
+    def _fragment_text(self, node: VFile, data=None):
+        """Разбирает только фрагмент <file ...>...</file> по смещению; None — не совпал."""
+        if data is None:
+            with open(self.source, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    return self._fragment_text(node, data)
+                finally:
+                    data.close()
+        tag_end = data.find(b">", node.offset)
+        if tag_end < 0:
+            return None
+        if data[tag_end - 1:tag_end] == b"/":
+            fragment = data[node.offset:tag_end + 1]
+        else:
+            end = data.find(_FILE_END, tag_end)
+            if end < 0:
+                return None
+            fragment = data[node.offset:end + len(_FILE_END)]
+        try:
+            elem = ET.fromstring(fragment)
+        except ET.ParseError:
+            return None
+        if elem.get("name") != node.name:
+            return None
+        return elem.text or ""
+
+    def _scan_text(self, path: str) -> str:
+        """Запасной путь: повторный потоковый разбор до нужного файла."""
+        names = []
+        for event, elem in ET.iterparse(self.source, events=("start", "end")):
+            if event == "start":
+                names.append(elem.get("name", "") if names else "")
+                continue
+            if elem.tag == "file" and "/".join(names) == path:
+                return elem.text or ""
+            names.pop()
+            elem.clear()
+        raise VFSError(f"содержимое файла не найдено: {path}")
@@ -0,0 +1,218 @@
+"""
+Двоичный снимок VFS и преобразование XML <-> снимок.
+
+Формат (порядок байт little-endian):
+    заголовок   MAGIC, число узлов, длина блока имён, длина блока содержимого
+    таблица     по записи на узел в прямом порядке обхода (родитель раньше детей):
+                индекс родителя, вид (0 — каталог, 1 — файл),
+                смещение и длина тела файла в блоке содержимого
+    имена       имена узлов в том же порядке через "\0" (utf-8; в XML "\0" недопустим)
+    содержимое  тела файлов подряд (utf-8)
+Узел 0 — корень. При загрузке строится обычное дерево VFS, а файл
+снимка отображается в память (mmap): cat читает тело прямо из
+отображения, текст при загрузке не читается и не копируется.
+
+Запуск как скрипта — преобразование по расширению:
+    python3 vfs_snapshot.py vfs.xml vfs.snap     XML -> снимок
+    python3 vfs_snapshot.py vfs.snap vfs.xml     снимок -> XML
+"""
+import mmap
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from vfs import VFS, VDir, VFile, VFSError
+
+MAGIC = b"VFSSNAP1"
+_HEADER = struct.Struct("<8sIQQ")
+_ENTRY = struct.Struct("<IBxxxQQ")
+_KIND_DIR, _KIND_FILE = 0, 1
+
+
+def is_snapshot(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# === Сохранение ===
+def save_snapshot(vfs: VFS, path: str) -> int:
+    """
+    Записывает снимок; возвращает число узлов. Содержимое файлов пишется
+    по одному, сразу во временный файл, и в память целиком не собирается.
+    """
+    entries = []
+    names = []
+    index = {}
+    tmp_path = path + ".tmp"
+    data = None
+    if vfs.source is not None and vfs.blob is None:
+        # Файлы из vfs.xml: одно отображение на все чтения фрагментов
+        with open(vfs.source, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        with open(tmp_path + ".blob", "wb") as blob:
+            content_len = 0
+            for node_path, node in vfs.walk():
+                index[node_path] = len(entries)
+                parent = 0 if node_path == "/" else index[node_path.rsplit("/", 1)[0] or "/"]
+                names.append("" if node_path == "/" else node.name)
+                if isinstance(node, VDir):
+                    entries.append((parent, _KIND_DIR, 0, 0))
+                else:
+                    body = vfs.read_bytes(node)
+                    if body is None:
+                        body = vfs.file_text(node, node_path, data).encode("utf-8")
+                    blob.write(body)
+                    entries.append((parent, _KIND_FILE, content_len, len(body)))
+                    content_len += len(body)
+        names = "\0".join(names).encode("utf-8")
+        with open(tmp_path, "wb") as out:
+            out.write(_HEADER.pack(MAGIC, len(entries), len(names), content_len))
+            for entry in entries:
+                out.write(_ENTRY.pack(*entry))
+            out.write(names)
+            with open(tmp_path + ".blob", "rb") as blob:
+                while True:
+                    chunk = blob.read(1 << 20)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if data is not None:
+            data.close()
+        if os.path.exists(tmp_path + ".blob"):
+            os.remove(tmp_path + ".blob")
+    return len(entries) - 1
+
+
+def save_xml(vfs: VFS, path: str) -> int:
+    """Записывает VFS в схему vfs.xml (<root>, <dir name>, <file name>текст</file>)."""
+    count = 0
+    data = None
+    if vfs.source is not None and vfs.blob is None:
+        with open(vfs.source, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as out:
+            out.write('<?xml version="1.0" encoding="UTF-8"?>\n<root>\n')
+            depth = {"/": 0}
+            open_dirs = ["/"]
+            for node_path, node in vfs.walk():
+                if node_path == "/":
+                    continue
+                parent = node_path.rsplit("/", 1)[0] or "/"
+                while open_dirs[-1] != parent:
+                    closed = open_dirs.pop()
+                    out.write("    " * depth[closed] + "</dir>\n")
+                level = depth[parent] + 1
+                indent = "    " * level
+                if isinstance(node, VDir):
+                    out.write(f"{indent}<dir name={quoteattr(node.name)}>\n")
+                    depth[node_path] = level
+                    open_dirs.append(node_path)
+                else:
+                    text = vfs.file_text(node, node_path, data)
+                    out.write(f"{indent}<file name={quoteattr(node.name)}>{escape(text)}</file>\n")
+                count += 1
+            while len(open_dirs) > 1:
+                out.write("    " * depth[open_dirs.pop()] + "</dir>\n")
+            out.write("</root>\n")
+        os.replace(path + ".tmp", path)
+    finally:
+        if data is not None:
+            data.close()
+    return count
+
+
+# === Загрузка ===
+def load_snapshot(path: str) -> VFS:
+    """
+    Строит VFS из снимка. Тела файлов не читаются: VFS.blob — memoryview
+    на отображённый файл, VFile хранит смещение и длину тела.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    try:
+        magic, count, names_len, content_len = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise VFSError(f"не снимок VFS: {path}")
+        table_start = _HEADER.size
+        names_start = table_start + count * _ENTRY.size
+        content_start = names_start + names_len
+        if count == 0 or content_start + content_len > len(data):
+            raise VFSError(f"снимок повреждён: {path}")
+        names = str(view[names_start:content_start], "utf-8").split("\0")
+        if len(names) != count:
+            raise VFSError(f"снимок повреждён: {path}")
+        vfs = VFS(path)
+        prefixes = {0: "/"}             # индекс каталога -> префикс пути "/a/b/"
+        dirs = {0: vfs.root}
+        nodes = vfs.nodes
+        files = 0
+        table = view[table_start:names_start]
+        for i, (parent, kind, offset, length) in enumerate(_ENTRY.iter_unpack(table)):
+            if i == 0:
+                continue
+            name = names[i]
+            parent_dir = dirs.get(parent) if parent < i else None
+            if parent_dir is None:
+                raise VFSError(f"снимок повреждён: неверный родитель узла {i}")
+            node_path = prefixes[parent] + name
+            if kind == _KIND_DIR:
+                node = dirs[i] = VDir(name)
+                prefixes[i] = node_path + "/"
+            else:
+                node = VFile(name, offset, length=length)
+                files += 1
+            parent_dir.children[name] = node
+            nodes[node_path] = node
+        table.release()
+        vfs.file_count = files
+        vfs.dir_count = len(dirs)
+    except (struct.error, UnicodeDecodeError, IndexError) as e:
+        view.release()
+        data.close()
+        raise VFSError(f"снимок повреждён: {path} ({e})")
+    except VFSError:
+        view.release()
+        data.close()
+        raise
+    vfs.blob = view[content_start:content_start + content_len]
+    view.release()
+    return vfs
+
+
+def open_vfs(path: str) -> VFS:
+    """Загружает VFS из снимка или из XML — формат определяется по содержимому."""
+    return load_snapshot(path) if is_snapshot(path) else VFS.load(path)
+
+
+def save_vfs(vfs: VFS, path: str) -> int:
+    """Сохраняет в XML (расширение .xml) или в двоичный снимок (иначе)."""
+    if path.lower().endswith(".xml"):
+        return save_xml(vfs, path)
+    return save_snapshot(vfs, path)
+
+
+# === Преобразование из командной строки ===
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Использование: python3 vfs_snapshot.py <исходный vfs.xml|снимок> <результат .xml|снимок>")
+        sys.exit(1)
+    source, target = argv
+    try:
+        vfs = open_vfs(source)
+        count = save_vfs(vfs, target)
+    except (OSError, ET.ParseError, VFSError) as e:
+        print(f"Ошибка преобразования VFS: {e}")
+        sys.exit(1)
+    print(f"Записано узлов: {count} ({source} -> {target})")
+
+
+if __name__ == "__main__":
+    main()
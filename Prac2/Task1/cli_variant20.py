@@ -1,20 +1,24 @@
 import argparse
+import os
 import sys
-import re
+
+# Общий пакет aptdeps лежит в Prac2/aptdeps
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps.validate import PACKAGE_NAME, SHORT_VERSION, is_url
 
 def validate_args(args):
     errors = []
 
     # Проверяем package
-    if not re.match(r"^[a-zA-Z0-9._-]+$", args.package):
+    if not PACKAGE_NAME.match(args.package):
         errors.append("Недопустимое имя пакета (--package).")
 
     # Проверяем repo (должен начинаться с http:// или https://)
-    if not (args.repo.startswith("http://") or args.repo.startswith("https://")):
+    if not is_url(args.repo):
         errors.append("Параметр --repo должен быть ссылкой на APT-репозиторий (http или https).")
 
     # Проверяем версию (цифры и точки)
-    if not re.match(r"^[0-9]+(\.[0-9]+)*$", args.version):
+    if not SHORT_VERSION.match(args.version):
         errors.append("Неверный формат версии (--version). Пример: 1.0 или 6.2")
 
     # Проверяем глубину (целое число >=1)
@@ -28,15 +32,15 @@ def validate_args(args):
         sys.exit(1)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Этап 1 — Минимальный CLI-прототип (вариант 20)")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Этап 1 — Минимальный CLI-прототип (вариант 20)")
     parser.add_argument("--package", required=True, help="Имя анализируемого пакета")
     parser.add_argument("--repo", required=True, help="APT-репозиторий Ubuntu (пример: http://ru.archive.ubuntu.com/ubuntu)")
     parser.add_argument("--test", action="store_true", help="Режим тестирования")
     parser.add_argument("--version", required=True, help="Версия пакета (пример: 6.2)")
     parser.add_argument("--depth", type=int, default=1, help="Максимальная глубина анализа")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     validate_args(args)
 
     print("=== Настройки анализа ===")
@@ -1,17 +1,99 @@
 import argparse
+import contextlib
 import sys
 import re
-import gzip
+import time
 import os  # [ДОБАВЛЕНО] для проверки существования локальных файлов
-from urllib.request import urlopen, Request
-from urllib.error import HTTPError, URLError
 
+# Общий пакет aptdeps лежит уровнем выше (Prac2/aptdeps)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps import client, metrics, validate
+from aptdeps.packages import (open_packages_stream, iter_stanzas, find_stanza, split_depends, resolve_batch,
+                              url_error, DEFAULT_SUITES, DEFAULT_COMPONENTS, DEFAULT_ARCH, DEFAULT_JOBS)
 
-def fetch_package_info(repo_url: str, package_name: str, version: str) -> str:
+# Модули режимов (индекс, граф, разрешение, кэш загрузок, параллельная
+# загрузка индексов), а также urllib, gzip и json импортируются в тех
+# режимах, где нужны (см. aptdeps.cli)
+
+
+def resolve_source(repo_url: str, cache_dir: str = None) -> str:
+    """
+    Если задан каталог кэша, удалённый Packages загружается через кэш
+    с условными запросами и дальше читается как локальный файл.
+    """
+    if not cache_dir or not repo_url.startswith("http"):
+        return repo_url
+    from aptdeps.cache import cached_packages_file
+    try:
+        with metrics.phase("cache") as info:
+            path = cached_packages_file(repo_url, cache_dir)
+            info["bytes"] = metrics.file_size(path)
+        return path
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason}")
+        sys.exit(1)
+    except url_error("URLError") as e:
+        print(f"Ошибка соединения: {e.reason}")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Ошибка кэша загрузок: {e}")
+        sys.exit(1)
+
+
+def fetch_merged_index(args) -> str:
+    """
+    Загружает индексы всех --suites × --components параллельно и объединяет
+    их с приоритетом карманов (security > updates > релиз). Возвращает путь
+    к объединённому локальному Packages, с которым работают все режимы.
+    """
+    from aptdeps.fetch import merged_packages_file
+    from aptdeps.loader import cache_root
+    cache_dir = args.cache_dir or os.path.join(cache_root(), "indexes")
+    suites = args.suites or DEFAULT_SUITES
+    components = args.components or DEFAULT_COMPONENTS
+    print(f"Загрузка индексов: {', '.join(suites)} / {', '.join(components)} / {args.arch} "
+          f"(одновременно: {args.jobs})")
+    try:
+        with metrics.phase("fetch_indexes", indexes=len(suites) * len(components), jobs=args.jobs) as info:
+            path = merged_packages_file(args.repo, suites, components, args.arch, cache_dir, args.jobs)
+            info["bytes"] = metrics.file_size(path)
+        return path
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason} ({e.filename})")
+        sys.exit(1)
+    except OSError as e:
+        print(f"Ошибка загрузки индексов: {e}")
+        sys.exit(1)
+
+
+# === Фазы исходного режима (для --metrics) ===
+def read_all(stream, name: str = "network") -> bytes:
+    with metrics.phase(name) as info:
+        data = stream.read()
+        info["bytes"] = len(data)
+    return data
+
+
+def gunzip(data: bytes) -> bytes:
+    import gzip
+    with metrics.phase("gzip", bytes=len(data)) as info:
+        data = gzip.decompress(data)
+        info["output_bytes"] = len(data)
+    return data
+
+
+def decode(data: bytes) -> str:
+    with metrics.phase("decode", bytes=len(data)):
+        return data.decode("utf-8", errors="ignore")
+
+
+def fetch_package_info(repo_url: str, package_name: str, version: str, cache_dir: str = None) -> str:
     """
     Получает данные Packages (APT формат) из репозитория Ubuntu или локального файла.
     Поддерживает автоматическую подстановку пути и распаковку .gz.
+    С cache_dir удалённый файл берётся из кэша, если не изменился на сервере.
     """
+    repo_url = resolve_source(repo_url, cache_dir)
     try:
         if repo_url.startswith("http"):
             # Автоматическая подстановка пути к APT-файлу
@@ -19,6 +101,8 @@ def fetch_package_info(repo_url: str, package_name: str, version: str) -> str:
                 repo_url = repo_url.rstrip("/") + "/dists/jammy/main/binary-amd64/Packages"
                 print(f"(Автоматически добавлен путь к Packages: {repo_url})")
 
+            from urllib.request import urlopen, Request
+            from urllib.error import HTTPError, URLError
             req = Request(repo_url, headers={"User-Agent": "APT-Stage2/1.0"})
             try:
                 with urlopen(req) as response:
@@ -26,27 +110,27 @@ def fetch_package_info(repo_url: str, package_name: str, version: str) -> str:
                         gz_url = repo_url + ".gz"
                         print(f"Packages не найден, пробуем {gz_url}")
                         with urlopen(gz_url) as gz_resp:
-                            compressed = gz_resp.read()
-                            data = gzip.decompress(compressed).decode("utf-8", errors="ignore")
+                            compressed = read_all(gz_resp)
+                            data = decode(gunzip(compressed))
                             print("Файл Packages.gz успешно распакован.")
                             print("Прямые зависимости (APT формат):")
                             return data
 
-                    data = response.read()
+                    data = read_all(response)
                     content_type = response.getheader("Content-Type", "")
                     if "gzip" in content_type or repo_url.endswith(".gz"):
-                        data = gzip.decompress(data)
+                        data = gunzip(data)
                         print("Файл Packages.gz успешно распакован.")
                         print("Прямые зависимости (APT формат):")
-                    data = data.decode("utf-8", errors="ignore")
+                    data = decode(data)
 
             except HTTPError as e:
                 if e.code == 404 and not repo_url.endswith(".gz"):
                     gz_url = repo_url + ".gz"
                     print(f"Packages не найден, пробуем {gz_url}")
                     with urlopen(gz_url) as gz_resp:
-                        compressed = gz_resp.read()
-                        data = gzip.decompress(compressed).decode("utf-8", errors="ignore")
+                        compressed = read_all(gz_resp)
+                        data = decode(gunzip(compressed))
                         print("Файл Packages.gz успешно распакован.")
                         print("Прямые зависимости (APT формат):")
                         return data
@@ -64,15 +148,15 @@ def fetch_package_info(repo_url: str, package_name: str, version: str) -> str:
                 sys.exit(1)
 
             with open(repo_url, "rb") as f:
-                raw = f.read()
+                raw = read_all(f, "read")
                 if repo_url.endswith(".gz"):
-                    raw = gzip.decompress(raw)
+                    raw = gunzip(raw)
                     print("Файл Packages.gz успешно распакован.")
                     print("Прямые зависимости (APT формат):")
                 else:
                     print("Файл Packages успешно открыт.")
                     print("Прямые зависимости (APT формат):")
-                data = raw.decode("utf-8", errors="ignore")
+                data = decode(raw)
 
         if not data.strip():
             print("Ошибка: файл Packages пуст или не содержит данных.")
@@ -129,16 +213,283 @@ def parse_dependencies(package_data: str, package_name: str, version: str):
     return deps
 
 
+def stream_dependencies(repo_url: str, package_name: str, version: str):
+    """
+    Потоковый режим: секции Packages читаются и разбираются по одной,
+    поиск останавливается на первом совпадении.
+    Резервный вариант (первый пакет файла) сохранён, как в parse_dependencies.
+    """
+    first = None
+    found = None
+    try:
+        with metrics.phase("stream"), open_packages_stream(repo_url) as stream:
+            def remember_first(stanzas):
+                nonlocal first
+                for fields in stanzas:
+                    if first is None:
+                        first = fields
+                    yield fields
+
+            found = find_stanza(remember_first(iter_stanzas(stream)), package_name, version)
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason}")
+        sys.exit(1)
+    except url_error("URLError") as e:
+        print(f"Ошибка соединения: {e.reason}")
+        sys.exit(1)
+    except FileNotFoundError:
+        print(f"Ошибка: указанный локальный файл '{repo_url}' не найден.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Ошибка при чтении данных: {e}")
+        sys.exit(1)
+
+    print("Прямые зависимости (APT формат):")
+    if found is None:
+        if first is None:
+            print("Ошибка: файл Packages пуст или не содержит данных.")
+            sys.exit(1)
+        print(f"Пакет '{package_name}' версии {version} не найден.")
+        print("Используется первый пакет из файла Packages для демонстрации зависимостей.")
+        found = first
+        print(f"Пакет по умолчанию: {found.get('Package')} (версия {found.get('Version')})")
+
+    depends = found.get("Depends")
+    if not depends:
+        print("У пакета нет прямых зависимостей.")
+        return []
+    return split_depends(depends)
+
+
+def index_dependencies(packages_path: str, package_name: str, version: str, cache_dir: str = None):
+    """
+    Поиск через постоянный индекс <Packages>.idx (только локальные файлы).
+    Индекс строится при первом запуске и пересоздаётся, если Packages изменился.
+    Если каталог Packages только для чтения, индекс хранится в cache_dir
+    (по умолчанию — каталог индексов кэша загрузок).
+    """
+    if packages_path.startswith("http"):
+        print("Ошибка: режим --index работает с локальным файлом Packages(.gz) или вместе с --cache-dir.")
+        sys.exit(1)
+    from aptdeps.index import open_index
+    from aptdeps.loader import cache_root
+    fallback_dir = cache_dir or os.path.join(cache_root(), "indexes")
+    try:
+        with metrics.phase("index_open") as info:
+            index, rebuilt = open_index(packages_path, fallback_dir=fallback_dir)
+            info["rebuilt"], info["entries"] = rebuilt, len(index)
+    except Exception as e:
+        print(f"Ошибка построения индекса: {e}")
+        sys.exit(1)
+    with index:
+        if rebuilt:
+            print(f"Индекс пакетов построен (записей: {len(index)}).")
+        with metrics.phase("index_lookup"):
+            entry = index.lookup(package_name, version)
+
+    print("Прямые зависимости (APT формат):")
+    if entry is None:
+        print(f"Пакет '{package_name}' версии {version} не найден.")
+        return []
+    if not entry["depends"]:
+        print("У пакета нет прямых зависимостей.")
+    return entry["depends"]
+
+
+def load_dependency_graph(repo_url: str):
+    """
+    Строит полный граф зависимостей индекса за один проход (имена
+    интернированы, смежность — CSR). Для локального файла граф вместе
+    с обратными зависимостями берётся из кэша загрузчика.
+    """
+    from aptdeps.loader import load_graph_file
+    try:
+        with metrics.phase("load", bytes=metrics.file_size(repo_url)) as info:
+            graph = load_graph_file(repo_url)
+            info["nodes"], info["edges"] = graph.node_count, graph.edge_count
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason}")
+        sys.exit(1)
+    except url_error("URLError") as e:
+        print(f"Ошибка соединения: {e.reason}")
+        sys.exit(1)
+    except FileNotFoundError:
+        print(f"Ошибка: указанный локальный файл '{repo_url}' не найден.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Ошибка при чтении данных: {e}")
+        sys.exit(1)
+
+    print(f"Граф построен: пакетов {len(graph)}, узлов {graph.node_count}, рёбер {graph.edge_count}")
+    return graph
+
+
+def graph_dependencies(graph, package_name: str):
+    """Выводит транзитивные зависимости пакета и возвращает прямые."""
+    root = graph.id_of(package_name)
+    if root is None:
+        print(f"Пакет '{package_name}' не найден.")
+        return []
+
+    from aptdeps.graph import transitive_closure
+    with metrics.phase("closure") as info:
+        closure = transitive_closure(graph, root)
+        info["nodes"] = len(closure)
+    print(f"Транзитивные зависимости ({len(closure)}):")
+    print(", ".join(graph.names[i] for i in closure) or "(нет)")
+    print("Прямые зависимости (APT формат):")
+    return graph.get(package_name)
+
+
+def resolved_dependencies(repo_url: str, package_name: str, version: str, arch: str):
+    """
+    Полное разрешение по грамматике Debian: альтернативы "|", ограничения
+    версий (сравнение dpkg), Pre-Depends и виртуальные пакеты (Provides).
+    Выводит транзитивное замыкание и возвращает прямые зависимости.
+    """
+    from aptdeps.resolver import load_universe, resolve, format_group
+    start = time.perf_counter()
+    try:
+        with metrics.phase("load_universe") as info:
+            universe = load_universe(repo_url, arch)
+            info["nodes"], info["virtual"] = len(universe.packages), len(universe.providers)
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason}")
+        sys.exit(1)
+    except url_error("URLError") as e:
+        print(f"Ошибка соединения: {e.reason}")
+        sys.exit(1)
+    except FileNotFoundError:
+        print(f"Ошибка: указанный локальный файл '{repo_url}' не найден.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Ошибка при чтении данных: {e}")
+        sys.exit(1)
+    loaded = time.perf_counter()
+    print(f"Индекс загружен: пакетов {len(universe.packages)}, "
+          f"виртуальных {len(universe.providers)} ({loaded - start:.2f} с)")
+
+    try:
+        with metrics.phase("resolve") as info:
+            resolution = resolve(universe, package_name, version)
+            if resolution is not None:
+                info["nodes"], info["missing"] = len(resolution.selected), len(resolution.missing)
+    except ValueError as e:
+        print(f"Ошибка разбора зависимостей: {e}")
+        sys.exit(1)
+    if resolution is None:
+        print(f"Пакет '{package_name}' версии {version} не найден.")
+        return []
+
+    selected = list(resolution.selected.values())
+    providers = {name: virtual for virtual, name in resolution.virtual.items()}
+    print(f"Транзитивное замыкание: {len(selected) - 1} пакетов ({(time.perf_counter() - loaded) * 1000:.1f} мс)")
+    for candidate in selected[1:]:
+        via = f"  (предоставляет {providers[candidate.name]})" if candidate.name in providers else ""
+        print(f"   {candidate.name} {candidate.version}{via}")
+    if resolution.missing:
+        print(f"Неудовлетворённые зависимости ({len(resolution.missing)}):")
+        for package, group in resolution.missing:
+            print(f"   {package}: {group}")
+
+    print(f"Прямые зависимости {selected[0].name} {selected[0].version} (APT формат):")
+    return [format_group(group) for group in selected[0].relations
+            if any(r.applies(arch) for r in group)]
+
+
+def read_batch_specs(source: str) -> list:
+    """
+    Читает запросы пакет[=версия] из файла или stdin ('-'), по одному в строке.
+    Пустые строки и комментарии (#) пропускаются.
+    """
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        specs = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, sep, version = line.partition("=")
+            specs.append((name.strip(), version.strip() if sep else None))
+        return specs
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def valid_spec(name: str, version: str) -> bool:
+    """Имя — как в --package; версия — полная версия Debian (например, 1.6-2.1ubuntu3)."""
+    if not validate.PACKAGE_NAME.match(name):
+        return False
+    return version is None or validate.DEBIAN_VERSION.match(version) is not None
+
+
+def batch_dependencies(repo_url: str, specs: list):
+    """
+    Пакетный режим: все запросы разрешаются за один потоковый проход
+    по индексу, результат — JSON по строке на запрос (в порядке запросов).
+    Служебные сообщения загрузки выводятся в stderr.
+    """
+    import json
+    valid = [(name, version) for name, version in specs if valid_spec(name, version)]
+    try:
+        with metrics.phase("batch", requests=len(specs)), contextlib.redirect_stdout(sys.stderr), \
+                open_packages_stream(repo_url) as stream:
+            found = dict(zip(valid, resolve_batch(iter_stanzas(stream), valid)))
+    except url_error("HTTPError") as e:
+        print(f"Ошибка HTTP: {e.code} — {e.reason}", file=sys.stderr)
+        sys.exit(1)
+    except url_error("URLError") as e:
+        print(f"Ошибка соединения: {e.reason}", file=sys.stderr)
+        sys.exit(1)
+    except OSError as e:
+        print(f"Ошибка при чтении данных: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for name, version in specs:
+        record = {"package": name, "version": version}
+        if (name, version) not in found:
+            record["error"] = "Неверное имя пакета или формат версии"
+        else:
+            fields = found[(name, version)]
+            record["found"] = fields is not None
+            if fields is not None:
+                depends = fields.get("Depends")
+                record["resolved_version"] = fields.get("Version")
+                record["depends"] = split_depends(depends) if depends else []
+        print(json.dumps(record, ensure_ascii=False))
+
+
 def validate_args(args):
     """Проверка корректности аргументов"""
     errors = []
-    if not re.match(r"^[a-zA-Z0-9._+-]+$", args.package):
+    if args.batch:
+        if args.package or args.version:
+            errors.append("--batch нельзя совмещать с --package/--version.")
+    elif not args.package:
+        errors.append("Укажите --package и --version (или --batch с файлом запросов).")
+    elif not args.version and not (args.graph or args.rdepends):
+        errors.append("Укажите --version (не нужна только для --graph и --rdepends).")
+    elif not validate.PACKAGE_NAME.match(args.package):
         errors.append("Неверное имя пакета (--package). Используйте латиницу, цифры, точки или тире.")
     # [ИЗМЕНЕНО] — теперь разрешены любые существующие локальные файлы, не только .txt или .gz
-    if not (args.repo.startswith("http://") or args.repo.startswith("https://") or os.path.exists(args.repo)):
+    if not (validate.is_url(args.repo) or os.path.exists(args.repo)):
         errors.append("Неверный формат --repo. Укажите URL APT-репозитория (http...) или существующий локальный файл.")
-    if not re.match(r"^[0-9]+(\.[0-9]+)*$", args.version):
+    # --resolve сравнивает версии по правилам dpkg — принимает полные версии Debian
+    if args.version and args.resolve and not validate.DEBIAN_VERSION.match(args.version):
+        errors.append("Неверный формат версии (--version). Пример: 1.6-2.1ubuntu3 или 1:2.0-1.")
+    elif args.version and not args.resolve and not validate.SHORT_VERSION.match(args.version):
         errors.append("Неверный формат версии (--version). Пример: 6.2 или 1.0.3.")
+    if args.suites or args.components:
+        if not args.repo.startswith("http") or args.repo.endswith(("Packages", "Packages.gz")):
+            errors.append("--suites/--components требуют адрес зеркала (http...), а не путь к Packages.")
+        for name in (args.suites or []) + (args.components or []) + [args.arch]:
+            if not validate.ARCHIVE_NAME.match(name):
+                errors.append(f"Неверное имя набора, компонента или архитектуры: '{name}'.")
+    if args.jobs < 1:
+        errors.append("--jobs должно быть не меньше 1.")
+    if args.depth < 0:
+        errors.append("--depth должно быть не меньше 0.")
 
     if errors:
         print("=== Ошибки параметров ===")
@@ -147,22 +498,86 @@ def validate_args(args):
         sys.exit(1)
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Этап 2 — Использование формата пакетов Ubuntu (APT)")
-    parser.add_argument("--package", required=True, help="Имя пакета (пример: jq)")
-    parser.add_argument("--version", required=True, help="Версия пакета (пример: 1.6)")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Этап 2 — Использование формата пакетов Ubuntu (APT)")
+    parser.add_argument("--package", help="Имя пакета (пример: jq)")
+    parser.add_argument("--version",
+                        help="Версия пакета (пример: 1.6; с --resolve — полная версия Debian; для --graph / --rdepends не нужна)")
     parser.add_argument("--repo", required=True, help="APT-репозиторий Ubuntu или путь к Packages(.gz)")
-    args = parser.parse_args()
+    parser.add_argument("--stream", action="store_true",
+                        help="Потоковый разбор: Packages не загружается в память целиком")
+    parser.add_argument("--index", action="store_true",
+                        help="Поиск через постоянный индекс <Packages>.idx (локальный файл или --cache-dir)")
+    parser.add_argument("--graph", action="store_true",
+                        help="Построить полный граф зависимостей индекса и вывести транзитивные зависимости")
+    parser.add_argument("--rdepends", action="store_true",
+                        help="Обратные зависимости: какие пакеты затронет удаление или обновление")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="Глубина поиска обратных зависимостей (для --rdepends)")
+    parser.add_argument("--resolve", action="store_true",
+                        help="Разрешение по грамматике Debian: альтернативы, версии, Pre-Depends, Provides")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Файл запросов пакет[=версия] ('-' — stdin): один проход по индексу, вывод JSON Lines")
+    parser.add_argument("--suites", nargs="+",
+                        help="Наборы зеркала (пример: jammy jammy-updates jammy-security); загрузка параллельно")
+    parser.add_argument("--components", nargs="+",
+                        help="Компоненты (пример: main universe restricted multiverse)")
+    parser.add_argument("--arch", default=DEFAULT_ARCH,
+                        help="Архитектура индексов и разрешения зависимостей (по умолчанию amd64)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Число одновременных загрузок индексов")
+    parser.add_argument("--cache-dir",
+                        help="Каталог кэша загрузок: Packages запрашивается повторно только если изменился")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
 
     validate_args(args)
+    if not args.batch:
+        client.forward("stage2", args)   # --batch читает stdin клиента — только локально
+    with metrics.session(args, "stage2"):
+        run(args)
+
+
+def run(args):
+
+    if args.suites or args.components:
+        with contextlib.redirect_stdout(sys.stderr if args.batch else sys.stdout):
+            args.repo = fetch_merged_index(args)
+
+    if args.batch:
+        try:
+            specs = read_batch_specs(args.batch)
+        except OSError as e:
+            print(f"Ошибка чтения файла запросов: {e}", file=sys.stderr)
+            sys.exit(1)
+        with contextlib.redirect_stdout(sys.stderr):
+            source = resolve_source(args.repo, args.cache_dir)
+        batch_dependencies(source, specs)
+        return
 
     print("=== Сбор данных о зависимостях ===")
     print(f"Пакет: {args.package}")
-    print(f"Версия: {args.version}")
+    if args.version:
+        print(f"Версия: {args.version}")
     print(f"Источник данных: {args.repo}")
 
-    package_data = fetch_package_info(args.repo, args.package, args.version)
-    deps = parse_dependencies(package_data, args.package, args.version)
+    if args.graph or args.rdepends:
+        graph = load_dependency_graph(resolve_source(args.repo, args.cache_dir))
+        if args.rdepends:
+            from aptdeps.rdeps import format_reverse_dependencies
+            print("\n".join(format_reverse_dependencies(graph, args.package, args.depth)))
+        deps = graph_dependencies(graph, args.package)
+    elif args.resolve:
+        deps = resolved_dependencies(resolve_source(args.repo, args.cache_dir), args.package, args.version, args.arch)
+    elif args.index:
+        deps = index_dependencies(resolve_source(args.repo, args.cache_dir), args.package, args.version,
+                                  args.cache_dir)
+    elif args.stream:
+        deps = stream_dependencies(resolve_source(args.repo, args.cache_dir), args.package, args.version)
+    else:
+        package_data = fetch_package_info(args.repo, args.package, args.version, args.cache_dir)
+        with metrics.phase("parse", bytes=len(package_data)):
+            deps = parse_dependencies(package_data, args.package, args.version)
 
     if deps:
         for dep in deps:
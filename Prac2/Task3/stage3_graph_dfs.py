@@ -1,71 +1,75 @@
 import argparse
+import os
 import sys
 
-# === Чтение графа из файла ===
-def load_graph(file_path: str) -> dict:
-    """
-    Загружает описание графа зависимостей из файла.
-    Формат строк:
-    A: B, C
-    B: D
-    C:
-    D:
-    """
-    graph = {}
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if ":" in line:
-                    package, deps = line.strip().split(":")
-                    deps_list = [d.strip() for d in deps.split(",") if d.strip()]
-                    graph[package.strip()] = deps_list
-        return graph
-    except Exception as e:
-        print(f"Ошибка при загрузке файла графа: {e}")
-        sys.exit(1)
+# Общий пакет aptdeps лежит уровнем выше (Prac2/aptdeps)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps import client, metrics
+from aptdeps.loader import load_graph
+from aptdeps.traverse import walk
 
+# Больших графов (индекс Packages) выводится только начало структуры
+STRUCTURE_LIMIT = 50
 
-# === DFS с учётом глубины и циклов ===
-def dfs(graph, node, visited, depth, max_depth):
+
+# === Обход с учётом глубины и циклов ===
+def print_dependency_tree(graph, package, max_depth):
     """
-    Рекурсивный обход графа в глубину.
+    Итеративный обход (aptdeps.traverse): каждый узел выводится один раз
+    на своей кратчайшей глубине, циклы находятся раскраской и выводятся
+    после узла, из которого ведёт замыкающее ребро.
+    Время линейно по достижимому подграфу, стек вызовов не растёт.
     """
-    if node in visited:
-        print(f"Циклическая зависимость обнаружена: {node}")
+    root = graph.id_of(package)
+    if root is None:
+        print(f"- {package}")
         return
 
-    if depth > max_depth:
-        return
+    names = graph.names
+    with metrics.phase("traverse") as info:
+        result = walk(graph, root, max_depth)
+        info["nodes"] = len(result.tree)
+        info["cycles"] = sum(len(targets) for targets in result.cycles.values())
+    with metrics.phase("output"):
+        for node, depth in result.tree:
+            print("  " * depth + f"- {names[node]}")
+            for target in result.cycles.get(node, ()):
+                print(f"Циклическая зависимость обнаружена: {names[target]}")
 
-    visited.add(node)
-    print("  " * depth + f"- {node}")
 
-    for neighbor in graph.get(node, []):
-        dfs(graph, neighbor, visited.copy(), depth + 1, max_depth)
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Этап 3 — Построение графа зависимостей (вариант 20)")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Этап 3 — Построение графа зависимостей (вариант 20)")
     parser.add_argument("--repo", required=True, help="Путь к файлу с описанием графа (пример: test_graph.txt)")
     parser.add_argument("--package", required=True, help="Имя исходного пакета (пример: A)")
     parser.add_argument("--depth", type=int, default=3, help="Максимальная глубина анализа зависимостей")
     parser.add_argument("--test", action="store_true", help="Режим тестирования")
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args(argv)
+    client.forward("stage3", args)
+    with metrics.session(args, "stage3"):
+        run(args)
 
-    args = parser.parse_args()
 
+def run(args):
     print("=== Построение графа зависимостей ===")
     print(f"Исходный пакет: {args.package}")
     print(f"Файл графа: {args.repo}")
     print(f"Макс. глубина: {args.depth}")
     print(f"Режим теста: {'Да' if args.test else 'Нет'}\n")
 
-    graph = load_graph(args.repo)
+    with metrics.phase("load", bytes=metrics.file_size(args.repo)) as info:
+        graph = load_graph(args.repo)
+        info["nodes"], info["edges"] = graph.node_count, graph.edge_count
     print("Структура графа:")
-    for k, v in graph.items():
+    for n, (k, v) in enumerate(graph.items()):
+        if n == STRUCTURE_LIMIT:
+            print(f"... и ещё {len(graph) - STRUCTURE_LIMIT} пакетов")
+            break
         print(f"{k} -> {', '.join(v) if v else '(нет зависимостей)'}")
-    print("\nОбход в глубину (DFS):")
+    print("\nОбход графа зависимостей (итеративный, кратчайшие глубины):")
 
-    dfs(graph, args.package, set(), 0, args.depth)
+    print_dependency_tree(graph, args.package, args.depth)
     print("\nЭтап 3 успешно выполнен")
 
 
@@ -1,76 +1,230 @@
 import argparse
+import os
 import sys
+import time
 
-# === Чтение графа из файла ===
-def load_graph(file_path: str) -> dict:
-    graph = {}
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if ":" in line:
-                    pkg, deps = line.strip().split(":")
-                    deps_list = [d.strip() for d in deps.split(",") if d.strip()]
-                    graph[pkg.strip()] = deps_list
-        return graph
-    except Exception as e:
-        print(f"Ошибка при загрузке файла графа: {e}")
-        sys.exit(1)
+# Общий пакет aptdeps лежит уровнем выше (Prac2/aptdeps)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps import client, metrics
 
+# Модули режимов (загрузчик, порядок, обратные зависимости, --watch)
+# импортируются в самих режимах: запуск платит только за свой режим
 
-# === DFS для вычисления порядка загрузки ===
-def dfs_order(graph, node, visited, load_order):
-    if node in visited:
-        return
-    visited.add(node)
-    for dep in graph.get(node, []):
-        dfs_order(graph, dep, visited, load_order)
-    load_order.append(node)
+# Больших графов (индекс Packages) выводится только начало структуры
+STRUCTURE_LIMIT = 50
+# Режим --watch: как часто проверять файл и сколько компонент порядка печатать
+WATCH_INTERVAL = 0.5
+WATCH_ORDER_LIMIT = 200
+
+
+# === Вывод порядка загрузки ===
+def format_component(names, component) -> str:
+    """Циклическая группа выводится в квадратных скобках."""
+    if len(component) == 1:
+        return names[component[0]]
+    return "[" + ", ".join(names[n] for n in component) + "]"
+
+
+def format_names(component) -> str:
+    """То же для компоненты из имён (режим --watch)."""
+    return component[0] if len(component) == 1 else "[" + ", ".join(component) + "]"
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Этап 4 — Дополнительные операции над графом зависимостей")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Этап 4 — Дополнительные операции над графом зависимостей")
     parser.add_argument("--repo", required=True, help="Путь к файлу описания графа (пример: test_graph.txt)")
     parser.add_argument("--package", required=True, help="Имя исходного пакета (пример: A)")
     parser.add_argument("--depth", type=int, default=3, help="Максимальная глубина анализа")
     parser.add_argument("--test", action="store_true", help="Режим тестирования")
-    args = parser.parse_args()
+    parser.add_argument("--rdepends", action="store_true",
+                        help="Вывести обратные зависимости пакета (до --depth) вместо порядка загрузки")
+    parser.add_argument("--watch", action="store_true",
+                        help="Следить за файлом графа и после каждого изменения пересчитывать порядок "
+                             "инкрементально (Ctrl+C — выход)")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL,
+                        help=f"Период проверки файла в режиме --watch, с (по умолчанию {WATCH_INTERVAL})")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if not args.watch:
+        client.forward("stage4", args)
+    with metrics.session(args, "stage4"):
+        run(args)
 
+
+def run(args):
     print("=== Этап 4 — Дополнительные операции ===")
     print(f"Исходный пакет: {args.package}")
     print(f"Файл графа: {args.repo}")
     print(f"Макс. глубина: {args.depth}")
     print(f"Режим теста: {'Да' if args.test else 'Нет'}\n")
 
-    graph = load_graph(args.repo)
+    if args.watch:
+        watch(args)
+        return
+
+    from aptdeps.loader import load_graph
+    with metrics.phase("load", bytes=metrics.file_size(args.repo)) as info:
+        graph = load_graph(args.repo)
+        info["nodes"], info["edges"] = graph.node_count, graph.edge_count
 
     print("Структура графа:")
-    for k, v in graph.items():
+    for n, (k, v) in enumerate(graph.items()):
+        if n == STRUCTURE_LIMIT:
+            print(f"... и ещё {len(graph) - STRUCTURE_LIMIT} пакетов")
+            break
         print(f"{k} -> {', '.join(v) if v else '(нет зависимостей)'}")
 
-    # === Вычисляем порядок загрузки ===
-    print("\nПорядок загрузки зависимостей (DFS):")
-    visited = set()
-    load_order = []
-    dfs_order(graph, args.package, visited, load_order)
-    load_order = load_order[::-1]  # переворот для корректного порядка
-    print(" → ".join(load_order))
+    # === Обратные зависимости: что затронет удаление или обновление пакета ===
+    if args.rdepends:
+        from aptdeps.rdeps import format_reverse_dependencies
+        with metrics.phase("rdepends") as info:
+            lines = format_reverse_dependencies(graph, args.package, args.depth)
+            info["lines"] = len(lines)
+        print("\n" + "\n".join(lines))
+        print("\nЭтап 4 успешно выполнен.")
+        return
+
+    # === Вычисляем порядок загрузки (SCC + волны) ===
+    from aptdeps.order import load_order, respects_dependencies
+    names = graph.names
+    root = graph.id_of(args.package)
+    if root is None:
+        print(f"\nПакет '{args.package}' отсутствует в графе.")
+        sys.exit(1)
+    with metrics.phase("order") as info:
+        result = load_order(graph, [root])
+        info["nodes"] = len(result.comp_of)
+        info["components"], info["waves"] = len(result.components), len(result.waves)
+    load_order_ids = result.order
+    load_order_names = [names[n] for n in load_order_ids]
+
+    print("\nПорядок загрузки зависимостей (SCC, зависимости раньше зависимых):")
+    print(" → ".join(format_component(names, result.components[c])
+                     for wave in result.waves for c in wave))
+
+    if result.cycles:
+        print("\nЦиклические группы (устанавливаются вместе):")
+        for i, component in enumerate(result.cycles, 1):
+            print(f"  {i}: {', '.join(names[n] for n in component)}")
+
+    print("\nВолны установки (пакеты одной волны можно ставить параллельно):")
+    for i, wave in enumerate(result.waves, 1):
+        print(f"  {i}: {', '.join(format_component(names, result.components[c]) for c in wave)}")
 
     # === Сравнение с "реальным менеджером" (эмуляция) ===
     if args.test:
         # Эталонный порядок для проверки (пример)
         reference_order = ["G", "D", "E", "B", "F", "C", "A"]
         print("\nСравнение с эталонным менеджером пакетов:")
-        if load_order == reference_order:
+        if load_order_names == reference_order:
             print("Совпадает с эталонным порядком загрузки.")
         else:
             print("Расхождения обнаружены!")
             print(f"Ожидаемый порядок: {' → '.join(reference_order)}")
-            print(f"Полученный порядок: {' → '.join(load_order)}")
-            print("Причина: различия в структуре тестового графа (циклические связи или упрощённая модель DFS).")
+            print(f"Полученный порядок: {' → '.join(load_order_names)}")
+            reference_ids = [graph.id_of(n) for n in reference_order if n in graph]
+            ours_ok = respects_dependencies(graph, load_order_ids, result.comp_of)
+            reference_ok = (len(reference_ids) == len(load_order_ids)
+                            and respects_dependencies(graph, reference_ids, result.comp_of))
+            if ours_ok and reference_ok:
+                print("Оба порядка корректны: все зависимости загружаются раньше зависимых пакетов.")
+                print("Причина: порядок внутри волны и внутри циклической группы не определён однозначно.")
+            elif ours_ok:
+                print("Эталонный порядок нарушает зависимости или содержит другой набор пакетов.")
+            else:
+                print("Полученный порядок нарушает зависимости — ошибка в вычислении.")
 
     print("\nЭтап 4 успешно выполнен.")
 
 
+# === Режим наблюдения: инкрементальный пересчёт при изменении файла ===
+def file_stamp(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def print_watch_order(state):
+    """state — aptdeps.incremental.IncrementalOrder."""
+    if not state.known():
+        print(f"Пакет '{state.root}' пока отсутствует в графе.")
+    components = state.order(WATCH_ORDER_LIMIT)
+    total = len(state.reach)
+    print(f"Порядок загрузки ({state.reachable_count()} пакетов, зависимости раньше зависимых):")
+    line = " → ".join(format_names(c) for c in components)
+    if total > len(components):
+        line += f" → ... и ещё {total - len(components)}"
+    print(line)
+    cycles = sum(1 for c in state.reach if len(state.members[c]) > 1)
+    if cycles:
+        print(f"Циклических групп: {cycles}")
+
+
+def watch(args):
+    """
+    Граф и порядок остаются в памяти; при изменении файла разбираются
+    только изменённые строки, а порядок и множество достижимых пакетов
+    обновляются в затронутой части (aptdeps/incremental.py).
+    """
+    from aptdeps.graph import is_packages_file
+    from aptdeps.incremental import IncrementalOrder, diff_lines
+    if args.rdepends or args.test:
+        print("Режим --watch несовместим с --rdepends и --test.")
+        sys.exit(1)
+    if args.repo.startswith("http") or not os.path.isfile(args.repo) or is_packages_file(args.repo):
+        print("Режим --watch работает только с локальным текстовым файлом графа (строки 'A: B, C').")
+        sys.exit(1)
+
+    state = IncrementalOrder(args.package)
+    with metrics.phase("load") as info:
+        try:
+            stamp = file_stamp(args.repo)
+            with open(args.repo, "rb") as f:
+                data = f.read()
+            state.load(data.decode("utf-8").splitlines())
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Ошибка при загрузке файла графа: {e}")
+            sys.exit(1)
+        info["bytes"], info["nodes"], info["edges"] = len(data), len(state.succ), state.edge_count
+    print_watch_order(state)
+    print(f"\nНаблюдение за {args.repo} (проверка раз в {args.interval} с), Ctrl+C — выход.")
+
+    try:
+        while True:
+            time.sleep(args.interval)
+            current = file_stamp(args.repo)
+            if current is None or current == stamp:
+                continue
+            try:
+                with open(args.repo, "rb") as f:
+                    new = f.read()
+            except OSError:
+                continue    # файл как раз перезаписывается — проверим в следующий раз
+            stamp = current
+            with metrics.phase("update") as info:
+                start = time.perf_counter()
+                try:
+                    removed, added = diff_lines(data, new)
+                except UnicodeDecodeError as e:
+                    print(f"\nФайл графа не в UTF-8, изменение пропущено: {e}")
+                    continue
+                data = new
+                changes = state.update(removed, added)
+                elapsed = time.perf_counter() - start
+                info.update(changes)
+            if not removed and not added:
+                continue
+            print(f"\n[{time.strftime('%H:%M:%S')}] строк: −{changes['lines_removed']} +{changes['lines_added']}, "
+                  f"рёбер: −{changes['edges_removed']} +{changes['edges_added']}, "
+                  f"циклов слито: {changes['merged']}, разбито: {changes['split']} — "
+                  f"пересчёт {elapsed * 1000:.1f} мс")
+            print_watch_order(state)
+    except KeyboardInterrupt:
+        print("\nНаблюдение остановлено.")
+
+
 if __name__ == "__main__":
     main()
 
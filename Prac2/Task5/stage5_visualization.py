@@ -1,46 +1,73 @@
 import argparse
+import os
+import sys
 
-# === Чтение графа из файла ===
-def load_graph(file_path: str) -> dict:
-    graph = {}
-    with open(file_path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if ":" in line:
-                pkg, deps = line.split(":")
-                deps_list = [d.strip() for d in deps.split(",") if d.strip()]
-                graph[pkg.strip()] = deps_list
-    return graph
+# Общий пакет aptdeps лежит уровнем выше (Prac2/aptdeps)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps import client, metrics
+from aptdeps.loader import load_graph
+from aptdeps.render import RENDERERS, render
 
 
-# === Генерация Mermaid-графа ===
-def generate_mermaid(graph: dict, root: str) -> str:
-    lines = ["graph TD"]
-    visited = set()
+# === Потоковая визуализация ===
+def render_package(graph, package, out, fmt="mermaid", max_nodes=None, max_edges=None, clusters=True):
+    """
+    Пишет граф зависимостей пакета в поток out (aptdeps.render):
+    без повторных рёбер, с подграфами для циклов и сводкой за пределами лимитов.
+    """
+    root = graph.id_of(package)
+    if root is None:
+        print(f"Пакет '{package}' отсутствует в графе.", file=sys.stderr)
+        return None
+    with metrics.phase("render", package=package, format=fmt) as info:
+        stats = render(graph, [root], out, fmt, max_nodes, max_edges, clusters)
+        info["nodes"], info["edges"] = stats["nodes"], stats["edges"]
+    return stats
 
-    def dfs(node):
-        if node in visited:
-            return
-        visited.add(node)
-        for dep in graph.get(node, []):
-            lines.append(f"    {node} --> {dep}")
-            dfs(dep)
 
-    dfs(root)
-    return "\n".join(lines)
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Этап 5 — Визуализация графа зависимостей")
+def main(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Этап 5 — Визуализация графа зависимостей")
     parser.add_argument("--repo", required=True, help="Путь к файлу графа зависимостей (пример: test_graph.txt)")
     parser.add_argument("--test", action="store_true", help="Режим тестовой визуализации (3 графа)")
-    args = parser.parse_args()
+    parser.add_argument("--package", help="Визуализировать только этот пакет (вместо трёх примеров)")
+    parser.add_argument("--format", choices=sorted(RENDERERS), default="mermaid", help="Формат вывода")
+    parser.add_argument("--output", help="Файл для записи графа (по умолчанию stdout, только с --package)")
+    parser.add_argument("--max-nodes", type=int, help="Максимум узлов; остальное сводится в один узел")
+    parser.add_argument("--max-edges", type=int, help="Максимум рёбер; остальное сводится в один узел")
+    parser.add_argument("--no-clusters", action="store_true", help="Не группировать циклы в подграфы")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.output and not args.package:
+        parser.error("--output используется вместе с --package")
+    client.forward("stage5", args)
+    with metrics.session(args, "stage5"):
+        run(args)
+
+
+def run(args):
+    # Граф одного пакета в stdout можно перенаправить в файл (> deps.dot):
+    # заголовок и итоги тогда уходят в stderr, чтобы не портить формат
+    log = sys.stderr if args.package and not args.output else sys.stdout
+    print("=== Этап 5 — Визуализация графа зависимостей ===\n", file=log)
 
-    print("=== Этап 5 — Визуализация графа зависимостей ===\n")
+    with metrics.phase("load", bytes=metrics.file_size(args.repo)) as info:
+        graph = load_graph(args.repo)
+        info["nodes"], info["edges"] = graph.node_count, graph.edge_count
+    options = (args.format, args.max_nodes, args.max_edges, not args.no_clusters)
 
-    graph = load_graph(args.repo)
+    if args.package:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                stats = render_package(graph, args.package, out, *options)
+        else:
+            stats = render_package(graph, args.package, sys.stdout, *options)
+        if stats is None:
+            sys.exit(1)
+        print(f"\nВыведено узлов: {stats['nodes']}, рёбер: {stats['edges']}"
+              f" (скрыто узлов: {stats['hidden_nodes']}, рёбер: {stats['hidden_edges']})", file=log)
+        print("Этап 5 успешно выполнен.", file=log)
+        return
 
     # --- Определяем три примера (по условию Этапа 5) ---
     examples = [
@@ -51,9 +78,10 @@ def main():
 
     for title, pkg in examples:
         print(f"Визуализация для пакета {title}:")
-        mermaid_code = generate_mermaid(graph, pkg)
-        print(mermaid_code)
-        print("Скопируйте код в https://mermaid.live для отображения.\n\n")
+        render_package(graph, pkg, sys.stdout, *options)
+        if args.format == "mermaid":
+            print("Скопируйте код в https://mermaid.live для отображения.")
+        print("\n")
 
     # --- Сравнение с эталонным менеджером пакетов ---
     print("=== Сравнение со штатным менеджером пакетов ===")
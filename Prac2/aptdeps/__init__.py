@@ -0,0 +1,4 @@
+"""
+Общий код этапов практики №2: чтение индексов Packages (APT формат)
+и работа с графами зависимостей.
+"""
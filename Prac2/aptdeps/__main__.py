@@ -0,0 +1,3 @@
+from aptdeps.cli import main
+
+main()
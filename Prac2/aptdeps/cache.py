@@ -0,0 +1,176 @@
+"""
+Кэш загрузок Packages с условными запросами (conditional GET).
+
+Для каждого URL в каталоге кэша хранятся данные и метаданные
+(ETag, Last-Modified). Повторный запрос отправляется с If-None-Match /
+If-Modified-Since, и при ответе 304 данные берутся из кэша.
+Кэш также запоминает, какой вариант индекса (Packages или Packages.gz)
+отдаёт зеркало, чтобы не повторять запрос, заканчивающийся 404.
+
+Структура каталога:
+    <sha256(url)>.json          метаданные ответа
+    <sha256(url)>.data / .gz    тело ответа как есть (без распаковки)
+    variants.json               базовый URL Packages -> рабочий URL
+Все файлы пишутся через свой временный файл и os.replace: одновременные
+загрузки (потоки aptdeps.fetch, демон и этапы) не портят друг другу
+запись, а прерванная запись не оставляет половину файла.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from urllib.request import urlopen, Request
+from urllib.error import HTTPError, URLError
+
+from aptdeps.packages import packages_url, USER_AGENT
+
+_CHUNK = 1 << 16
+
+
+class DownloadCache:
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # === Метаданные ===
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, self._key(url) + ".json")
+
+    def load_meta(self, url: str):
+        """Метаданные закэшированного ответа или None, если кэш неполный."""
+        try:
+            with open(self._meta_path(url), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.cache_dir, meta.get("file", ""))):
+            return None
+        return meta
+
+    def data_path(self, meta: dict) -> str:
+        return os.path.join(self.cache_dir, meta["file"])
+
+    def conditional_headers(self, url: str) -> dict:
+        """Заголовки If-None-Match / If-Modified-Since для следующего запроса."""
+        meta = self.load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _write(self, name: str, write):
+        """Записывает файл name каталога кэша: write(f) в свой временный файл, затем os.replace."""
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=name + ".", suffix=".tmp",
+                                         delete=False) as f:
+            try:
+                write(f)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, os.path.join(self.cache_dir, name))
+
+    def store(self, url: str, response) -> dict:
+        """
+        Сохраняет тело ответа потоково (без чтения в память целиком)
+        и записывает метаданные. Возвращает новые метаданные.
+        Тело заменяется раньше метаданных: после сбоя между ними старый
+        ETag не совпадёт с сервером, и следующий запрос загрузит тело заново.
+        """
+        content_type = response.headers.get("Content-Type", "")
+        gz = url.endswith(".gz") or "gzip" in content_type
+        name = self._key(url) + (".gz" if gz else ".data")
+
+        def write_body(f):
+            for chunk in iter(lambda: response.read(_CHUNK), b""):
+                f.write(chunk)
+        self._write(name, write_body)
+
+        meta = {
+            "url": url,
+            "file": name,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": content_type,
+        }
+        self._write(self._key(url) + ".json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        return meta
+
+    # === Варианты Packages / Packages.gz ===
+    def _variants_path(self) -> str:
+        return os.path.join(self.cache_dir, "variants.json")
+
+    def _load_variants(self) -> dict:
+        try:
+            with open(self._variants_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def known_variant(self, base_url: str):
+        return self._load_variants().get(base_url)
+
+    def remember_variant(self, base_url: str, url: str):
+        variants = self._load_variants()
+        if variants.get(base_url) != url:
+            variants[base_url] = url
+            self._write("variants.json", lambda f: f.write(json.dumps(variants, indent=1).encode("utf-8")))
+
+    # === Загрузка ===
+    def fetch(self, url: str):
+        """
+        Условный GET одного URL. Возвращает (метаданные, from_cache).
+        304 — данные из кэша; при ошибке соединения отдаётся старая копия,
+        если она есть. HTTPError (кроме 304) передаётся вызывающему коду.
+        """
+        headers = {"User-Agent": USER_AGENT}
+        headers.update(self.conditional_headers(url))
+        try:
+            with urlopen(Request(url, headers=headers)) as response:
+                return self.store(url, response), False
+        except HTTPError as e:
+            if e.code == 304:
+                return self.load_meta(url), True
+            raise
+        except URLError as e:
+            meta = self.load_meta(url)
+            if meta is None:
+                raise
+            print(f"Нет соединения ({e.reason}), используется сохранённая копия {url}")
+            return meta, True
+
+
+def cached_packages_file(repo_url: str, cache_dir: str) -> str:
+    """
+    Возвращает путь к локальной копии Packages(.gz) для адреса зеркала,
+    обновив её условным запросом. Рабочий вариант (Packages или
+    Packages.gz) запоминается, запрос с ответом 404 больше не повторяется.
+    Путь к сжатой копии оканчивается на .gz.
+    """
+    cache = DownloadCache(cache_dir)
+    base_url = packages_url(repo_url)
+    if base_url != repo_url:
+        print(f"(Автоматически добавлен путь к Packages: {base_url})")
+
+    url = cache.known_variant(base_url) or base_url
+    try:
+        meta, from_cache = cache.fetch(url)
+    except HTTPError as e:
+        if e.code != 404 or url.endswith(".gz"):
+            raise
+        url += ".gz"
+        print(f"Packages не найден, пробуем {url}")
+        meta, from_cache = cache.fetch(url)
+    cache.remember_variant(base_url, url)
+
+    if from_cache:
+        print(f"(Packages не изменился на сервере, взят из кэша: {cache.data_path(meta)})")
+    else:
+        print(f"(Packages загружен и сохранён в кэш: {cache.data_path(meta)})")
+    return cache.data_path(meta)
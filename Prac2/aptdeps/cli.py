@@ -0,0 +1,59 @@
+"""
+Единая точка входа apt-deps: подкоманды вместо отдельных скриптов этапов.
+
+    apt-deps validate ...   этап 1 — проверка параметров (Task1)
+    apt-deps deps ...       этап 2 — зависимости пакета из Packages (Task2)
+    apt-deps tree ...       этап 3 — граф зависимостей, обход DFS (Task3)
+    apt-deps order ...      этап 4 — порядок загрузки, обратные зависимости (Task4)
+    apt-deps render ...     этап 5 — визуализация графа (Task5)
+
+Аргументы подкоманды — те же, что у скрипта этапа (apt-deps tree -h).
+Загружается только модуль выбранного этапа; тяжёлые модули (urllib,
+http.client, json, socket, tracemalloc, xml.sax) этапы импортируют в тех
+режимах, где они нужны, поэтому запуск с локальным графом их не грузит.
+Бюджет времени импорта проверяет python3 -m bench.startup.
+
+Запуск: ./apt-deps <команда> ... или python3 -m aptdeps <команда> ...
+"""
+import argparse
+import importlib.util
+import os
+
+# Скрипты этапов лежат относительно Prac2 (каталога над aptdeps)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# команда -> (скрипт этапа, описание)
+COMMANDS = {
+    "validate": ("Task1/cli_variant20.py", "проверка параметров анализа (этап 1)"),
+    "deps": ("Task2/stage2.py", "зависимости пакета из индекса Packages (этап 2)"),
+    "tree": ("Task3/stage3_graph_dfs.py", "граф зависимостей, обход DFS (этап 3)"),
+    "order": ("Task4/stage4.py", "порядок загрузки и обратные зависимости (этап 4)"),
+    "render": ("Task5/stage5_visualization.py", "визуализация графа: Mermaid, DOT, GraphML (этап 5)"),
+}
+
+
+def load_stage(script: str, name: str = None):
+    """Импортирует скрипт этапа (путь относительно Prac2) как модуль."""
+    name = name or "aptdeps_" + os.path.splitext(os.path.basename(script))[0]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(BASE_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="apt-deps", description="Анализ зависимостей пакетов Ubuntu (APT): этапы 1–5",
+        epilog="Команды: " + "; ".join(f"{name} — {help}" for name, (_, help) in COMMANDS.items())
+               + ". Справка по команде: apt-deps <команда> -h")
+    parser.add_argument("command", choices=COMMANDS, help="Подкоманда")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Аргументы подкоманды")
+    args = parser.parse_args(argv)
+
+    script, _ = COMMANDS[args.command]
+    module = load_stage(script)
+    module.main(args.args, prog=f"apt-deps {args.command}")
+
+
+if __name__ == "__main__":
+    main()
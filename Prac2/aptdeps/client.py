@@ -0,0 +1,128 @@
+"""
+Клиент резидентного процесса запросов (aptdeps.daemon).
+
+Этапы 2–5 после разбора аргументов вызывают forward(): если демон
+запущен, разобранные аргументы уходят ему через Unix-сокет, а вывод и
+код выхода этапа возвращаются обратно — графы и индексы уже в памяти
+демона, запрос стоит одного обмена по сокету. Если демона нет (или
+задана переменная APT_DEPS_NO_DAEMON), этап выполняется как обычно.
+
+Путь сокета: $APT_DEPS_SOCKET, иначе $XDG_RUNTIME_DIR/apt-deps.sock,
+иначе /tmp/apt-deps-<uid>/apt-deps.sock (каталог 0700 создаёт демон).
+Клиент подключается только к сокету, владелец которого — текущий
+пользователь: чужой процесс не может подменить вывод этапов.
+Подключение и ожидание ответа ограничены по времени (CONNECT_TIMEOUT,
+$APT_DEPS_DAEMON_TIMEOUT): зависший демон считается незапущенным, и этап
+выполняется локально.
+
+Управление демоном: python3 -m aptdeps.client status | stop
+"""
+import os
+import stat
+import sys
+
+# Аргументы этапов, которые являются путями: демон работает в своём
+# текущем каталоге, поэтому они передаются абсолютными
+PATH_ARGS = ("repo", "output", "cache_dir")
+
+# Ожидание подключения и ответа демона, секунды
+CONNECT_TIMEOUT = 1.0
+REPLY_TIMEOUT = 60.0
+
+
+def reply_timeout() -> float:
+    try:
+        return float(os.environ.get("APT_DEPS_DAEMON_TIMEOUT", REPLY_TIMEOUT))
+    except ValueError:
+        return REPLY_TIMEOUT
+
+
+def socket_path() -> str:
+    path = os.environ.get("APT_DEPS_SOCKET")
+    if path:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "apt-deps.sock")
+    return os.path.join(private_dir(), "apt-deps.sock")
+
+
+def private_dir() -> str:
+    """Личный каталог сокета в /tmp, когда нет $XDG_RUNTIME_DIR."""
+    return f"/tmp/apt-deps-{os.getuid()}"
+
+
+def is_own_socket(path: str) -> bool:
+    """path — Unix-сокет текущего пользователя (не подложенный другим)."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def request(message: dict, path: str = None):
+    """Отправляет запрос демону; ответ (dict) или None, если демон не запущен."""
+    path = path or socket_path()
+    if not is_own_socket(path):
+        return None
+    import json
+    import socket
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(path)
+            sock.settimeout(reply_timeout())
+            sock.sendall(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except socket.timeout:
+        return None     # демон завис — этап выполняется локально
+    except OSError:
+        return None     # сокет остался от завершившегося демона
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def forward(stage: str, args):
+    """
+    Выполняет этап в демоне, если он запущен: печатает вывод и завершает
+    процесс с кодом этапа. Иначе (и с --metrics / --profile, которые
+    замеряют сам процесс) ничего не делает — этап выполняется локально.
+    """
+    if os.environ.get("APT_DEPS_NO_DAEMON") or getattr(args, "metrics", None) or getattr(args, "profile", None):
+        return
+    values = dict(vars(args))
+    for key in PATH_ARGS:
+        value = values.get(key)
+        if value and not value.startswith("http"):
+            values[key] = os.path.abspath(value)
+    try:
+        reply = request({"stage": stage, "args": values})
+    except ValueError:
+        reply = None
+    if reply is None or "exit" not in reply:
+        return
+    sys.stdout.write(reply.get("stdout", ""))
+    sys.stderr.write(reply.get("stderr", ""))
+    sys.stdout.flush()
+    sys.exit(reply["exit"])
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command not in ("status", "stop"):
+        print("Использование: python3 -m aptdeps.client status | stop")
+        sys.exit(1)
+    import json
+    reply = request({"stage": command})
+    if reply is None:
+        print(f"Демон не запущен ({socket_path()}).")
+        sys.exit(1)
+    print(json.dumps(reply, ensure_ascii=False, indent=1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Резидентный процесс запросов для этапов 2–5.
+
+Каждый запуск этапа заново платит за импорт модулей и загрузку графа
+или индекса Packages. Демон держит модули этапов и загруженные графы /
+индексы (aptdeps.resident) в памяти и выполняет запросы этапов, которые
+приходят через Unix-сокет (путь — aptdeps.client.socket_path()).
+
+Протокол — одна строка JSON на запрос и одна на ответ:
+    {"stage": "stage3", "args": {...}}   аргументы этапа после argparse
+        -> {"exit": код, "stdout": "...", "stderr": "..."}
+    {"stage": "status"}                  -> сведения о демоне и кэше
+    {"stage": "stop"}                    -> {"stopped": true}, затем демон завершается
+Запросы обслуживаются одновременно (поток на соединение). Вывод этапа
+собирается в буфер своего потока: sys.stdout / sys.stderr демона
+подменены объектами, которые пишут в буфер текущего запроса.
+Тяжёлые по CPU запросы всё равно делят GIL, но загрузка с диска и сети
+и ожидание клиентов друг друга не задерживают.
+
+Запуск: python3 -m aptdeps.daemon [--socket PATH] [--preload ГРАФ ...]
+"""
+import argparse
+import io
+import json
+import os
+import signal
+import socketserver
+import stat
+import sys
+import threading
+import time
+
+# Модули этапов ищутся относительно Prac2 (каталога над aptdeps)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+from aptdeps import resident
+from aptdeps.cli import load_stage
+from aptdeps.client import request, socket_path, private_dir, is_own_socket
+from aptdeps.loader import load_graph_file
+
+STAGES = {
+    "stage2": "Task2/stage2.py",
+    "stage3": "Task3/stage3_graph_dfs.py",
+    "stage4": "Task4/stage4.py",
+    "stage5": "Task5/stage5_visualization.py",
+}
+
+_local = threading.local()
+
+
+class _ThreadOutput(io.TextIOBase):
+    """Поток вывода, который пишет в буфер запроса текущего потока (или в исходный поток)."""
+
+    def __init__(self, name: str, fallback):
+        super().__init__()
+        self.name = name
+        self.fallback = fallback
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(_local, self.name, None)
+        (buffer if buffer is not None else self.fallback).write(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(_local, self.name, None) is None:
+            self.fallback.flush()
+
+
+class Daemon:
+    def __init__(self, limit: int = resident.RESIDENT_LIMIT):
+        self.cache = resident.enable(limit)
+        self.stages = {name: load_stage(script, f"aptdeps_{name}") for name, script in STAGES.items()}
+        self.started = time.time()
+        self.requests = 0
+        self.stopping = False
+
+    def run_stage(self, name: str, values: dict) -> dict:
+        """Выполняет run(args) этапа; вывод и код выхода — как у отдельного запуска."""
+        out, err = io.StringIO(), io.StringIO()
+        _local.stdout, _local.stderr = out, err
+        code = 0
+        try:
+            self.stages[name].run(argparse.Namespace(**values))
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                err.write(e.code + "\n")
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            err.write(f"Ошибка демона при выполнении {name}: {type(e).__name__}: {e}\n")
+            code = 1
+        finally:
+            _local.stdout = _local.stderr = None
+        return {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+    def dispatch(self, message: dict) -> dict:
+        stage = message.get("stage")
+        if stage in self.stages:
+            self.requests += 1
+            return self.run_stage(stage, message.get("args") or {})
+        if stage == "status":
+            return {"pid": os.getpid(), "uptime_s": round(time.time() - self.started, 1),
+                    "requests": self.requests, "cache": self.cache.report()}
+        if stage == "stop":
+            self.stopping = True    # сервер останавливается после отправки ответа
+            return {"stopped": True}
+        return {"error": f"Неизвестный запрос: {stage!r}"}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            message = json.loads(line)
+            reply = self.server.daemon.dispatch(message)
+        except (ValueError, AttributeError, TypeError) as e:
+            reply = {"error": f"Неверный запрос: {e}"}
+        self.wfile.write(json.dumps(reply, ensure_ascii=False).encode("utf-8") + b"\n")
+        self.wfile.flush()
+        if self.server.daemon.stopping:
+            threading.Thread(target=self.server.shutdown).start()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def prepare_socket_dir(path: str):
+    """
+    Личный каталог /tmp/apt-deps-<uid> создаётся с правами 0700; если он
+    уже есть, он должен принадлежать текущему пользователю и быть закрыт
+    для остальных — иначе сокет могли бы подменить.
+    """
+    directory = os.path.dirname(path)
+    if directory != private_dir():
+        return
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        print(f"Каталог сокета {directory} принадлежит другому пользователю или доступен другим.")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Резидентный процесс запросов этапов 2–5")
+    parser.add_argument("--socket", help=f"Путь Unix-сокета (по умолчанию {socket_path()})")
+    parser.add_argument("--limit", type=int, default=resident.RESIDENT_LIMIT,
+                        help="Сколько графов / индексов держать в памяти")
+    parser.add_argument("--preload", nargs="+", default=[], metavar="ГРАФ",
+                        help="Загрузить эти графы (или Packages) сразу при старте")
+    args = parser.parse_args()
+
+    path = args.socket or socket_path()
+    if request({"stage": "status"}, path) is not None:
+        print(f"Демон уже запущен: {path}")
+        sys.exit(1)
+    prepare_socket_dir(path)
+    if is_own_socket(path):
+        os.unlink(path)     # сокет остался от завершившегося демона
+    elif os.path.lexists(path):
+        print(f"По пути сокета {path} лежит чужой файл или сокет.")
+        sys.exit(1)
+
+    daemon = Daemon(args.limit)
+    for graph_path in args.preload:
+        try:
+            graph = load_graph_file(os.path.abspath(graph_path))
+        except Exception as e:
+            print(f"Ошибка при загрузке файла графа {graph_path}: {e}")
+            sys.exit(1)
+        print(f"Загружен {graph_path}: узлов {graph.node_count}, рёбер {graph.edge_count}")
+
+    umask = os.umask(0o177)     # сокет доступен только владельцу
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    server.daemon = daemon
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Демон запущен: {path} (pid {os.getpid()}), Ctrl+C — остановка.", flush=True)
+
+    sys.stdout = _ThreadOutput("stdout", sys.stdout)
+    sys.stderr = _ThreadOutput("stderr", sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        sys.stdout, sys.stderr = sys.stdout.fallback, sys.stderr.fallback
+        print("Демон остановлен.")
+
+
+if __name__ == "__main__":
+    main()
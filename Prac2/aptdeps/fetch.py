@@ -0,0 +1,276 @@
+"""
+Параллельная загрузка индексов Packages нескольких наборов (suite),
+компонентов и архитектур с объединением в один индекс.
+
+Для каждой тройки suite/component/arch загружается
+    <зеркало>/dists/<suite>/<component>/binary-<arch>/Packages.gz
+(при 404 — несжатый Packages; вариант, запомненный в кэше, пробуется
+первым, а при 404 — второй вариант). Загрузки идут в пуле потоков, число
+одновременных запросов ограничено jobs; каждый поток держит свои
+постоянные соединения http.client (keep-alive) к хостам зеркал, так что
+десяток индексов одного зеркала не открывает десяток TCP-соединений.
+Ответы сохраняются в DownloadCache с условными запросами (ETag / 304).
+
+Объединение оставляет для каждого пакета секцию с наибольшей версией
+(сравнение dpkg) среди всех индексов: исправление из -security Ubuntu
+копирует и в -updates, где версия бывает уже новее. При равных версиях
+выигрывает карман с большим приоритетом:
+    <suite>-security > <suite>-updates > <suite> > <suite>-backports / -proposed
+Индексы читаются дважды (выбор версий, затем запись), секции в памяти
+не хранятся. Результат — обычный несжатый Packages, который читают все
+режимы stage2.
+"""
+import hashlib
+import http.client
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+from aptdeps.cache import DownloadCache
+from aptdeps.packages import USER_AGENT, DEFAULT_ARCH, DEFAULT_JOBS, open_packages_stream, iter_stanzas
+from aptdeps.resolver import compare_versions
+
+# Суффикс набора -> приоритет кармана (меньше — важнее; решает при равных версиях)
+POCKET_PRIORITY = {"-security": 0, "-updates": 1, "": 2, "-backports": 3, "-proposed": 4}
+_MAX_REDIRECTS = 5
+_TIMEOUT = 60
+
+
+def pocket_priority(suite: str) -> int:
+    for suffix, priority in POCKET_PRIORITY.items():
+        if suffix and suite.endswith(suffix):
+            return priority
+    return POCKET_PRIORITY[""]
+
+
+def index_url(mirror: str, suite: str, component: str, arch: str) -> str:
+    """URL несжатого Packages; вариант .gz получается добавлением суффикса."""
+    return f"{mirror.rstrip('/')}/dists/{suite}/{component}/binary-{arch}/Packages"
+
+
+class IndexSource:
+    """Один индекс: откуда загружен и где лежит локальная копия."""
+    __slots__ = ("suite", "component", "arch", "url", "variant", "path", "from_cache")
+
+    def __init__(self, suite: str, component: str, arch: str, url: str):
+        self.suite = suite
+        self.component = component
+        self.arch = arch
+        self.url = url
+        self.variant = None     # реально загруженный URL (Packages или Packages.gz)
+        self.path = None
+        self.from_cache = False
+
+    @property
+    def priority(self) -> int:
+        return pocket_priority(self.suite)
+
+    @property
+    def label(self) -> str:
+        return f"{self.suite}/{self.component}/binary-{self.arch}"
+
+
+class ConnectionPool:
+    """
+    Постоянные HTTP-соединения по потокам: у каждого потока пула свой
+    словарь (схема, хост, порт) -> соединение, поэтому запросы не ждут
+    друг друга. Соединение пересоздаётся, если сервер закрыл его после ответа.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def _connections(self) -> dict:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def close_all(self):
+        """Закрывает соединения всех потоков (после завершения загрузок)."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            conn.close()
+
+    def request(self, url: str, headers: dict):
+        """
+        GET с переходом по перенаправлениям. Возвращает ответ http.client
+        (тело не прочитано). Статусы 4xx/5xx, кроме 304, — HTTPError.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.hostname, parts.port)
+            path = parts.path + ("?" + parts.query if parts.query else "")
+            response = self._send(key, path, headers)
+            if response.status in (301, 302, 303, 307, 308):
+                location = response.getheader("Location")
+                self._finish(key, response)
+                if not location:
+                    break
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                self._finish(key, response)
+                raise HTTPError(url, response.status, response.reason, response.headers, None)
+            response.url = url
+            response.pool_key = key
+            return response
+        raise HTTPError(url, response.status, "Слишком много перенаправлений", response.headers, None)
+
+    def _send(self, key, path: str, headers: dict):
+        conns = self._connections()
+        for attempt in (0, 1):
+            conn = conns.get(key)
+            if conn is None:
+                scheme, host, port = key
+                cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+                conn = conns[key] = cls(host, port, timeout=_TIMEOUT)
+                with self._lock:
+                    self._opened.append(conn)
+            try:
+                conn.request("GET", path, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл keep-alive соединение — одна повторная попытка с новым
+                conn.close()
+                del conns[key]
+                if attempt:
+                    raise
+
+    def _finish(self, key, response):
+        """Дочитывает тело, чтобы соединение можно было использовать повторно."""
+        response.read()
+        self.release(key, response)
+
+    def release(self, key, response):
+        if response.will_close:
+            conn = self._connections().pop(key, None)
+            if conn is not None:
+                conn.close()
+
+
+def _fetch_one(source: IndexSource, cache: DownloadCache, pool: ConnectionPool):
+    """Условная загрузка одного индекса: сначала вариант из кэша или .gz, затем другой."""
+    candidates = [source.url + ".gz", source.url]
+    known = cache.known_variant(source.url)
+    if known in candidates:
+        candidates.remove(known)
+        candidates.insert(0, known)
+    for n, url in enumerate(candidates):
+        headers = {"User-Agent": USER_AGENT}
+        headers.update(cache.conditional_headers(url))
+        try:
+            response = pool.request(url, headers)
+        except HTTPError as e:
+            if e.code == 404 and n + 1 < len(candidates):
+                continue
+            raise
+        try:
+            if response.status == 304:
+                response.read()
+                meta, source.from_cache = cache.load_meta(url), True
+            else:
+                meta = cache.store(url, response)
+        finally:
+            pool.release(response.pool_key, response)
+        source.variant = url
+        source.path = cache.data_path(meta)
+        return source
+
+
+def fetch_indexes(mirror: str, suites, components, arch: str, cache_dir: str,
+                  jobs: int = DEFAULT_JOBS, progress=print) -> list:
+    """
+    Загружает все индексы suites × components параллельно (не больше jobs
+    одновременно). Возвращает список IndexSource в порядке приоритета карманов.
+    Ошибка любой загрузки (HTTPError, OSError) передаётся вызывающему коду.
+    """
+    cache = DownloadCache(cache_dir)
+    pool = ConnectionPool()
+    sources = [IndexSource(suite, component, arch, index_url(mirror, suite, component, arch))
+               for suite in suites for component in components]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            futures = [executor.submit(_fetch_one, source, cache, pool) for source in sources]
+            # Ход загрузки печатает вызывающий поток — строки не перемешиваются
+            for future in as_completed(futures):
+                source = future.result()
+                state = "из кэша (304)" if source.from_cache else "загружен"
+                progress(f"  {source.label}: {state}")
+    finally:
+        pool.close_all()
+    # variants.json пишется из одного потока — без гонок чтения-записи
+    for source in sources:
+        cache.remember_variant(source.url, source.variant)
+    return sorted(sources, key=lambda s: s.priority)
+
+
+# === Объединение ===
+def _write_stanza(out, fields: dict):
+    for key, value in fields.items():
+        out.write(f"{key}: {value.replace(chr(10), chr(10) + ' ')}\n")
+    out.write("\n")
+
+
+def _named_stanzas(sources: list):
+    """(номер индекса, номер секции, поля) всех секций с полем Package."""
+    for number, source in enumerate(sources):
+        with open_packages_stream(source.path) as stream:
+            for position, fields in enumerate(iter_stanzas(stream)):
+                if fields.get("Package"):
+                    yield number, position, fields
+
+
+def merge_indexes(sources: list, out_path: str) -> dict:
+    """
+    Записывает объединённый Packages: по одной секции на пакет, с наибольшей
+    версией. sources должны идти по убыванию приоритета (как возвращает
+    fetch_indexes) — при равных версиях остаётся секция из индекса раньше.
+    Возвращает статистику {"packages", "stanzas", "shadowed"}; shadowed —
+    секции, вытесненные той же или более новой версией пакета.
+    """
+    best = {}       # пакет -> (версия, номер индекса, номер секции)
+    total = 0
+    for number, position, fields in _named_stanzas(sources):
+        total += 1
+        name, version = fields["Package"], fields.get("Version", "0")
+        current = best.get(name)
+        if current is None or compare_versions(version, current[0]) > 0:
+            best[name] = (version, number, position)
+
+    chosen = {(number, position) for _, number, position in best.values()}
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as out:
+        for number, position, fields in _named_stanzas(sources):
+            if (number, position) in chosen:
+                fields.setdefault("X-Suite", sources[number].suite)
+                fields.setdefault("X-Component", sources[number].component)
+                _write_stanza(out, fields)
+    os.replace(tmp_path, out_path)
+    return {"packages": len(best), "stanzas": len(chosen), "shadowed": total - len(chosen)}
+
+
+def merged_packages_file(mirror: str, suites, components, arch: str = DEFAULT_ARCH,
+                         cache_dir: str = None, jobs: int = DEFAULT_JOBS, progress=print) -> str:
+    """
+    Загружает и объединяет индексы, возвращает путь к объединённому Packages.
+    Если все индексы пришли из кэша (304) и объединение уже есть — оно не
+    пересобирается.
+    """
+    sources = fetch_indexes(mirror, suites, components, arch, cache_dir, jobs, progress)
+    key = json.dumps([mirror, [(s.label, s.path) for s in sources]])
+    out_path = os.path.join(cache_dir, "merged-" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ".Packages")
+    if all(s.from_cache for s in sources) and os.path.exists(out_path):
+        progress(f"(Объединённый индекс не изменился: {out_path})")
+        return out_path
+    stats = merge_indexes(sources, out_path)
+    progress(f"(Объединено индексов: {len(sources)}, пакетов: {stats['packages']}, "
+             f"секций: {stats['stanzas']}, вытеснено версиями не новее: {stats['shadowed']})")
+    return out_path
@@ -0,0 +1,217 @@
+"""
+Компактный граф зависимостей.
+
+Имена пакетов интернируются в целые id (0..n-1), смежность хранится
+в формате CSR: два массива array('I') — offsets (n+1 элементов) и
+targets (все рёбра подряд). Зависимости узла i — это
+targets[offsets[i]:offsets[i + 1]]. Отдельных списков и словарей
+строк на каждый узел нет, поэтому граф на десятки тысяч пакетов
+Ubuntu занимает несколько мегабайт.
+
+Для совместимости со старыми этапами DepGraph поддерживает часть
+интерфейса словаря {пакет: [зависимости]}: get(), items(), in, len().
+"""
+import os
+import sys
+from array import array
+
+from aptdeps.packages import open_packages_stream, iter_stanzas, split_depends
+
+
+class DepGraph:
+    __slots__ = ("names", "ids", "offsets", "targets", "declared", "_reverse")
+
+    def __init__(self, names, offsets, targets, declared, ids=None, reverse=None):
+        self.names = names          # id -> имя
+        self.ids = ids if ids is not None else dict(zip(names, range(len(names))))
+        self.offsets = offsets      # array('I'), n + 1
+        self.targets = targets      # array('I'), рёбра
+        self.declared = declared    # array('I'): id пакетов, описанных явно, в порядке описания
+        self._reverse = reverse     # (offsets, targets) обратного графа, если уже построен
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def id_of(self, name: str):
+        return self.ids.get(name)
+
+    def neighbors(self, i: int):
+        """Зависимости узла i (id) без копирования имён."""
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def reverse(self) -> "DepGraph":
+        """
+        Обратный граф (кто зависит от пакета) с теми же id и именами.
+        Строится один раз сортировкой подсчётом за O(V + E) и запоминается.
+        """
+        if self._reverse is None:
+            self._reverse = _reverse_csr(self.offsets, self.targets)
+        offsets, targets = self._reverse
+        return DepGraph(self.names, offsets, targets, self.declared, self.ids, (self.offsets, self.targets))
+
+    @property
+    def reverse_arrays(self):
+        """(offsets, targets) обратного графа, если он построен, иначе None."""
+        return self._reverse
+
+    # === Интерфейс словаря {пакет: [зависимости]} ===
+    def get(self, name: str, default=()):
+        i = self.ids.get(name)
+        if i is None:
+            return default
+        names = self.names
+        return [names[t] for t in self.neighbors(i)]
+
+    def __contains__(self, name) -> bool:
+        return name in self.ids
+
+    def __len__(self) -> int:
+        return len(self.declared)
+
+    def __iter__(self):
+        names = self.names
+        return (names[i] for i in self.declared)
+
+    def items(self):
+        names = self.names
+        for i in self.declared:
+            yield names[i], [names[t] for t in self.neighbors(i)]
+
+    @classmethod
+    def from_adjacency(cls, adjacency: dict) -> "DepGraph":
+        builder = GraphBuilder()
+        for package, deps in adjacency.items():
+            builder.add_package(package, deps)
+        return builder.build()
+
+
+class GraphBuilder:
+    """
+    Накопитель рёбер для DepGraph: зависимости каждого описания пакета
+    дописываются непрерывным блоком в плоский массив, а build() склеивает
+    блоки в порядке id — получается CSR без сортировки отдельных рёбер.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self._dst = array("I")
+        self._start = array("I")      # id -> начало блока первого описания
+        self._end = array("I")        # id -> конец блока (0/0 — не описан)
+        self._declared = array("I")
+        self._is_declared = bytearray()
+        self._extra = {}              # id -> [(start, end)] повторных описаний
+
+    def intern(self, name: str) -> int:
+        i = self.ids.get(name)
+        if i is None:
+            i = len(self.names)
+            name = sys.intern(name)
+            self.ids[name] = i
+            self.names.append(name)
+            self._start.append(0)
+            self._end.append(0)
+            self._is_declared.append(0)
+        return i
+
+    def add_package(self, package: str, deps):
+        """
+        Добавляет описание пакета. Повторное описание (например, другая
+        версия в Packages) дополняет список зависимостей без дублей.
+        """
+        i = self.intern(package)
+        dst, ids = self._dst, self.ids
+        start = len(dst)
+        for dep in dict.fromkeys(deps):
+            if dep:
+                j = ids.get(dep)
+                dst.append(self.intern(dep) if j is None else j)
+        if self._is_declared[i]:
+            self._extra.setdefault(i, []).append((start, len(dst)))
+        else:
+            self._is_declared[i] = 1
+            self._declared.append(i)
+            self._start[i] = start
+            self._end[i] = len(dst)
+
+    def build(self) -> DepGraph:
+        dst, starts, ends, extra = self._dst, self._start, self._end, self._extra
+        offsets = array("I", [0])
+        targets = array("I")
+        for i in range(len(self.names)):
+            start, end = starts[i], ends[i]
+            if i in extra:
+                row = list(dst[start:end])
+                for s, e in extra[i]:
+                    row.extend(dst[s:e])
+                targets.extend(dict.fromkeys(row))
+            elif end > start:
+                targets.extend(dst[start:end])
+            offsets.append(len(targets))
+        return DepGraph(self.names, offsets, targets, self._declared, self.ids)
+
+
+def _reverse_csr(offsets, targets):
+    n = len(offsets) - 1
+    reverse_offsets = array("I", bytes(4 * (n + 1)))
+    for t in targets:
+        reverse_offsets[t + 1] += 1
+    for i in range(n):
+        reverse_offsets[i + 1] += reverse_offsets[i]
+    reverse_targets = array("I", bytes(4 * len(targets)))
+    cursor = reverse_offsets[:-1]
+    for source in range(n):
+        for t in targets[offsets[source]:offsets[source + 1]]:
+            reverse_targets[cursor[t]] = source
+            cursor[t] += 1
+    return reverse_offsets, reverse_targets
+
+
+def build_from_stanzas(stanzas) -> DepGraph:
+    """Строит граф за один проход по секциям Packages (поле Depends)."""
+    builder = GraphBuilder()
+    for fields in stanzas:
+        package = fields.get("Package")
+        if not package:
+            continue
+        depends = fields.get("Depends")
+        builder.add_package(package, split_depends(depends) if depends else ())
+    return builder.build()
+
+
+def load_apt_graph(repo_url: str) -> DepGraph:
+    """Граф всех пакетов индекса Packages(.gz) — URL или локальный файл."""
+    with open_packages_stream(repo_url) as stream:
+        return build_from_stanzas(iter_stanzas(stream))
+
+
+def is_packages_file(path: str) -> bool:
+    """Отличает индекс Packages(.gz) от текстового графа вида 'A: B, C'."""
+    name = os.path.basename(path)
+    if path.startswith("http") or name.endswith(".gz") or name.startswith("Packages"):
+        return True
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                return line.startswith("Package:")
+    return False
+
+
+def transitive_closure(graph: DepGraph, root: int) -> list:
+    """id всех пакетов, достижимых из root, в порядке обхода в ширину."""
+    offsets, targets = graph.offsets, graph.targets
+    seen = bytearray(graph.node_count)
+    seen[root] = 1
+    order = [root]
+    for node in order:
+        for t in targets[offsets[node]:offsets[node + 1]]:
+            if not seen[t]:
+                seen[t] = 1
+                order.append(t)
+    return order[1:]
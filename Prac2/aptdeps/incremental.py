@@ -0,0 +1,418 @@
+"""
+Инкрементальный порядок загрузки для stage4 --watch.
+
+Граф, порядок и множество достижимых пакетов держатся в памяти.
+При изменении файла новое содержимое сравнивается с прежним по байтам
+(общее начало и общий конец ищутся делением пополам, сравнение срезов
+идёт в C): разбираются только строки между ними, из удалённых и
+добавленных строк получаются удалённые и добавленные рёбра.
+
+Порядок — на конденсации графа (компоненты сильной связности, циклы
+ставятся вместе): у каждой компоненты число ord, зависимости меньше
+зависимых. Добавление ребра, нарушающего порядок, переставляет только
+компоненты между двумя концами ребра (алгоритм Пирса–Келли); если ребро
+замыкает цикл, найденные компоненты сливаются в одну. Удаление ребра
+порядок не нарушает, но ребро внутри компоненты может её разбить —
+тогда Тарьян перезапускается только на её пакетах.
+
+Достижимость от корня — счётчики рёбер из достижимых компонент
+(support): конденсация ацикличная, поэтому компонента недостижима
+ровно тогда, когда счётчик упал до нуля; пересчёт затрагивает только
+то, что действительно стало (не)достижимым.
+"""
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+
+GAP = 1 << 32       # шаг ord при нумерации: место для разбиения компонент без перенумерации
+
+
+def parse_line(line: str):
+    """(пакет, зависимости без повторов) или None — как в loader.parse_graph_text."""
+    line = line.strip()
+    if not line or line[0] == "#":
+        return None
+    package, sep, deps = line.partition(":")
+    if not sep:
+        return None
+    return package.strip(), [d for d in dict.fromkeys(d.strip() for d in deps.split(",")) if d]
+
+
+# === Разница двух версий файла ===
+def _common_prefix(old: bytes, new: bytes) -> int:
+    low, high = 0, min(len(old), len(new))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[low:middle] == new[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(old: bytes, new: bytes, limit: int) -> int:
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:len(old) - low] == new[len(new) - middle:len(new) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _line_end(data: bytes, position: int) -> int:
+    end = data.find(b"\n", position)
+    return len(data) if end < 0 else end + 1
+
+
+def diff_lines(old: bytes, new: bytes):
+    """
+    (удалённые строки, добавленные строки) — Counter строк между общим
+    началом и общим концом двух версий, дополненных до целых строк.
+    """
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    start = old.rfind(b"\n", 0, prefix) + 1
+    removed = Counter(old[start:_line_end(old, len(old) - suffix)].decode("utf-8").splitlines())
+    added = Counter(new[start:_line_end(new, len(new) - suffix)].decode("utf-8").splitlines())
+    return removed - added, added - removed
+
+
+def _tarjan(nodes, succ) -> list:
+    """Компоненты сильной связности подграфа на nodes; зависимости раньше зависимых."""
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for start in nodes:
+        if start in index:
+            continue
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, iter(succ[start]))]
+        while work:
+            node, targets = work[-1]
+            for t in targets:
+                if t not in nodes:
+                    continue
+                if t not in index:
+                    index[t] = low[t] = counter
+                    counter += 1
+                    stack.append(t)
+                    on_stack.add(t)
+                    work.append((t, iter(succ[t])))
+                    break
+                if t in on_stack and index[t] < low[node]:
+                    low[node] = index[t]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+                if low[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+class IncrementalOrder:
+    def __init__(self, root: str):
+        self.root = root
+        self.succ = {}              # пакет -> {зависимость: число строк с этим ребром}
+        self.pred = {}              # пакет -> {зависимый: число строк}
+        self.declared = Counter()   # пакет -> число строк-описаний
+        self.comp_of = {}           # пакет -> номер компоненты
+        self.members = {}           # компонента -> {пакеты}
+        self.ord = {}               # компонента -> позиция в порядке
+        self.keys = []              # все значения ord по возрастанию
+        self.reach = set()          # компоненты, достижимые от root
+        self.support = Counter()    # компонента -> число рёбер в неё из достижимых компонент
+        self._next = 0
+
+    # === Полная загрузка ===
+    def load(self, lines):
+        """Первое построение: все строки, Тарьян по всему графу, обход от корня."""
+        for line, times in Counter(lines).items():
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            package, deps = parsed
+            self._node(package)
+            self.declared[package] += times
+            for dep in deps:
+                self._node(dep)
+                self.succ[package][dep] = self.succ[package].get(dep, 0) + times
+                self.pred[dep][package] = self.pred[dep].get(package, 0) + times
+        self._node(self.root)
+        for component in _tarjan(self.succ.keys(), self.succ):
+            self._new_comp(component, (len(self.keys) + 1) * GAP)
+        root = self.comp_of[self.root]
+        self.reach.add(root)
+        self._reach_from(root)
+
+    def _node(self, name: str):
+        if name not in self.succ:
+            self.succ[name] = {}
+            self.pred[name] = {}
+            if self.keys:
+                self._new_comp({name}, self.keys[-1] + GAP)
+
+    def _new_comp(self, members: set, value: int, new_key: bool = True) -> int:
+        c = self._next
+        self._next += 1
+        self.members[c] = members
+        for name in members:
+            self.comp_of[name] = c
+        self.ord[c] = value
+        if new_key:
+            insort(self.keys, value)
+        return c
+
+    def _drop_comp(self, c: int, drop_key: bool = True):
+        value = self.ord.pop(c)
+        if drop_key:
+            del self.keys[bisect_left(self.keys, value)]
+        del self.members[c]
+        self.reach.discard(c)
+        self.support.pop(c, None)
+
+    # === Изменение файла ===
+    def update(self, removed: Counter, added: Counter) -> dict:
+        """Применяет удалённые и добавленные строки (diff_lines); возвращает счётчики изменений."""
+        stats = {"lines_removed": sum(removed.values()), "lines_added": sum(added.values()),
+                 "edges_removed": 0, "edges_added": 0, "merged": 0, "split": 0}
+        # Сначала добавления: ребро, перенесённое в другую строку, не разбивает и не сливает компоненты
+        for line, times in added.items():
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            package, deps = parsed
+            self._node(package)
+            self.declared[package] += times
+            for dep in deps:
+                stats["edges_added"] += self._add_edge(package, dep, times, stats)
+        for line, times in removed.items():
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            package, deps = parsed
+            self.declared[package] -= times
+            for dep in deps:
+                stats["edges_removed"] += self._remove_edge(package, dep, times, stats)
+            self._collect(package)
+            for dep in deps:
+                self._collect(dep)
+        return stats
+
+    def _collect(self, name: str):
+        """Удаляет пакет, который больше нигде не упоминается."""
+        if name == self.root or self.declared[name] > 0 or self.succ.get(name) or self.pred.get(name):
+            return
+        if name not in self.succ:
+            return
+        self._drop_comp(self.comp_of.pop(name))
+        del self.succ[name], self.pred[name], self.declared[name]
+
+    # === Рёбра ===
+    def _add_edge(self, u: str, v: str, times: int, stats: dict) -> int:
+        self._node(v)
+        count = self.succ[u].get(v, 0)
+        self.succ[u][v] = count + times
+        self.pred[v][u] = count + times
+        if count:
+            return 0
+        cu, cv = self.comp_of[u], self.comp_of[v]
+        if cu == cv:
+            return 1
+        if cu in self.reach:
+            self.support[cv] += 1
+            if cv not in self.reach:
+                self.reach.add(cv)
+                self._reach_from(cv)
+        if self.ord[cv] > self.ord[cu]:
+            self._reorder(cv, cu, stats)
+        return 1
+
+    def _remove_edge(self, u: str, v: str, times: int, stats: dict) -> int:
+        count = self.succ[u][v] - times
+        if count:
+            self.succ[u][v] = self.pred[v][u] = count
+            return 0
+        del self.succ[u][v], self.pred[v][u]
+        cu, cv = self.comp_of[u], self.comp_of[v]
+        if cu != cv:
+            if cu in self.reach:
+                self.support[cv] -= 1
+                if self.support[cv] == 0 and self.root not in self.members[cv]:
+                    self._unreach_from(cv)
+        else:
+            self._split(cu, stats)
+        return 1
+
+    # === Достижимость ===
+    def _reach_from(self, c: int):
+        """c только что стала достижимой: учитываем её рёбра и всё, что стало достижимым через них."""
+        stack = [c]
+        while stack:
+            c = stack.pop()
+            for name in self.members[c]:
+                for dep in self.succ[name]:
+                    target = self.comp_of[dep]
+                    if target == c:
+                        continue
+                    self.support[target] += 1
+                    if target not in self.reach:
+                        self.reach.add(target)
+                        stack.append(target)
+
+    def _unreach_from(self, c: int):
+        self.reach.discard(c)
+        stack = [c]
+        while stack:
+            c = stack.pop()
+            for name in self.members[c]:
+                for dep in self.succ[name]:
+                    target = self.comp_of[dep]
+                    if target == c:
+                        continue
+                    self.support[target] -= 1
+                    if (self.support[target] == 0 and target in self.reach
+                            and self.root not in self.members[target]):
+                        self.reach.discard(target)
+                        stack.append(target)
+
+    def _count_support(self, c: int) -> int:
+        return sum(1 for name in self.members[c] for p in self.pred[name]
+                   if self.comp_of[p] != c and self.comp_of[p] in self.reach)
+
+    # === Порядок: Пирс–Келли со слиянием циклов ===
+    def _reorder(self, x: int, y: int, stats: dict):
+        """
+        Новое ребро требует ord[x] < ord[y] (y зависит от x), а сейчас ord[y] < ord[x].
+        Переставляются только компоненты с ord между ord[y] и ord[x].
+        """
+        ord_ = self.ord
+        lower, upper = ord_[y], ord_[x]
+        forward = self._search(y, self.pred, lambda c: ord_[c] <= upper)     # зависящие от y
+        backward = self._search(x, self.succ, lambda c: ord_[c] >= lower)    # зависимости x
+        cycle = forward & backward if x in forward else set()
+        pool = sorted(ord_[c] for c in forward | backward)
+        before = sorted(backward - cycle, key=ord_.get)
+        after = sorted(forward - cycle, key=ord_.get)
+        for value, c in zip(pool, before):
+            ord_[c] = value
+        for value, c in zip(pool[len(pool) - len(after):], after):
+            ord_[c] = value
+        if cycle:
+            # Компоненты цикла сливаются и занимают одно место между before и after
+            value = pool[len(before)]
+            for unused in pool[len(before) + 1:len(pool) - len(after)]:
+                del self.keys[bisect_left(self.keys, unused)]
+            self._merge(cycle, value)
+            stats["merged"] += 1
+
+    def _search(self, start: int, edges: dict, allowed) -> set:
+        seen = {start}
+        stack = [start]
+        while stack:
+            c = stack.pop()
+            for name in self.members[c]:
+                for other in edges[name]:
+                    target = self.comp_of[other]
+                    if target not in seen and allowed(target):
+                        seen.add(target)
+                        stack.append(target)
+        return seen
+
+    def _merge(self, components: set, value: int):
+        reachable = any(c in self.reach for c in components)
+        members = set()
+        for c in components:
+            members |= self.members[c]
+            self._drop_comp(c, drop_key=False)
+        merged = self._new_comp(members, value, new_key=False)
+        if reachable:
+            self.reach.add(merged)
+            self.support[merged] = self._count_support(merged)
+
+    def _split(self, c: int, stats: dict):
+        """Удалено ребро внутри компоненты: Тарьян только по её пакетам."""
+        members = self.members[c]
+        parts = _tarjan(members, self.succ)
+        if len(parts) == 1:
+            return
+        stats["split"] += 1
+        reachable = c in self.reach
+        if self._room(c) < len(parts):
+            self._renumber(len(parts))
+        base = self.ord[c]
+        step = self._room(c) // len(parts)
+        self._drop_comp(c)
+        new = [self._new_comp(part, base + i * step) for i, part in enumerate(parts)]
+        if not reachable:
+            return
+        # Зависящие части раньше своих зависимостей: их достижимость уже известна
+        for part in reversed(new):
+            self.support[part] = self._count_support(part)
+            if self.support[part] or self.root in self.members[part]:
+                self.reach.add(part)
+        for part in new:
+            if part in self.reach:
+                continue
+            for name in self.members[part]:
+                for dep in self.succ[name]:
+                    target = self.comp_of[dep]
+                    if target in new:
+                        continue
+                    self.support[target] -= 1
+                    if self.support[target] == 0 and self.root not in self.members[target]:
+                        self._unreach_from(target)
+
+    def _room(self, c: int) -> int:
+        """Сколько свободных значений ord от компоненты c до следующей."""
+        position = bisect_left(self.keys, self.ord[c]) + 1
+        if position == len(self.keys):
+            return GAP * len(self.members[c])
+        return self.keys[position] - self.ord[c]
+
+    def _renumber(self, room: int):
+        """Равномерная перенумерация, чтобы между соседями помещалось room значений."""
+        step = max(GAP, room)
+        for i, c in enumerate(sorted(self.ord, key=self.ord.get)):
+            self.ord[c] = (i + 1) * step
+        self.keys = sorted(self.ord.values())
+
+    # === Результат ===
+    @property
+    def edge_count(self) -> int:
+        return sum(len(deps) for deps in self.succ.values())
+
+    def known(self) -> bool:
+        """Упоминается ли корень в файле."""
+        return self.declared[self.root] > 0 or bool(self.pred[self.root])
+
+    def reachable_count(self) -> int:
+        return sum(len(self.members[c]) for c in self.reach)
+
+    def order(self, limit: int = None) -> list:
+        """
+        Компоненты, достижимые от корня, в порядке загрузки (пакеты компоненты — по алфавиту).
+        С limit — только первые limit компонент (nsmallest, без сортировки всего множества).
+        """
+        if limit is None or limit >= len(self.reach):
+            chosen = sorted(self.reach, key=self.ord.get)
+        else:
+            chosen = heapq.nsmallest(limit, self.reach, key=self.ord.get)
+        return [sorted(self.members[c]) for c in chosen]
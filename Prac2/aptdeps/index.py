@@ -0,0 +1,210 @@
+"""
+Постоянный индекс пакетов рядом с файлом Packages (файл <Packages>.idx).
+Если каталог Packages недоступен для записи (копия /var/lib/apt/lists,
+подключённый набор данных), индекс хранится в каталоге кэша загрузок.
+
+Индекс строится один раз потоковым разбором и хранит для каждой пары
+(пакет, версия) смещение и длину секции в (распакованном) Packages
+и уже разделённое поле Depends. Поиск идёт бинарным поиском по
+отображённому в память (mmap) файлу — остальные данные не читаются.
+
+Формат файла (little-endian):
+    заголовок  MAGIC, размер исходника, mtime_ns, sha256, число записей
+    таблица    смещения записей, по 4 байта, отсортированы по (имя, версия)
+    записи     stanza_offset(8) stanza_length(4) len(name)(2) len(version)(2)
+               len(depends)(4), затем name, version, depends через '\\n'
+
+Индекс пересоздаётся автоматически, если у исходного файла изменился
+размер или содержимое (sha256). Если изменилось только mtime, а хеш
+совпал, в заголовке обновляется mtime.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+from aptdeps.packages import open_packages_stream, iter_stanza_records, split_depends, version_matches
+
+MAGIC = b"APTIDX01"
+_HEADER = struct.Struct("<8sQQ32sI")
+_OFFSET = struct.Struct("<I")
+_ENTRY = struct.Struct("<QIHHI")
+
+
+def index_path_for(packages_path: str, fallback_dir: str = None) -> str:
+    """
+    <Packages>.idx рядом с исходником; если его каталог недоступен для записи
+    и задан fallback_dir — файл в fallback_dir с хешем полного пути исходника в имени.
+    """
+    directory = os.path.dirname(os.path.abspath(packages_path))
+    if fallback_dir is None or os.access(directory, os.W_OK):
+        return packages_path + ".idx"
+    key = hashlib.sha256(os.path.abspath(packages_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(fallback_dir, f"{key}-{os.path.basename(packages_path)}.idx")
+
+
+def _file_sha256(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def build_index(packages_path: str, index_path: str = None) -> str:
+    """
+    Строит индекс для локального Packages(.gz) и атомарно записывает его.
+    Для .gz смещения указываются в распакованном потоке.
+    """
+    index_path = index_path or index_path_for(packages_path)
+    st = os.stat(packages_path)
+    digest = _file_sha256(packages_path)
+
+    entries = []
+    with open_packages_stream(packages_path) as stream:
+        for offset, length, fields in iter_stanza_records(stream):
+            name = fields.get("Package")
+            if not name:
+                continue
+            depends = fields.get("Depends")
+            deps = "\n".join(split_depends(depends)) if depends else ""
+            entries.append((name.encode("utf-8"), fields.get("Version", "").encode("utf-8"),
+                            offset, length, deps.encode("utf-8")))
+    entries.sort(key=lambda e: (e[0], e[1]))
+
+    table_start = _HEADER.size
+    position = table_start + _OFFSET.size * len(entries)
+    table = bytearray()
+    body = bytearray()
+    for name, version, offset, length, deps in entries:
+        table += _OFFSET.pack(position + len(body))
+        body += _ENTRY.pack(offset, length, len(name), len(version), len(deps))
+        body += name + version + deps
+
+    # Свой временный файл у каждого процесса: одновременные сборки не портят
+    # друг другу запись, а os.replace оставляет один целый индекс
+    directory, name = os.path.split(os.path.abspath(index_path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=name + ".", suffix=".tmp", delete=False) as f:
+        try:
+            f.write(_HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, digest, len(entries)))
+            f.write(table)
+            f.write(body)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.chmod(f.name, 0o644)     # NamedTemporaryFile создаёт файл с правами 0600
+    os.replace(f.name, index_path)
+    return index_path
+
+
+class PackageIndex:
+    """Индекс, отображённый в память. Поиск — O(log n) по таблице смещений."""
+
+    def __init__(self, index_path: str):
+        with open(index_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.source_size, self.source_mtime_ns, self.source_sha256, self.count = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"'{index_path}' не является индексом пакетов")
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i: int):
+        position = _OFFSET.unpack_from(self._mm, _HEADER.size + i * _OFFSET.size)[0]
+        offset, length, name_len, ver_len, deps_len = _ENTRY.unpack_from(self._mm, position)
+        start = position + _ENTRY.size
+        name = self._mm[start:start + name_len]
+        start += name_len
+        version = self._mm[start:start + ver_len]
+        start += ver_len
+        return name, version, offset, length, start, deps_len
+
+    def _first_with_name(self, name: bytes) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, package_name: str, version: str = None):
+        """
+        Ищет пакет (и версию, с тем же сопоставлением, что и в stage2).
+        Возвращает словарь с версией, положением секции и списком Depends или None.
+        """
+        name = package_name.encode("utf-8")
+        i = self._first_with_name(name)
+        while i < self.count:
+            entry_name, entry_version, offset, length, deps_start, deps_len = self._entry(i)
+            if entry_name != name:
+                break
+            entry_version = entry_version.decode("utf-8")
+            if version is None or version_matches(entry_version, version):
+                deps = self._mm[deps_start:deps_start + deps_len].decode("utf-8")
+                return {
+                    "Package": package_name,
+                    "Version": entry_version,
+                    "offset": offset,
+                    "length": length,
+                    "depends": deps.split("\n") if deps else [],
+                }
+            i += 1
+        return None
+
+
+def _touch_index(index_path: str, packages_path: str):
+    """Содержимое не изменилось — обновляем mtime в заголовке индекса."""
+    st = os.stat(packages_path)
+    with open(index_path, "r+b") as f:
+        f.seek(8 + 8)
+        f.write(struct.pack("<Q", st.st_mtime_ns))
+
+
+def open_index(packages_path: str, index_path: str = None, fallback_dir: str = None):
+    """
+    Открывает индекс для Packages, при необходимости (пере)строив его.
+    fallback_dir — каталог для индекса, если рядом с Packages писать нельзя.
+    Возвращает (PackageIndex, rebuilt).
+    """
+    index_path = index_path or index_path_for(packages_path, fallback_dir)
+    rebuilt = False
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = PackageIndex(index_path)
+        except (ValueError, struct.error):
+            index = None
+    if index is not None:
+        st = os.stat(packages_path)
+        if st.st_size != index.source_size:
+            index.close()
+            index = None
+        elif st.st_mtime_ns != index.source_mtime_ns:
+            same = _file_sha256(packages_path) == index.source_sha256
+            index.close()
+            index = None
+            if same:
+                _touch_index(index_path, packages_path)
+                index = PackageIndex(index_path)
+    if index is None:
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        build_index(packages_path, index_path)
+        index = PackageIndex(index_path)
+        rebuilt = True
+    return index, rebuilt
@@ -0,0 +1,155 @@
+"""
+Единый загрузчик графа зависимостей для этапов 3–5.
+
+Текстовый формат (строки "A: B, C", комментарии "#", пустые строки)
+разбирается за один проход с интернированием имён сразу в DepGraph (CSR).
+Индекс Packages(.gz) тоже принимается (см. aptdeps.graph).
+
+Результат сохраняется в двоичный кэш, ключ — sha256 содержимого файла
+и способ разбора (Packages или текст: он зависит и от имени файла, так что
+одни и те же байты под разными именами дают разные графы), поэтому
+повторные запуски не разбирают текст, а читают готовые массивы:
+    MAGIC, порядок байт, число узлов / рёбер / описанных пакетов, длина имён
+    имена (utf-8 через '\\n'), offsets, targets, declared (array('I')),
+    затем offsets и targets обратного графа (обратные зависимости)
+Обратный граф строится один раз вместе с прямым и тоже берётся из кэша.
+Каталог кэша: $APT_DEPS_CACHE/graphs или ~/.cache/apt-deps/graphs.
+"""
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from aptdeps import resident
+from aptdeps.graph import DepGraph, GraphBuilder, is_packages_file, load_apt_graph
+
+CACHE_MAGIC = b"DEPGRPH2"
+_HEADER = struct.Struct("<8scIIIQ")
+_BYTEORDER = b"L" if sys.byteorder == "little" else b"B"
+
+
+def cache_root() -> str:
+    """$APT_DEPS_CACHE или ~/.cache/apt-deps ($XDG_CACHE_HOME/apt-deps)."""
+    return os.environ.get("APT_DEPS_CACHE") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "apt-deps")
+
+
+def default_cache_dir() -> str:
+    return os.path.join(cache_root(), "graphs")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# === Разбор текстового формата ===
+def parse_graph_text(path: str) -> DepGraph:
+    """Один проход по файлу: имена интернируются, рёбра копятся в плоских массивах."""
+    builder = GraphBuilder()
+    add_package = builder.add_package
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            package, sep, deps = line.partition(":")
+            if not sep:
+                continue
+            add_package(package.strip(), [d.strip() for d in deps.split(",")])
+    return builder.build()
+
+
+# === Двоичный кэш ===
+def save_graph_cache(graph: DepGraph, cache_path: str):
+    reverse = graph.reverse()
+    names = "\n".join(graph.names).encode("utf-8")
+    # Свой временный файл у каждого процесса, как у aptdeps.index.build_index
+    directory, name = os.path.split(os.path.abspath(cache_path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=name + ".", suffix=".tmp", delete=False) as f:
+        try:
+            f.write(_HEADER.pack(CACHE_MAGIC, _BYTEORDER, graph.node_count, graph.edge_count,
+                                 len(graph.declared), len(names)))
+            f.write(names)
+            graph.offsets.tofile(f)
+            graph.targets.tofile(f)
+            graph.declared.tofile(f)
+            reverse.offsets.tofile(f)
+            reverse.targets.tofile(f)
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    os.replace(f.name, cache_path)
+
+
+def load_graph_cache(cache_path: str):
+    """DepGraph из кэша или None, если файл отсутствует или не подходит."""
+    try:
+        with open(cache_path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                return None
+            magic, byteorder, nodes, edges, declared_count, names_len = _HEADER.unpack(header)
+            if magic != CACHE_MAGIC or byteorder != _BYTEORDER:
+                return None
+            blob = f.read(names_len).decode("utf-8")
+            offsets, targets, declared = array("I"), array("I"), array("I")
+            reverse_offsets, reverse_targets = array("I"), array("I")
+            offsets.fromfile(f, nodes + 1)
+            targets.fromfile(f, edges)
+            declared.fromfile(f, declared_count)
+            reverse_offsets.fromfile(f, nodes + 1)
+            reverse_targets.fromfile(f, edges)
+    except (OSError, EOFError, UnicodeDecodeError, struct.error):
+        return None
+    names = blob.split("\n") if nodes else []
+    return DepGraph(names, offsets, targets, declared, reverse=(reverse_offsets, reverse_targets))
+
+
+def load_graph_file(path: str, use_cache: bool = True, cache_dir: str = None) -> DepGraph:
+    """
+    Загружает граф из текстового файла или индекса Packages(.gz).
+    Для локальных файлов используется двоичный кэш по sha256 содержимого
+    и способу разбора,
+    в резидентном процессе (aptdeps.daemon) — ещё и граф в памяти.
+    Ошибки чтения передаются вызывающему коду.
+    """
+    return resident.cached("graph", path, lambda: _read_graph_file(path, use_cache, cache_dir))
+
+
+def _read_graph_file(path: str, use_cache: bool, cache_dir: str) -> DepGraph:
+    if path.startswith("http"):
+        return load_apt_graph(path)
+    packages = is_packages_file(path)
+    if not use_cache:
+        return load_apt_graph(path) if packages else parse_graph_text(path)
+
+    cache_dir = cache_dir or default_cache_dir()
+    mode = "packages" if packages else "text"
+    cache_path = os.path.join(cache_dir, f"{file_digest(path)}.{mode}.dgc")
+    graph = load_graph_cache(cache_path)
+    if graph is not None:
+        return graph
+
+    graph = load_apt_graph(path) if packages else parse_graph_text(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_graph_cache(graph, cache_path)
+    except OSError:
+        pass  # кэш — только ускорение, без него граф всё равно загружен
+    return graph
+
+
+def load_graph(file_path: str) -> DepGraph:
+    """Загрузка для CLI этапов: при ошибке — сообщение и завершение программы."""
+    try:
+        return load_graph_file(file_path)
+    except Exception as e:
+        print(f"Ошибка при загрузке файла графа: {e}")
+        sys.exit(1)
@@ -0,0 +1,186 @@
+"""
+Замеры по фазам для этапов 2–5 (общие опции --metrics и --profile).
+
+Каждая фаза (загрузка по сети, распаковка gzip, декодирование, разбор,
+загрузка графа, обход, визуализация ...) записывает:
+    wall_s      время выполнения
+    bytes       сколько байт прочитано / получено (если известно)
+    peak_bytes  пик выделенной памяти за фазу (tracemalloc)
+    nodes, edges и другие счётчики, которые сообщает сама фаза
+Итог — JSON в файл или в stderr (--metrics без значения или "-"),
+чтобы сравнивать запуски и видеть, какая фаза главная по стоимости.
+--profile FILE дополнительно сохраняет профиль cProfile всего запуска
+(просмотр: python3 -m pstats FILE).
+
+В потоковых режимах сеть/диск, распаковка и разбор чередуются по
+кусочкам; источник тогда оборачивается в TimedReader, и фаза получает
+network_s / read_s — время, проведённое в чтении самого источника
+(остальное время фазы — распаковка, декодирование и разбор).
+
+Без --metrics phase() ничего не замеряет: фазы остаются в коде
+и почти ничего не стоят. tracemalloc включается только с --metrics
+и сам замедляет выделение памяти — абсолютные времена с ним выше.
+json и tracemalloc импортируются только с --metrics.
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+_active = None      # Metrics текущего запуска (session) или None
+
+
+class Metrics:
+    def __init__(self, script: str, memory: bool = True):
+        self.script = script
+        self.memory = memory
+        self.phases = []
+        self._open = []         # незавершённые фазы (вложенные — в конце)
+        self.started = time.time()
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **counters):
+        """Замер фазы; в выданный словарь можно дописать bytes, nodes, edges и т.п."""
+        import tracemalloc
+        info = {"name": name}
+        if self._open:
+            info["parent"] = self._open[-1]["name"]
+        info.update(counters)
+        if self.memory:
+            tracemalloc.reset_peak()
+        self._open.append(info)
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self._open.pop()
+            info["wall_s"] = round(time.perf_counter() - start, 6)
+            if self.memory:
+                # Вложенная фаза сбрасывала пик — учитываем её пик и в объемлющей
+                peak = max(tracemalloc.get_traced_memory()[1], info.pop("_peak", 0))
+                info["peak_bytes"] = peak
+                if self._open:
+                    outer = self._open[-1]
+                    outer["_peak"] = max(outer.get("_peak", 0), peak)
+            self.phases.append(info)
+
+    def report(self) -> dict:
+        return {
+            "script": self.script,
+            "argv": sys.argv[1:],
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "total_s": round(time.perf_counter() - self._start, 6),
+            "phases": self.phases,
+        }
+
+    def write(self, target: str):
+        """target "-" — stderr, иначе путь к JSON-файлу."""
+        import json
+        if target == "-":
+            json.dump(self.report(), sys.stderr, ensure_ascii=False, indent=1)
+            sys.stderr.write("\n")
+            return
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+
+
+def phase(name: str, **counters):
+    """Фаза текущего запуска; без --metrics — пустой контекст (словарь для счётчиков всё равно выдаётся)."""
+    if _active is None:
+        return contextlib.nullcontext(counters)
+    return _active.phase(name, **counters)
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+def count(**values):
+    """Прибавляет значения к счётчикам самой внутренней открытой фазы."""
+    if _active is None or not _active._open:
+        return
+    info = _active._open[-1]
+    for key, value in values.items():
+        info[key] = info.get(key, 0) + value
+
+
+class TimedReader(io.RawIOBase):
+    """
+    Обёртка бинарного источника (HTTP-ответ, файл): считает байты и время
+    в его readinto(). При закрытии прибавляет их к текущей фазе как
+    bytes и key (network_s / read_s).
+    """
+
+    def __init__(self, raw, key: str):
+        super().__init__()
+        self.raw = raw
+        self.key = key
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        n = self.raw.readinto(buffer)
+        self.seconds += time.perf_counter() - start
+        self.bytes += n or 0
+        return n
+
+    def close(self):
+        if not self.closed:
+            count(bytes=self.bytes, **{self.key: round(self.seconds, 6)})
+            self.raw.close()
+        super().close()
+
+
+def file_size(path: str):
+    """Размер локального файла для поля bytes; None для URL и недоступных путей."""
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
+
+
+# === Опции командной строки ===
+def add_arguments(parser):
+    parser.add_argument("--metrics", nargs="?", const="-", metavar="FILE",
+                        help="Записать замеры по фазам (время, байты, пик памяти, узлы/рёбра) в JSON; "
+                             "без значения или '-' — в stderr")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Сохранить профиль cProfile всего запуска (python3 -m pstats FILE)")
+
+
+@contextlib.contextmanager
+def session(args, script: str):
+    """
+    Включает замеры и профилирование по опциям args на время блока.
+    Отчёт пишется и при выходе через sys.exit (ошибки тоже видны в замерах).
+    """
+    global _active
+    profiler = None
+    if args.metrics:
+        import tracemalloc
+        tracemalloc.start()
+        _active = Metrics(script)
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield _active
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Профиль сохранён: {args.profile}", file=sys.stderr)
+        if _active is not None:
+            metrics, _active = _active, None
+            tracemalloc.stop()
+            try:
+                metrics.write(args.metrics)
+            except OSError as e:
+                print(f"Ошибка записи замеров: {e}", file=sys.stderr)
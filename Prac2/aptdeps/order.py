@@ -0,0 +1,129 @@
+"""
+Порядок загрузки на основе компонент сильной связности (SCC).
+
+Итеративный алгоритм Тарьяна (без рекурсии) за O(V + E) выделяет
+компоненты; каждая нетривиальная компонента — это цикл, пакеты которого
+устанавливаются вместе одной группой. Тарьян выдаёт компоненты в обратном
+топологическом порядке — зависимости раньше зависимых, — поэтому «волны»
+считаются за один проход: волна компоненты = 1 + максимум волн её
+зависимостей. Пакеты одной волны друг от друга не зависят и могут
+устанавливаться параллельно.
+"""
+
+
+class LoadOrder:
+    __slots__ = ("components", "comp_of", "waves")
+
+    def __init__(self, components, comp_of, waves):
+        self.components = components  # [[id, ...]] — зависимости раньше зависимых
+        self.comp_of = comp_of        # {id: номер компоненты}
+        self.waves = waves            # [[номер компоненты, ...]] — волны установки
+
+    @property
+    def order(self) -> list:
+        """Плоский порядок загрузки: волна за волной."""
+        components = self.components
+        return [node for wave in self.waves for c in wave for node in components[c]]
+
+    @property
+    def cycles(self) -> list:
+        """Нетривиальные компоненты (циклы) — группы, устанавливаемые вместе."""
+        return [c for c in self.components if len(c) > 1]
+
+
+def strongly_connected(graph, roots) -> tuple:
+    """
+    Итеративный Тарьян по узлам, достижимым из roots.
+    Возвращает (components, comp_of); компоненты — в обратном топологическом порядке.
+    """
+    offsets, targets = graph.offsets, graph.targets
+    index = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    comp_of = {}
+    counter = 0
+
+    for start in roots:
+        if start in index:
+            continue
+        index[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        work = [(start, offsets[start])]
+        while work:
+            node, pos = work[-1]
+            if pos < offsets[node + 1]:
+                t = targets[pos]
+                work[-1] = (node, pos + 1)
+                if t not in index:
+                    index[t] = low[t] = counter
+                    counter += 1
+                    stack.append(t)
+                    on_stack.add(t)
+                    work.append((t, offsets[t]))
+                elif t in on_stack and index[t] < low[node]:
+                    low[node] = index[t]
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == index[node]:
+                number = len(components)
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    comp_of[member] = number
+                    component.append(member)
+                    if member == node:
+                        break
+                component.reverse()
+                components.append(component)
+    return components, comp_of
+
+
+def install_waves(graph, components, comp_of) -> list:
+    """Волны установки по конденсации графа (компоненты уже в топологическом порядке)."""
+    offsets, targets = graph.offsets, graph.targets
+    wave_of = []
+    waves = []
+    for number, component in enumerate(components):
+        wave = 0
+        for node in component:
+            for t in targets[offsets[node]:offsets[node + 1]]:
+                c = comp_of[t]
+                if c != number and wave_of[c] + 1 > wave:
+                    wave = wave_of[c] + 1
+        wave_of.append(wave)
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(number)
+    return waves
+
+
+def load_order(graph, roots) -> LoadOrder:
+    """Порядок загрузки для пакетов, достижимых из roots (список id)."""
+    components, comp_of = strongly_connected(graph, roots)
+    return LoadOrder(components, comp_of, install_waves(graph, components, comp_of))
+
+
+def respects_dependencies(graph, order, comp_of) -> bool:
+    """
+    Проверяет порядок (список id): каждая зависимость вне циклической
+    группы пакета должна стоять раньше него.
+    """
+    offsets, targets = graph.offsets, graph.targets
+    position = {node: i for i, node in enumerate(order)}
+    for node, i in position.items():
+        for t in targets[offsets[node]:offsets[node + 1]]:
+            if comp_of.get(t) == comp_of.get(node):
+                continue
+            if position.get(t, len(order)) > i:
+                return False
+    return True
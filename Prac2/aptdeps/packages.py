@@ -0,0 +1,254 @@
+"""
+Потоковое чтение индексов Packages (APT формат).
+
+Источник (URL или локальный файл) открывается как бинарный поток,
+.gz распаковывается по мере чтения, а разбор выдаёт по одной секции
+(stanza) за раз, поэтому поиск пакета может остановиться на первом
+совпадении. Поток читается блоками по CHUNK_SIZE байт и делится на
+секции по пустым строкам; секция декодируется целиком и разбирается
+одним проходом по её строкам. Файл целиком в памяти не хранится.
+urllib импортируется только при открытии URL: запуски с локальными
+файлами не платят за его загрузку.
+"""
+import gzip
+import io
+import re
+import sys
+
+from aptdeps import metrics
+
+DEFAULT_PACKAGES_PATH = "/dists/jammy/main/binary-amd64/Packages"
+USER_AGENT = "APT-Stage2/1.0"
+
+# Наборы, компоненты и архитектура по умолчанию (stage2 --suites / --components, aptdeps.fetch)
+DEFAULT_SUITES = ["jammy"]
+DEFAULT_COMPONENTS = ["main"]
+DEFAULT_ARCH = "amd64"
+DEFAULT_JOBS = 4
+
+CHUNK_SIZE = 1 << 16
+
+_VERSION_CONSTRAINT = re.compile(r"\s*\(.*?\)")
+# Пустая строка (только пробельные символы) — граница секций
+_BLANK_LINE = re.compile(rb"\n[ \t\r\f\v\x1c-\x1f]*\n")
+_LEADING_BLANK = re.compile(rb"(?:[ \t\r\f\v\x1c-\x1f]*\n)*")
+_TRAILING_BLANK = re.compile(rb"\n[ \t\r\f\v\x1c-\x1f]+\Z")
+
+
+class _GzipStream(gzip.GzipFile):
+    """GzipFile, который при закрытии закрывает и исходный поток (HTTP-ответ)."""
+
+    def __init__(self, raw):
+        super().__init__(fileobj=raw, mode="rb")
+        self._raw = raw
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+
+class _NotRaised(Exception):
+    """Исключение, которое никто не выбрасывает."""
+
+
+def url_error(name: str):
+    """
+    Класс urllib.error.<name> для except (HTTPError, URLError). Пока urllib
+    не импортирован, таких исключений быть не может — возвращается заглушка,
+    и urllib не загружается ради одного except.
+    """
+    module = sys.modules.get("urllib.error")
+    return getattr(module, name) if module is not None else _NotRaised
+
+
+def packages_url(repo_url: str) -> str:
+    """Дополняет адрес зеркала путём к Packages, если он не указан явно."""
+    if repo_url.endswith("Packages") or repo_url.endswith("Packages.gz"):
+        return repo_url
+    return repo_url.rstrip("/") + DEFAULT_PACKAGES_PATH
+
+
+def open_packages_stream(repo_url: str):
+    """
+    Открывает Packages(.gz) по URL или из локального файла как бинарный поток.
+    Для .gz возвращается распаковывающая обёртка — данные разжимаются
+    инкрементально. При 404 для Packages выполняется попытка Packages.gz.
+    Ошибки (HTTPError, URLError, OSError) передаются вызывающему коду.
+    """
+    if not repo_url.startswith("http"):
+        return _source(open(repo_url, "rb"), repo_url.endswith(".gz"), "read_s")
+
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError
+    url = packages_url(repo_url)
+    if url != repo_url:
+        print(f"(Автоматически добавлен путь к Packages: {url})")
+    try:
+        response = urlopen(Request(url, headers={"User-Agent": USER_AGENT}))
+    except HTTPError as e:
+        if e.code != 404 or url.endswith(".gz"):
+            raise
+        url += ".gz"
+        print(f"Packages не найден, пробуем {url}")
+        response = urlopen(Request(url, headers={"User-Agent": USER_AGENT}))
+
+    return _source(response, url.endswith(".gz") or "gzip" in response.getheader("Content-Type", ""),
+                   "network_s")
+
+
+def _source(raw, compressed: bool, key: str):
+    """С --metrics источник оборачивается в metrics.TimedReader (key — имя счётчика времени)."""
+    if metrics.enabled():
+        raw = metrics.TimedReader(raw, key)
+        if not compressed:
+            raw = io.BufferedReader(raw, 1 << 16)
+    return _GzipStream(raw) if compressed else raw
+
+
+def _parse_stanza(data: bytes) -> dict:
+    """
+    Декодирует секцию целиком и разбирает её строки: строки-продолжения
+    (начинаются с пробела или табуляции) дописываются к последнему полю,
+    строки без двоеточия пропускаются.
+    """
+    text = data.decode("utf-8", errors="ignore")
+    lines = text.split("\n")
+    if "\r" in text:
+        lines = [line.rstrip("\r") for line in lines]
+    fields = {}
+    key = None
+    for line in lines:
+        if not line.strip():
+            continue
+        if line[0] in " \t":
+            if key is not None:
+                fields[key] += "\n" + line[1:]
+        else:
+            name, sep, value = line.partition(":")
+            if sep:
+                key = name.strip()
+                fields[key] = value.strip()
+    return fields
+
+
+def _unicode_pieces(buffer: bytes, start: int, end: int) -> list:
+    """
+    Делит блок с не-ASCII байтами на части по строкам, которые пусты после
+    декодирования (пробелы Unicode, недекодируемые байты), — как построчный разбор.
+    """
+    pieces = []
+    begin = pos = start
+    for line in buffer[start:end].split(b"\n"):
+        if not line.decode("utf-8", errors="ignore").strip():
+            if pos > begin:
+                pieces.append((begin, pos))
+            begin = pos + len(line) + 1
+        pos += len(line) + 1
+    if begin < end:
+        pieces.append((begin, end))
+    return pieces
+
+
+def _stanza_records(buffer: bytes, start: int, end: int, base: int):
+    """Записи (offset, length, fields) секций блока buffer[start:end]."""
+    if buffer[start:end].isascii():
+        pieces = [(start, end)]
+    else:
+        pieces = _unicode_pieces(buffer, start, end)
+    for begin, finish in pieces:
+        begin = _LEADING_BLANK.match(buffer, begin, finish).end()
+        if begin < finish:
+            fields = _parse_stanza(buffer[begin:finish])
+            if fields:
+                yield base + begin, finish - begin, fields
+
+
+def iter_stanza_records(stream):
+    """
+    Разбирает бинарный поток Packages блоками по CHUNK_SIZE байт.
+    Выдаёт кортежи (offset, length, fields): смещение и длину секции
+    в распакованном потоке (в байтах) и словарь полей секции.
+    Строки-продолжения (начинаются с пробела) дописываются к последнему полю.
+    """
+    buffer = b""
+    base = 0        # смещение buffer[0] в потоке
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        start = 0
+        for match in _BLANK_LINE.finditer(buffer):
+            yield from _stanza_records(buffer, start, match.start() + 1, base)
+            start = match.end()
+        # Незаконченная секция переносится в следующий блок
+        buffer = buffer[start:]
+        base += start
+    trailing = _TRAILING_BLANK.search(buffer)
+    yield from _stanza_records(buffer, 0, trailing.start() + 1 if trailing else len(buffer), base)
+
+
+def iter_stanzas(stream):
+    """Выдаёт секции Packages по одной в виде словарей {поле: значение}."""
+    for _, _, fields in iter_stanza_records(stream):
+        yield fields
+
+
+def version_matches(candidate: str, requested: str) -> bool:
+    """
+    Совпадение версии как в исходном поиске stage2: точное, либо запрошенная
+    версия — начало полной (1.6 подходит к 1.6-2.1ubuntu3, но не к 1.61).
+    """
+    if candidate == requested:
+        return True
+    return (candidate.startswith(requested)
+            and not candidate[len(requested)].isdigit())
+
+
+def find_stanza(stanzas, package_name: str, version: str = None):
+    """Возвращает первую секцию с нужным пакетом (и версией) или None."""
+    for fields in stanzas:
+        if fields.get("Package") != package_name:
+            continue
+        if version is None or version_matches(fields.get("Version", ""), version):
+            return fields
+    return None
+
+
+def split_depends(value: str) -> list:
+    """Делит поле Depends на имена пакетов без ограничений версий."""
+    return [_VERSION_CONSTRAINT.sub("", d.strip()).split(" ")[0]
+            for d in value.split(",")]
+
+
+def resolve_batch(stanzas, specs) -> list:
+    """
+    Находит секции для всех запросов [(пакет, версия или None)] за один
+    проход по индексу. Возвращает секции (или None) в порядке запросов;
+    чтение прекращается, как только найдены все пакеты.
+    """
+    pending = {}
+    for i, (name, version) in enumerate(specs):
+        pending.setdefault(name, []).append((i, version))
+    results = [None] * len(specs)
+    for fields in stanzas:
+        name = fields.get("Package")
+        waiting = pending.get(name)
+        if not waiting:
+            continue
+        version = fields.get("Version", "")
+        rest = []
+        for i, requested in waiting:
+            if requested is None or version_matches(version, requested):
+                results[i] = fields
+            else:
+                rest.append((i, requested))
+        if rest:
+            pending[name] = rest
+        else:
+            del pending[name]
+            if not pending:
+                break
+    return results
@@ -0,0 +1,37 @@
+"""
+Обратные зависимости: «что сломается, если удалить или обновить X».
+
+Запрос идёт по обратному графу (DepGraph.reverse(), строится один раз
+и хранится в кэше загрузчика), поэтому обходятся только пакеты из ответа
+и их входящие рёбра — полного просмотра индекса нет.
+"""
+from aptdeps.traverse import shortest_depths
+
+
+def reverse_dependencies(graph, root: int, max_depth: int) -> list:
+    """
+    Пакеты, зависящие от root прямо или транзитивно (не дальше max_depth).
+    Возвращает [(id, глубина)] по возрастанию глубины; глубина 1 — прямые.
+    """
+    depth, _ = shortest_depths(graph.reverse(), root, max_depth)
+    del depth[root]
+    return sorted(depth.items(), key=lambda item: item[1])
+
+
+def format_reverse_dependencies(graph, package: str, max_depth: int) -> list:
+    """Строки отчёта об обратных зависимостях для вывода в CLI."""
+    root = graph.id_of(package)
+    if root is None:
+        return [f"Пакет '{package}' отсутствует в графе."]
+    names = graph.names
+    found = reverse_dependencies(graph, root, max_depth)
+    levels = {}
+    for node, depth in found:
+        levels.setdefault(depth, []).append(names[node])
+    direct = levels.pop(1, [])
+    lines = [f"Обратные зависимости пакета {package} (глубина до {max_depth}):",
+             f"Прямые ({len(direct)}): {', '.join(direct) if direct else '(нет)'}"]
+    for level, members in levels.items():
+        lines.append(f"Уровень {level} ({len(members)}): {', '.join(members)}")
+    lines.append(f"Всего затронуто пакетов: {len(found)}")
+    return lines
@@ -0,0 +1,203 @@
+"""
+Потоковая визуализация графа зависимостей: Mermaid, DOT (Graphviz), GraphML.
+
+Рёбра пишутся в поток (файл или stdout) по мере обхода — текст целиком
+в памяти не собирается. Каждый узел раскрывается один раз, строки CSR
+не содержат повторов, поэтому рёбра не дублируются. Циклы (нетривиальные
+SCC) группируются в подграфы. Ограничения max_nodes/max_edges обрезают
+вывод, а оставшаяся часть сводится в один узел-сводку.
+"""
+import re
+
+from aptdeps.order import strongly_connected
+
+_MERMAID_SAFE = re.compile(r"^[A-Za-z0-9_]+$")
+_MERMAID_RESERVED = {"end", "graph", "subgraph", "style", "click", "class"}
+# Идентификаторы, которые рендерер создаёт сам (n<id>, n_more): пакет с таким
+# именем выводится через n<id>["имя"], чтобы не слиться с чужим узлом
+_MERMAID_GENERATED = re.compile(r"^n([0-9]+|_more)$")
+
+
+class MermaidRenderer:
+    def __init__(self, out, names):
+        self.out = out
+        self.names = names
+
+    def _ref(self, node) -> str:
+        name = self.names[node]
+        if (_MERMAID_SAFE.match(name) and name.lower() not in _MERMAID_RESERVED
+                and not _MERMAID_GENERATED.match(name)):
+            return name
+        return f'n{node}["{name.replace(chr(34), "#quot;")}"]'
+
+    def begin(self):
+        self.out.write("graph TD\n")
+
+    def cluster(self, number, members):
+        self.out.write(f'    subgraph cycle{number} ["цикл {number}"]\n')
+        for node in members:
+            self.out.write(f"        {self._ref(node)}\n")
+        self.out.write("    end\n")
+
+    def node(self, node):
+        pass
+
+    def edge(self, source, target):
+        self.out.write(f"    {self._ref(source)} --> {self._ref(target)}\n")
+
+    def summary(self, label, truncated):
+        self.out.write(f'    n_more["{label}"]\n')
+        for node in truncated:
+            self.out.write(f"    {self._ref(node)} -.-> n_more\n")
+
+    def end(self):
+        pass
+
+
+class DotRenderer:
+    def __init__(self, out, names):
+        self.out = out
+        self.names = names
+
+    def _ref(self, node) -> str:
+        name = self.names[node].replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{name}"'
+
+    def begin(self):
+        self.out.write("digraph deps {\n")
+
+    def cluster(self, number, members):
+        self.out.write(f'    subgraph cluster_{number} {{\n        label="цикл {number}";\n')
+        for node in members:
+            self.out.write(f"        {self._ref(node)};\n")
+        self.out.write("    }\n")
+
+    def node(self, node):
+        pass
+
+    def edge(self, source, target):
+        self.out.write(f"    {self._ref(source)} -> {self._ref(target)};\n")
+
+    def summary(self, label, truncated):
+        self.out.write(f'    "__more__" [label="{label}", shape=note];\n')
+        for node in truncated:
+            self.out.write(f'    {self._ref(node)} -> "__more__" [style=dashed];\n')
+
+    def end(self):
+        self.out.write("}\n")
+
+
+class GraphMLRenderer:
+    """GraphML не поддерживает подграфы-кластеры: номер цикла пишется атрибутом узла."""
+
+    def __init__(self, out, names):
+        self.out = out
+        self.names = names
+        self.cycle_of = {}
+        from xml.sax.saxutils import escape     # xml.sax тянет urllib — только для GraphML
+        self._escape = escape
+
+    def begin(self):
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                       '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                       '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+                       '  <key id="cycle" for="node" attr.name="cycle" attr.type="int"/>\n'
+                       '  <graph id="deps" edgedefault="directed">\n')
+
+    def cluster(self, number, members):
+        for node in members:
+            self.cycle_of[node] = number
+
+    def node(self, node):
+        cycle = self.cycle_of.get(node)
+        extra = f'<data key="cycle">{cycle}</data>' if cycle is not None else ""
+        self.out.write(f'    <node id="n{node}"><data key="label">{self._escape(self.names[node])}</data>{extra}</node>\n')
+
+    def edge(self, source, target):
+        self.out.write(f'    <edge source="n{source}" target="n{target}"/>\n')
+
+    def summary(self, label, truncated):
+        self.out.write(f'    <node id="more"><data key="label">{self._escape(label)}</data></node>\n')
+        for node in truncated:
+            self.out.write(f'    <edge source="n{node}" target="more"/>\n')
+
+    def end(self):
+        self.out.write("  </graph>\n</graphml>\n")
+
+
+RENDERERS = {
+    "mermaid": MermaidRenderer,
+    "dot": DotRenderer,
+    "graphml": GraphMLRenderer,
+}
+
+
+def _reachable(graph, roots, limit):
+    """Узлы, достижимые из roots, в прямом порядке DFS (явный стек), не больше limit."""
+    offsets, targets = graph.offsets, graph.targets
+    seen = set()
+    order = []
+    stack = list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        order.append(node)
+        if limit is not None and len(order) >= limit:
+            break
+        row = targets[offsets[node]:offsets[node + 1]]
+        stack.extend(t for t in reversed(row) if t not in seen)
+    return order
+
+
+def render(graph, roots, out, fmt="mermaid", max_nodes=None, max_edges=None, clusters=True) -> dict:
+    """
+    Пишет граф, достижимый из roots (список id), в поток out.
+    Возвращает статистику: выведено/скрыто узлов и рёбер.
+    """
+    renderer = RENDERERS[fmt](out, graph.names)
+    offsets, targets = graph.offsets, graph.targets
+    visible = _reachable(graph, roots, max_nodes)
+    shown = set(visible)
+
+    # Узел выводится, только если на него ведёт выведенное ребро (или он корень)
+    mentioned = set(roots)
+    renderer.begin()
+    if clusters:
+        components, _ = strongly_connected(graph, roots)
+        number = 0
+        for component in components:
+            members = [n for n in component if n in shown]
+            if len(component) > 1 and members:
+                number += 1
+                renderer.cluster(number, members)
+                mentioned.update(members)
+
+    edges = 0
+    truncated = []
+    for node in visible:
+        if node not in mentioned:
+            continue
+        renderer.node(node)
+        cut = False
+        for t in targets[offsets[node]:offsets[node + 1]]:
+            if t in shown and (max_edges is None or edges < max_edges):
+                renderer.edge(node, t)
+                mentioned.add(t)
+                edges += 1
+            else:
+                cut = True
+        if cut:
+            truncated.append(node)
+
+    hidden_nodes = hidden_edges = 0
+    if truncated:
+        # Сводка считается по всей достижимой части графа, без вывода
+        everything = _reachable(graph, roots, None)
+        hidden_nodes = len(everything) - len(mentioned)
+        hidden_edges = sum(offsets[n + 1] - offsets[n] for n in everything) - edges
+        renderer.summary(f"... ещё узлов: {hidden_nodes}, рёбер: {hidden_edges}", truncated)
+    renderer.end()
+    return {"nodes": len(mentioned), "edges": edges,
+            "hidden_nodes": hidden_nodes, "hidden_edges": hidden_edges}
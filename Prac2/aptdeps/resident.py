@@ -0,0 +1,77 @@
+"""
+Кэш загруженных графов и индексов в памяти резидентного процесса (daemon.py).
+
+В обычном запуске кэш выключен: cached() просто вызывает загрузку.
+В демоне значение хранится по ключу (вид, путь, параметры) вместе с
+отметкой файла (mtime_ns, размер) — изменившийся файл загружается заново.
+Удалённые источники (http...) перезагружаются раз в REMOTE_TTL секунд.
+Одновременные запросы одного ключа ждут одну загрузку, а не грузят
+файл каждый сам; старые записи вытесняются после RESIDENT_LIMIT.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+RESIDENT_LIMIT = 16     # сколько графов / индексов держать в памяти
+REMOTE_TTL = 300        # секунд до перезагрузки удалённого индекса
+
+_cache = None           # ResidentCache демона или None
+
+
+def _stamp(path: str):
+    if path.startswith("http"):
+        return "ttl", int(time.time() // REMOTE_TTL)
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ResidentCache:
+    def __init__(self, limit: int = RESIDENT_LIMIT):
+        self.limit = limit
+        self.entries = OrderedDict()    # ключ -> (отметка файла, значение)
+        self._loading = {}              # ключ -> Lock загрузки
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, stamp, load):
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry[0] == stamp:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+            value = load()
+            with self._lock:
+                self.misses += 1
+                self.entries[key] = (stamp, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.limit:
+                    self.entries.popitem(last=False)
+            return value
+
+    def report(self) -> dict:
+        with self._lock:
+            return {"entries": [list(key) for key in self.entries],
+                    "hits": self.hits, "misses": self.misses}
+
+
+def enable(limit: int = RESIDENT_LIMIT) -> ResidentCache:
+    global _cache
+    _cache = ResidentCache(limit)
+    return _cache
+
+
+def cached(kind: str, path: str, load, *params):
+    """Значение load() для файла path; в демоне — из памяти, пока файл не изменился."""
+    if _cache is None:
+        return load()
+    try:
+        stamp = _stamp(path)
+    except OSError:
+        return load()   # файла нет — загрузка сообщит об ошибке как обычно
+    return _cache.get((kind, path) + params, stamp, load)
@@ -0,0 +1,335 @@
+"""
+Разрешение зависимостей по полной грамматике Debian.
+
+Поля Depends / Pre-Depends разбираются в объекты Relation один раз:
+    группа := отношение { "|" отношение }          (альтернативы)
+    отношение := имя[:архитектура] [(оп версия)] [[архитектуры]] [<профили>...]
+    оп := << | <= | = | >= | >>   (устаревшие < и > означают <= и >=)
+Одинаковые строки отношений (например, "libc6 (>= 2.34)" встречается
+тысячи раз) разбираются только однажды — кэш _RELATIONS.
+
+Версии сравниваются по правилам dpkg (эпоха, upstream, ревизия; "~"
+меньше пустой строки). Одни и те же пары сравниваются постоянно, поэтому
+compare_versions запоминается в functools.lru_cache.
+
+Виртуальные пакеты разрешаются через индекс Provides: зависимость без
+версии удовлетворяет любой поставщик, с версией — только поставщик с
+версионным Provides (как в dpkg).
+"""
+import functools
+import re
+from collections import deque
+
+from aptdeps import resident
+from aptdeps.packages import open_packages_stream, iter_stanzas, version_matches
+
+_RELATION_RE = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9.+\-]*)(?::(?P<qual>[A-Za-z0-9\-]+))?\s*"
+    r"(?:\(\s*(?P<op><<|<=|>=|>>|=|<|>)\s*(?P<version>[^)\s]+)\s*\))?\s*"
+    r"(?:\[(?P<arches>[^\]]*)\])?\s*"
+    r"(?P<profiles>(?:<[^>]*>\s*)*)$")
+_PROFILE_RE = re.compile(r"<([^>]*)>")
+_VERSION_RE = re.compile(r"^(?:(\d+):)?(.+?)(?:-([^-]+))?$")
+
+# Устаревшие "<" и ">" в dpkg означают "<=" и ">="
+_OPERATORS = {
+    "<<": lambda c: c < 0,
+    "<=": lambda c: c <= 0,
+    "<": lambda c: c <= 0,
+    "=": lambda c: c == 0,
+    ">=": lambda c: c >= 0,
+    ">": lambda c: c >= 0,
+    ">>": lambda c: c > 0,
+}
+
+
+# === Сравнение версий (dpkg) ===
+def _order(c: str) -> int:
+    if c == "~":
+        return -1
+    if c.isdigit():
+        return 0
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+
+def _verrevcmp(a: str, b: str) -> int:
+    """Сравнение upstream-версий или ревизий, как verrevcmp в dpkg."""
+    i = j = 0
+    la, lb = len(a), len(b)
+    while i < la or j < lb:
+        # Нецифровая часть: посимвольно по весам _order
+        while (i < la and not a[i].isdigit()) or (j < lb and not b[j].isdigit()):
+            ac = _order(a[i]) if i < la else 0
+            bc = _order(b[j]) if j < lb else 0
+            if ac != bc:
+                return -1 if ac < bc else 1
+            i += 1
+            j += 1
+        # Цифровая часть: как числа (ведущие нули не важны)
+        while i < la and a[i] == "0":
+            i += 1
+        while j < lb and b[j] == "0":
+            j += 1
+        first_diff = 0
+        while i < la and a[i].isdigit() and j < lb and b[j].isdigit():
+            if not first_diff and a[i] != b[j]:
+                first_diff = -1 if a[i] < b[j] else 1
+            i += 1
+            j += 1
+        if i < la and a[i].isdigit():
+            return 1
+        if j < lb and b[j].isdigit():
+            return -1
+        if first_diff:
+            return first_diff
+    return 0
+
+
+@functools.lru_cache(maxsize=None)
+def parse_version(version: str):
+    """(эпоха, upstream, ревизия) полной версии Debian."""
+    match = _VERSION_RE.match(version.strip())
+    if not match:
+        return 0, version, ""
+    epoch, upstream, revision = match.groups()
+    return int(epoch or 0), upstream, revision or ""
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def compare_versions(a: str, b: str) -> int:
+    """-1, 0 или 1 — результат сравнения версий a и b по правилам dpkg."""
+    if a == b:
+        return 0
+    ea, ua, ra = parse_version(a)
+    eb, ub, rb = parse_version(b)
+    if ea != eb:
+        return -1 if ea < eb else 1
+    return _verrevcmp(ua, ub) or _verrevcmp(ra, rb)
+
+
+version_key = functools.cmp_to_key(compare_versions)
+
+
+# === Отношения ===
+class Relation:
+    """Одно отношение "имя (оп версия)" с ограничениями по архитектуре и профилям."""
+    __slots__ = ("name", "qualifier", "op", "version", "arches", "profiles", "_test")
+
+    def __init__(self, name, qualifier=None, op=None, version=None, arches=None, profiles=None):
+        self.name = name
+        self.qualifier = qualifier      # any / native / архитектура после ":"
+        self.op = op
+        self.version = version
+        self.arches = arches            # [(отрицание, архитектура)] или None
+        self.profiles = profiles        # [[(отрицание, профиль)]] или None
+        self._test = _OPERATORS[op] if op else None
+
+    def satisfied_by(self, version: str) -> bool:
+        """Подходит ли версия пакета под ограничение (без ограничения — любая)."""
+        if self._test is None:
+            return True
+        return self._test(compare_versions(version, self.version))
+
+    def applies(self, arch: str, profiles=frozenset()) -> bool:
+        """Действует ли отношение для архитектуры и набора профилей сборки."""
+        if self.arches:
+            negated = self.arches[0][0]
+            listed = any(a == arch or a == "any" for _, a in self.arches)
+            if listed == negated:
+                return False
+        if self.profiles:
+            return any(all((p in profiles) != neg for neg, p in group) for group in self.profiles)
+        return True
+
+    def __str__(self):
+        text = self.name + (f":{self.qualifier}" if self.qualifier else "")
+        if self.op:
+            text += f" ({self.op} {self.version})"
+        return text
+
+
+_RELATIONS = {}
+
+
+def parse_relation(text: str) -> Relation:
+    """Разбирает одно отношение; результат запоминается по исходной строке."""
+    relation = _RELATIONS.get(text)
+    if relation is not None:
+        return relation
+    match = _RELATION_RE.match(text)
+    if not match:
+        raise ValueError(f"Неверное отношение зависимости: '{text.strip()}'")
+    arches = profiles = None
+    if match.group("arches"):
+        arches = [(a.startswith("!"), a.lstrip("!")) for a in match.group("arches").split()]
+    if match.group("profiles"):
+        profiles = [[(p.startswith("!"), p.lstrip("!")) for p in group.split()]
+                    for group in _PROFILE_RE.findall(match.group("profiles"))]
+    relation = Relation(match.group("name"), match.group("qual"), match.group("op"),
+                        match.group("version"), arches, profiles)
+    _RELATIONS[text] = relation
+    return relation
+
+
+def parse_relations(value: str) -> list:
+    """Поле Depends -> список групп альтернатив [[Relation, ...], ...]."""
+    if not value:
+        return []
+    return [[parse_relation(alt) for alt in group.split("|")]
+            for group in value.replace("\n", " ").split(",") if group.strip()]
+
+
+def format_group(group) -> str:
+    return " | ".join(str(r) for r in group)
+
+
+# === Пакеты и индекс Provides ===
+class Candidate:
+    """
+    Версия пакета из индекса. Поля зависимостей хранятся строками и
+    разбираются при первом обращении — загрузка индекса не тратит время
+    на пакеты, которые не понадобятся.
+    """
+    __slots__ = ("name", "version", "arch", "_depends", "_pre_depends", "_relations")
+
+    def __init__(self, name, version, arch, depends, pre_depends):
+        self.name = name
+        self.version = version
+        self.arch = arch
+        self._depends = depends
+        self._pre_depends = pre_depends
+        self._relations = None
+
+    @property
+    def relations(self) -> list:
+        """Группы Pre-Depends, затем Depends."""
+        if self._relations is None:
+            self._relations = parse_relations(self._pre_depends) + parse_relations(self._depends)
+        return self._relations
+
+    def __repr__(self):
+        return f"{self.name} {self.version}"
+
+
+class Universe:
+    """Все версии пакетов индекса и поставщики виртуальных пакетов."""
+
+    def __init__(self, arch: str = "amd64"):
+        self.arch = arch
+        self.packages = {}      # имя -> [Candidate], по убыванию версии после finish()
+        self.providers = {}     # виртуальное имя -> [(Candidate, версия Provides или None)]
+
+    def add(self, fields: dict):
+        name = fields.get("Package")
+        if not name:
+            return
+        arch = fields.get("Architecture", "all")
+        if arch not in ("all", self.arch):
+            return
+        candidate = Candidate(name, fields.get("Version", ""), arch,
+                              fields.get("Depends"), fields.get("Pre-Depends"))
+        self.packages.setdefault(name, []).append(candidate)
+        provides = fields.get("Provides")
+        if provides:
+            for group in parse_relations(provides):
+                relation = group[0]
+                self.providers.setdefault(relation.name, []).append(
+                    (candidate, relation.version if relation.op == "=" else None))
+
+    def finish(self):
+        for versions in self.packages.values():
+            if len(versions) > 1:
+                versions.sort(key=lambda c: version_key(c.version), reverse=True)
+        return self
+
+    def candidates(self, relation: Relation):
+        """
+        Кандидаты, удовлетворяющие отношению: сначала реальные версии
+        пакета (от новой к старой), затем поставщики виртуального имени.
+        Выдаёт пары (Candidate, через_виртуальный).
+        """
+        for candidate in self.packages.get(relation.name, ()):
+            if relation.satisfied_by(candidate.version):
+                yield candidate, False
+        for candidate, provided in self.providers.get(relation.name, ()):
+            if relation.op is None or (provided is not None and relation.satisfied_by(provided)):
+                yield candidate, True
+
+
+def load_universe(repo_url: str, arch: str = "amd64") -> Universe:
+    """Индекс Packages(.gz) -> Universe за один проход (в резидентном процессе — из памяти)."""
+    return resident.cached("universe", repo_url, lambda: _read_universe(repo_url, arch), arch)
+
+
+def _read_universe(repo_url: str, arch: str) -> Universe:
+    universe = Universe(arch)
+    with open_packages_stream(repo_url) as stream:
+        for fields in iter_stanzas(stream):
+            universe.add(fields)
+    return universe.finish()
+
+
+# === Разрешение ===
+class Resolution:
+    def __init__(self):
+        self.selected = {}      # имя -> Candidate, в порядке выбора
+        self.virtual = {}       # виртуальное имя -> имя выбранного поставщика
+        self.missing = []       # (пакет, группа) — неудовлетворённые зависимости
+
+
+def _already_satisfied(group, selected: dict, universe: Universe) -> bool:
+    """Удовлетворяет ли группу уже выбранный пакет (сам или через Provides)."""
+    for relation in group:
+        chosen = selected.get(relation.name)
+        if chosen is not None and relation.satisfied_by(chosen.version):
+            return True
+        for candidate, provided in universe.providers.get(relation.name, ()):
+            if selected.get(candidate.name) is candidate and (
+                    relation.op is None or (provided is not None and relation.satisfied_by(provided))):
+                return True
+    return False
+
+
+def resolve(universe: Universe, package: str, version: str = None) -> Resolution:
+    """
+    Транзитивное замыкание зависимостей пакета (обход в ширину).
+    Для каждой группы альтернатив берётся первая, которую можно
+    удовлетворить: уже выбранный пакет, иначе самая новая подходящая версия
+    или поставщик виртуального пакета. Возвращает None, если корневого пакета
+    (версии) нет в индексе.
+    """
+    root = next((c for c in universe.packages.get(package, ())
+                 if version is None or version_matches(c.version, version)), None)
+    if root is None:
+        return None
+
+    resolution = Resolution()
+    selected = resolution.selected
+    selected[root.name] = root
+    queue = deque([root])
+    arch = universe.arch
+    while queue:
+        current = queue.popleft()
+        for group in current.relations:
+            group = [r for r in group if r.applies(arch)]
+            if not group or _already_satisfied(group, selected, universe):
+                continue
+            chosen = None
+            for relation in group:
+                for candidate, virtual in universe.candidates(relation):
+                    if candidate.name in selected:
+                        continue    # выбрана другая версия этого пакета — конфликт, пробуем дальше
+                    chosen = candidate
+                    if virtual:
+                        resolution.virtual[relation.name] = candidate.name
+                    break
+                if chosen is not None:
+                    break
+            if chosen is None:
+                resolution.missing.append((current.name, format_group(group)))
+                continue
+            selected[chosen.name] = chosen
+            queue.append(chosen)
+    return resolution
@@ -0,0 +1,100 @@
+"""
+Итеративный обход графа с ограничением глубины.
+
+Вместо рекурсивного DFS с копированием множества посещённых узлов:
+1) BFS с явной очередью вычисляет кратчайшую глубину каждого узла
+   (не глубже max_depth) и родителя в дереве кратчайших путей;
+2) дерево выводится в прямом порядке явным стеком, каждый узел — один раз;
+3) циклы ищутся раскраской (белый/серый/чёрный) итеративным DFS:
+   ребро в «серый» узел — обратное, оно замыкает цикл.
+
+Все шаги линейны по размеру достижимого подграфа, рекурсии нет.
+Работает с любым графом в формате CSR (offsets/targets), в т.ч. DepGraph.
+"""
+
+_GREY = 1
+_BLACK = 2
+
+
+class Traversal:
+    """Результат обхода: дерево в прямом порядке, глубины и обратные рёбра."""
+    __slots__ = ("depth", "parent", "tree", "cycles")
+
+    def __init__(self, depth, parent, tree, cycles):
+        self.depth = depth      # {id: кратчайшая глубина}
+        self.parent = parent    # {id: родитель в дереве кратчайших путей}
+        self.tree = tree        # [(id, глубина)] в прямом порядке
+        self.cycles = cycles    # {u: [v, ...]} — рёбра u -> v, замыкающие цикл
+
+
+def shortest_depths(graph, root: int, max_depth: int):
+    """BFS от root: ({id: глубина}, {id: родитель}) для узлов не глубже max_depth."""
+    offsets, targets = graph.offsets, graph.targets
+    depth = {root: 0}
+    parent = {root: None}
+    frontier = [root]
+    level = 0
+    while frontier and level < max_depth:
+        level += 1
+        next_frontier = []
+        for node in frontier:
+            for t in targets[offsets[node]:offsets[node + 1]]:
+                if t not in depth:
+                    depth[t] = level
+                    parent[t] = node
+                    next_frontier.append(t)
+        frontier = next_frontier
+    return depth, parent
+
+
+def _preorder(graph, root: int, depth: dict, parent: dict) -> list:
+    """Прямой порядок дерева кратчайших путей; дети — в порядке смежности."""
+    offsets, targets = graph.offsets, graph.targets
+    tree = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        tree.append((node, depth[node]))
+        children = [t for t in targets[offsets[node]:offsets[node + 1]]
+                    if parent.get(t) == node and t != root]
+        stack.extend(reversed(children))
+    return tree
+
+
+def find_back_edges(graph, root: int, allowed: dict) -> dict:
+    """
+    Итеративный DFS с раскраской по узлам из allowed.
+    Возвращает {u: [v, ...]} для рёбер u -> v в «серый» узел.
+    """
+    offsets, targets = graph.offsets, graph.targets
+    colour = {root: _GREY}
+    cycles = {}
+    stack = [(root, offsets[root])]
+    while stack:
+        node, pos = stack[-1]
+        end = offsets[node + 1]
+        while pos < end:
+            t = targets[pos]
+            pos += 1
+            if t not in allowed:
+                continue
+            state = colour.get(t)
+            if state is None:
+                stack[-1] = (node, pos)
+                colour[t] = _GREY
+                stack.append((t, offsets[t]))
+                break
+            if state == _GREY:
+                cycles.setdefault(node, []).append(t)
+        else:
+            colour[node] = _BLACK
+            stack.pop()
+    return cycles
+
+
+def walk(graph, root: int, max_depth: int) -> Traversal:
+    """Полный обход от root: дерево кратчайших глубин и найденные циклы."""
+    depth, parent = shortest_depths(graph, root, max_depth)
+    tree = _preorder(graph, root, depth, parent)
+    cycles = find_back_edges(graph, root, depth)
+    return Traversal(depth, parent, tree, cycles)
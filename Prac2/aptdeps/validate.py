@@ -0,0 +1,19 @@
+"""
+Проверка аргументов этапов: шаблоны компилируются один раз при импорте
+и общие для этапа 1 (Task1) и stage2, а не собираются заново в каждой
+проверке.
+"""
+import re
+
+# Имя пакета Debian: латиница, цифры, точки, плюсы и тире (g++, libc6-dev)
+PACKAGE_NAME = re.compile(r"^[a-zA-Z0-9._+-]+$")
+# Короткая версия --version: цифры через точку (6.2, 1.0.3)
+SHORT_VERSION = re.compile(r"^[0-9]+(\.[0-9]+)*$")
+# Полная версия Debian в пакетном режиме (1.6-2.1ubuntu3, 1:2.3~rc1)
+DEBIAN_VERSION = re.compile(r"^[0-9][a-zA-Z0-9.+~:-]*$")
+# Набор, компонент или архитектура зеркала (jammy-updates, main, amd64)
+ARCHIVE_NAME = re.compile(r"^[a-z0-9][a-z0-9.+-]*$")
+
+
+def is_url(value: str) -> bool:
+    return value.startswith(("http://", "https://"))
@@ -0,0 +1,7 @@
+"""
+Бенчмарки этапов практики №2 на синтетических данных.
+
+Запуск из каталога Prac2:
+    python3 -m bench --sizes 1000 10000 --out results.json
+    python3 -m bench --sizes 1000 10000 --compare results.json
+"""
@@ -0,0 +1,67 @@
+"""
+Генераторы синтетических входных данных.
+
+Пакеты раскладываются по depth уровням; каждый пакет зависит от fanout
+случайных пакетов более глубоких уровней (граф без циклов), а с
+вероятностью cycle_density добавляется обратное ребро на уровень выше —
+оно создаёт цикл. Корень всех тестов — пакет pkg0 на первом уровне.
+Файлы пишутся построчно, в памяти целиком не собираются.
+"""
+import gzip
+import random
+
+
+def package_name(i: int) -> str:
+    return f"pkg{i}"
+
+
+def iter_dependencies(packages: int, fanout: int, depth: int, cycle_density: float, seed: int):
+    """Выдаёт (i, [зависимости]) для каждого пакета."""
+    rng = random.Random(seed)
+    depth = max(1, min(depth, packages))
+    per_level = max(1, packages // depth)
+
+    def level_of(i):
+        return min(i // per_level, depth - 1)
+
+    for i in range(packages):
+        level = level_of(i)
+        deps = set()
+        if level < depth - 1:
+            low = (level + 1) * per_level
+            for _ in range(fanout):
+                deps.add(rng.randrange(low, packages))
+        if level > 0 and rng.random() < cycle_density:
+            deps.add(rng.randrange(0, level * per_level))
+        deps.discard(i)
+        yield i, sorted(deps)
+
+
+def write_graph(path: str, packages: int, fanout: int = 4, depth: int = 8,
+                cycle_density: float = 0.01, seed: int = 1) -> str:
+    """Текстовый граф формата этапов 3–5: строки "A: B, C"."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"# synthetic: packages={packages} fanout={fanout} depth={depth} cycles={cycle_density}\n")
+        for i, deps in iter_dependencies(packages, fanout, depth, cycle_density, seed):
+            f.write(f"{package_name(i)}: {', '.join(package_name(d) for d in deps)}\n")
+    return path
+
+
+def write_packages(path: str, packages: int, fanout: int = 4, depth: int = 8,
+                   cycle_density: float = 0.01, seed: int = 1) -> str:
+    """Индекс Packages в формате APT; при пути *.gz — сжатый."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        for i, deps in iter_dependencies(packages, fanout, depth, cycle_density, seed):
+            f.write(f"Package: {package_name(i)}\n")
+            f.write(f"Version: 1.{i}-1ubuntu1\n")
+            f.write("Architecture: amd64\n")
+            f.write("Maintainer: Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>\n")
+            f.write(f"Installed-Size: {100 + i % 900}\n")
+            if deps:
+                depends = ", ".join(f"{package_name(d)} (>= 1.{d})" for d in deps)
+                f.write(f"Depends: {depends}\n")
+            f.write("Section: utils\nPriority: optional\n")
+            f.write(f"Description: synthetic package {i}\n")
+            f.write(" Generated for benchmarks of the APT dependency tools.\n\n")
+    return path
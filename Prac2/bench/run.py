@@ -0,0 +1,211 @@
+"""
+Замер времени этапов 2–5 на синтетических данных разного размера.
+
+Для каждого размера генерируются Packages.gz и текстовый граф, затем
+замеряются (лучшее из --repeat запусков):
+    stage2.fetch        загрузка Packages.gz по HTTP (локальный сервер)
+    stage2.decompress   gzip.decompress целиком
+    stage2.parse        исходный разбор parse_dependencies (регулярное выражение)
+    stage2.stream       потоковый поиск последнего пакета (распаковка + разбор)
+    stage2.graph        построение полного графа из Packages.gz
+    loader.parse        разбор текстового графа
+    loader.cached       загрузка графа из двоичного кэша
+    stage3.traverse     обход от pkg0 с ограничением глубины
+    stage4.order        порядок загрузки (SCC + волны) от pkg0
+    stage5.render       визуализация Mermaid всего графа от pkg0 в /dev/null
+Результат — JSON; с --compare выводится сравнение с предыдущим запуском.
+"""
+import argparse
+import contextlib
+import functools
+import gzip
+import http.server
+import importlib.util
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from urllib.request import urlopen
+
+from aptdeps.graph import load_apt_graph
+from aptdeps.loader import load_graph_file, parse_graph_text
+from aptdeps.order import load_order
+from aptdeps.packages import open_packages_stream, iter_stanzas, find_stanza
+from aptdeps.render import render
+from aptdeps.traverse import walk
+from bench.generate import write_graph, write_packages, package_name
+
+PRAC2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_stage2():
+    """stage2.py не является модулем пакета — загружаем по пути."""
+    path = os.path.join(PRAC2_DIR, "Task2", "stage2.py")
+    spec = importlib.util.spec_from_file_location("stage2", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_time(func, repeat: int):
+    """Лучшее время из repeat запусков и результат последнего."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+@contextlib.contextmanager
+def serve_directory(directory: str):
+    """Локальный HTTP-сервер вместо зеркала Ubuntu."""
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_size(size: int, args, workdir: str, stage2) -> list:
+    packages_gz = write_packages(os.path.join(workdir, "Packages.gz"), size,
+                                 args.fanout, args.depth, args.cycles, args.seed)
+    graph_txt = write_graph(os.path.join(workdir, "graph.txt"), size,
+                            args.fanout, args.depth, args.cycles, args.seed)
+    cache_dir = os.path.join(workdir, "graph-cache")
+    last = package_name(size - 1)
+    results = []
+
+    def record(stage, func, **extra):
+        seconds, value = best_time(func, args.repeat)
+        entry = {"size": size, "stage": stage, "seconds": round(seconds, 6)}
+        entry.update(extra)
+        results.append(entry)
+        print(f"  {stage:<18} {seconds * 1000:10.1f} мс", file=sys.stderr)
+        return value
+
+    def quietly(func, *func_args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*func_args)
+
+    with serve_directory(workdir) as base_url:
+        def fetch():
+            with urlopen(f"{base_url}/Packages.gz") as response:
+                return response.read()
+        compressed = record("stage2.fetch", fetch, bytes=os.path.getsize(packages_gz))
+
+    data = record("stage2.decompress", lambda: gzip.decompress(compressed),
+                  bytes=len(compressed))
+    text = data.decode("utf-8", errors="ignore")
+    del data
+    record("stage2.parse", lambda: quietly(stage2.parse_dependencies, text, last, "1"))
+    del text
+
+    def stream():
+        with open_packages_stream(packages_gz) as f:
+            return find_stanza(iter_stanzas(f), last)
+    record("stage2.stream", stream)
+    record("stage2.graph", lambda: load_apt_graph(packages_gz))
+
+    graph = record("loader.parse", lambda: parse_graph_text(graph_txt),
+                   bytes=os.path.getsize(graph_txt))
+    load_graph_file(graph_txt, cache_dir=cache_dir)
+    record("loader.cached", lambda: load_graph_file(graph_txt, cache_dir=cache_dir))
+
+    root = graph.id_of(package_name(0))
+    record("stage3.traverse", lambda: walk(graph, root, args.depth + 2))
+    record("stage4.order", lambda: load_order(graph, [root]))
+
+    def render_all():
+        with open(os.devnull, "w", encoding="utf-8") as out:
+            return render(graph, [root], out)
+    record("stage5.render", render_all)
+    return results
+
+
+def compare(results: list, previous_path: str, threshold: float, min_ms: float) -> int:
+    """
+    Печатает отношение новых времён к старым; возвращает число регрессий.
+    Регрессия — замедление больше threshold раз и не меньше min_ms миллисекунд
+    (короткие замеры слишком шумные).
+    """
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {(r["size"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n=== Сравнение с {previous_path} ===", file=sys.stderr)
+    for r in results:
+        old = previous.get((r["size"], r["stage"]))
+        if not old:
+            continue
+        ratio = r["seconds"] / old
+        mark = ""
+        if ratio > threshold and (r["seconds"] - old) * 1000 >= min_ms:
+            mark = "  <-- РЕГРЕССИЯ"
+            regressions += 1
+        print(f"{r['size']:>9} {r['stage']:<18} {old * 1000:10.1f} → {r['seconds'] * 1000:10.1f} мс  x{ratio:.2f}{mark}",
+              file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки этапов 2–5 на синтетических данных")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Числа пакетов (от 1000 до 1000000)")
+    parser.add_argument("--fanout", type=int, default=4, help="Зависимостей на пакет")
+    parser.add_argument("--depth", type=int, default=8, help="Число уровней графа")
+    parser.add_argument("--cycles", type=float, default=0.01, help="Доля пакетов с обратным ребром (циклы)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Запусков на замер (берётся лучший)")
+    parser.add_argument("--out", help="Файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="JSON предыдущего запуска для сравнения")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Во сколько раз медленнее считать регрессией")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="Минимальное замедление в мс, которое считается регрессией")
+    args = parser.parse_args(argv)
+
+    stage2 = load_stage2()
+    results = []
+    for size in args.sizes:
+        print(f"=== Пакетов: {size} ===", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix="apt-bench-") as workdir:
+            results.extend(bench_size(size, args, workdir, stage2))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"fanout": args.fanout, "depth": args.depth, "cycles": args.cycles,
+                       "seed": args.seed, "repeat": args.repeat},
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"\nРезультаты записаны в {args.out}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+
+    if args.compare and compare(results, args.compare, args.threshold, args.min_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Бюджет времени запуска apt-deps (aptdeps/cli.py).
+
+Каждая подкоманда запускается на тестовых данных репозитория с
+python3 -X importtime; из отчёта берётся суммарное время импортов
+(собственное время модулей, self) минус то же для пустого python3 -c pass —
+то, что добавляет сам apt-deps. Берётся лучший из --repeat запусков
+(первый запуск ещё компилирует .pyc и не учитывается).
+
+Бюджет задан в долях импортов пустого python3 (--budget): на медленной
+машине оба времени растут вместе, и проверка не зависит от её скорости.
+--budget-ms дополнительно задаёт абсолютный предел.
+
+Проверяется:
+    - время импортов каждой подкоманды не больше бюджета;
+    - ни одна подкоманда не импортирует модули из HEAVY — они нужны
+      только удалённым источникам, --metrics, демону, GraphML и режимам
+      --index, --resolve, --rdepends, --watch, --suites.
+Код выхода 1 при нарушении. Запуск из каталога Prac2: python3 -m bench.startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PRAC2_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APT_DEPS = os.path.join(PRAC2_DIR, "apt-deps")
+
+# Модули, которых не должно быть при запуске с локальными данными
+HEAVY = ("urllib.request", "http.client", "json", "socket", "tracemalloc", "xml.sax", "concurrent.futures",
+         "aptdeps.index", "aptdeps.resolver", "aptdeps.rdeps", "aptdeps.incremental", "aptdeps.cache",
+         "aptdeps.fetch")
+
+# подкоманда -> аргументы (пути относительно Prac2)
+COMMANDS = {
+    "validate": ["--package", "jq", "--repo", "http://ru.archive.ubuntu.com/ubuntu", "--version", "1.6"],
+    "deps": ["--package", "jq", "--version", "1.6", "--repo", "Task2/Packages.txt", "--stream"],
+    "tree": ["--repo", "Task3/test_graph.txt", "--package", "A"],
+    "order": ["--repo", "Task4/test_graph.txt", "--package", "A"],
+    "render": ["--repo", "Task5/test_graph.txt", "--package", "A"],
+}
+
+
+def import_times(argv: list) -> dict:
+    """Собственное время импорта каждого модуля (мкс) по отчёту -X importtime."""
+    # Демон не используется: замеряется локальный запуск
+    env = dict(os.environ, APT_DEPS_NO_DAEMON="1")
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=PRAC2_DIR, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)}: код выхода {proc.returncode}\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def best_total(argv: list, repeat: int):
+    """Лучшая сумма времён импорта (мкс) из repeat запусков и модули последнего запуска."""
+    import_times(argv)     # прогрев: компиляция .pyc
+    best, modules = None, {}
+    for _ in range(repeat):
+        modules = import_times(argv)
+        total = sum(modules.values())
+        best = total if best is None else min(best, total)
+    return best, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка бюджета времени запуска apt-deps")
+    parser.add_argument("--budget", type=float, default=6.0,
+                        help="Допустимое время импортов подкоманды сверх пустого python3, "
+                             "в разах от импортов пустого python3")
+    parser.add_argument("--budget-ms", type=float, help="Абсолютный предел того же времени, мс")
+    parser.add_argument("--repeat", type=int, default=7, help="Запусков на подкоманду (берётся лучший)")
+    parser.add_argument("--top", type=int, default=5, help="Сколько самых долгих модулей показать")
+    args = parser.parse_args(argv)
+
+    baseline, _ = best_total(["-c", "pass"], args.repeat)
+    budget_ms = baseline * args.budget / 1000
+    if args.budget_ms is not None:
+        budget_ms = min(budget_ms, args.budget_ms)
+    print(f"Пустой python3: {baseline / 1000:.1f} мс импортов, бюджет apt-deps: {budget_ms:.1f} мс")
+    violations = 0
+    for command, command_args in COMMANDS.items():
+        total, modules = best_total([APT_DEPS, command] + command_args, args.repeat)
+        spent = (total - baseline) / 1000
+        heavy = [name for name in HEAVY if name in modules]
+        mark = ""
+        if spent > budget_ms:
+            mark = "  <-- ПРЕВЫШЕН БЮДЖЕТ"
+            violations += 1
+        if heavy:
+            mark += f"  <-- ЛИШНИЕ ИМПОРТЫ: {', '.join(heavy)}"
+            violations += 1
+        print(f"{command:<9} {spent:8.1f} мс{mark}")
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        print("          " + ", ".join(f"{name} {us / 1000:.1f}" for name, us in slowest))
+
+    if violations:
+        print(f"Нарушений: {violations}")
+        sys.exit(1)
+    print("Бюджет запуска соблюдён.")
+
+
+if __name__ == "__main__":
+    main()
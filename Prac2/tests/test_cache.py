@@ -0,0 +1,136 @@
+"""
+Кэш загрузок (aptdeps.cache) против локального http.server: ответы 200 / 304,
+ETag и запоминание варианта Packages / Packages.gz.
+
+Запуск из Prac2: python3 -m unittest discover tests
+"""
+import contextlib
+import gzip
+import hashlib
+import http.server
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aptdeps.cache import DownloadCache, cached_packages_file
+from aptdeps.packages import DEFAULT_PACKAGES_PATH
+
+PACKAGES = b"Package: jq\nVersion: 1.6\nDepends: libjq1\n\n"
+
+
+class _Mirror(http.server.BaseHTTPRequestHandler):
+    """
+    Зеркало в памяти: files — путь -> тело, ETag — sha256 тела (без ETag,
+    если etags=False: тогда каждый запрос — 200); requests — журнал запросов.
+    """
+    files = {}
+    requests = []
+    etags = True
+
+    def do_GET(self):
+        etag = None
+        body = self.files.get(self.path)
+        if body is not None and self.etags:
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if body is None:
+            self.send_error(404)
+            return
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadCacheTest(unittest.TestCase):
+    def setUp(self):
+        _Mirror.files = {}
+        _Mirror.requests = []
+        _Mirror.etags = True
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Mirror)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp.name
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_200_then_304_with_etag(self):
+        _Mirror.files["/Packages"] = PACKAGES
+        cache = DownloadCache(self.cache_dir)
+        meta, from_cache = cache.fetch(self.base + "/Packages")
+        self.assertFalse(from_cache)
+        self.assertTrue(meta["etag"])
+        meta, from_cache = cache.fetch(self.base + "/Packages")
+        self.assertTrue(from_cache)
+        self.assertEqual(_Mirror.requests[-1], ("/Packages", meta["etag"]))
+        with open(cache.data_path(meta), "rb") as f:
+            self.assertEqual(f.read(), PACKAGES)
+
+    def test_changed_body_is_downloaded_again(self):
+        _Mirror.files["/Packages"] = PACKAGES
+        cache = DownloadCache(self.cache_dir)
+        first, _ = cache.fetch(self.base + "/Packages")
+        _Mirror.files["/Packages"] = PACKAGES.replace(b"1.6", b"1.7")
+        second, from_cache = cache.fetch(self.base + "/Packages")
+        self.assertFalse(from_cache)
+        self.assertNotEqual(first["etag"], second["etag"])
+        self.assertEqual(cache.load_meta(self.base + "/Packages")["etag"], second["etag"])
+        with open(cache.data_path(second), "rb") as f:
+            self.assertIn(b"Version: 1.7", f.read())
+
+    def test_remembered_gz_variant_skips_404(self):
+        _Mirror.files[DEFAULT_PACKAGES_PATH + ".gz"] = gzip.compress(PACKAGES)
+        with contextlib.redirect_stdout(io.StringIO()):
+            path = cached_packages_file(self.base, self.cache_dir)
+            self.assertTrue(path.endswith(".gz"))
+            self.assertEqual([p for p, _ in _Mirror.requests],
+                             [DEFAULT_PACKAGES_PATH, DEFAULT_PACKAGES_PATH + ".gz"])
+            del _Mirror.requests[:]
+            self.assertEqual(cached_packages_file(self.base, self.cache_dir), path)
+        self.assertEqual([p for p, _ in _Mirror.requests], [DEFAULT_PACKAGES_PATH + ".gz"])
+        self.assertIsNotNone(_Mirror.requests[0][1])
+
+    def test_concurrent_stores_leave_whole_files(self):
+        _Mirror.files["/Packages"] = PACKAGES * 1000
+        _Mirror.etags = False      # каждый запрос — 200 и новая запись в кэш
+        cache = DownloadCache(self.cache_dir)
+        errors = []
+
+        def fetch():
+            try:
+                for _ in range(10):
+                    cache.fetch(self.base + "/Packages")
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        meta = cache.load_meta(self.base + "/Packages")
+        with open(cache.data_path(meta), "rb") as f:
+            self.assertEqual(f.read(), PACKAGES * 1000)
+        self.assertEqual([n for n in os.listdir(self.cache_dir) if n.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()